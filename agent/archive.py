@@ -0,0 +1,276 @@
+import argparse
+import itertools
+import os
+import sqlite3
+from datetime import datetime, timedelta, date
+
+import pandas as pd
+
+# pyarrow é opcional: sem ele o arquivo morto simplesmente não é gerado/lido
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = pq = None
+    ARROW_AVAILABLE = False
+
+from database import SentinelDB
+
+ARCHIVE_DIRNAME = "archive"  # Pasta criada ao lado do banco
+FILE_PREFIX = "metrics_"     # metrics_AAAA-MM-DD.parquet (uma partição por dia)
+KEEP_DAYS = 7                # Ao podar o banco vivo, os últimos N dias continuam em metrics
+ROW_GROUP = 50_000           # Linhas por row group (um dia de 1 alvo a cada 10s = 8640)
+COMPRESSION = "zstd"
+
+# Esquema tipado do arquivo (ordem das colunas = ordem no Parquet)
+ARCHIVE_FIELDS = [
+    ("id", "int64"),
+    ("timestamp", "timestamp"),
+    ("target_host", "category"),
+    ("status", "category"),
+    ("ping_ms", "float64"),
+    ("jitter_ms", "float64"),
+    ("packet_loss", "float64"),
+    ("download_mbps", "float64"),
+    ("upload_mbps", "float64"),
+    ("dns_response_ms", "float64"),
+    ("gateway_ping_ms", "float64"),
+    ("rtp_jitter_ms", "float64"),
+    ("agent_id", "category"),
+    ("ping_sketch", "binary"),
+    ("trace_log", "string"),
+]
+ARCHIVE_COLUMNS = [name for name, _ in ARCHIVE_FIELDS]
+DB_COLUMNS = [c for c in ARCHIVE_COLUMNS if c != "trace_log"] + ["trace_ref"]
+
+def _arrow_schema():
+    types = {
+        "int64": pa.int64(),
+        "timestamp": pa.timestamp("us"),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "binary": pa.binary(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in ARCHIVE_FIELDS])
+
+def _require_arrow():
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow não está instalado (pip install pyarrow)")
+
+def default_archive_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_DIRNAME)
+
+def day_path(archive_dir, day):
+    return os.path.join(archive_dir, f"{FILE_PREFIX}{day.isoformat()}.parquet")
+
+def archived_days(archive_dir):
+    """Dias já exportados, em ordem -> {date: caminho}"""
+    days = {}
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            if name.startswith(FILE_PREFIX) and name.endswith(".parquet"):
+                try:
+                    day = date.fromisoformat(name[len(FILE_PREFIX):-len(".parquet")])
+                except ValueError:
+                    continue
+                days[day] = os.path.join(archive_dir, name)
+    return dict(sorted(days.items()))
+
+def read_day(path, columns=None, filters=None):
+    """Lê uma partição; colunas que o arquivo não tem (gerado por versão anterior) vêm nulas"""
+    schema = _arrow_schema()
+    columns = list(columns or ARCHIVE_COLUMNS)
+    present = set(pq.read_schema(path).names)
+    table = pq.read_table(path, columns=[c for c in columns if c in present], filters=filters, memory_map=True)
+    for name in columns:
+        if name not in present:
+            table = table.append_column(schema.field(name), pa.nulls(table.num_rows, schema.field(name).type))
+    return table.select(columns)
+
+def archived_max_id(path):
+    """Maior id já gravado no arquivo de um dia (0 se vazio)"""
+    ids = pq.read_table(path, columns=["id"])["id"]
+    return max(ids.to_pylist(), default=0)
+
+def day_bounds(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1) - timedelta(microseconds=1)
+
+class Archiver:
+    """Exporta dias completos de metrics para arquivos Parquet diários e, opcionalmente,
+    remove do banco vivo as linhas brutas já arquivadas (os agregados 1m/1h/1d ficam)."""
+
+    def __init__(self, db_path, archive_dir=None):
+        _require_arrow()
+        self.db_path = db_path
+        self.archive_dir = archive_dir or default_archive_dir(db_path)
+        self.db = SentinelDB(db_path, readonly=True)
+        self.schema = _arrow_schema()
+
+    def pending_days(self, today=None):
+        """Dias anteriores a hoje ainda não exportados ou com linhas que chegaram depois da exportação"""
+        today = today or date.today()
+        done = archived_days(self.archive_dir)
+        rows = self.db.conn.execute(
+            "SELECT date(timestamp), MAX(id) FROM metrics WHERE timestamp < ? GROUP BY 1",
+            (datetime.combine(today, datetime.min.time()),)
+        )
+        # Linha atrasada (spool da frota) num dia já exportado: id maior que o último do arquivo
+        return sorted(
+            day for day, last_id in ((date.fromisoformat(r[0]), r[1]) for r in rows if r[0])
+            if day not in done or last_id > archived_max_id(done[day])
+        )
+
+    def _tables(self, day, after_id=None):
+        """Lê o dia em blocos e converte cada bloco em tabela Arrow tipada"""
+        start, end = day_bounds(day)
+        rows = self.db.query(start=start, end=end, columns=DB_COLUMNS, after_id=after_id, order="asc")
+        traces = {}
+        while True:
+            chunk = list(itertools.islice(rows, ROW_GROUP))
+            if not chunk:
+                break
+            frame = pd.DataFrame.from_records(chunk, columns=DB_COLUMNS)
+            frame['timestamp'] = pd.to_datetime(frame['timestamp'], format='ISO8601')
+            # Texto do trace vai junto: o arquivo de um dia não depende da tabela traces
+            for ref in frame['trace_ref'].dropna().unique():
+                if ref not in traces:
+                    traces[ref] = self.db.get_trace(ref)
+            frame['trace_log'] = frame.pop('trace_ref').map(traces)
+            yield pa.Table.from_pandas(frame[ARCHIVE_COLUMNS], schema=self.schema, preserve_index=False)
+
+    def export_day(self, day):
+        """Grava metrics_<dia>.parquet (arquivo temporário + rename: nunca fica pela metade).
+
+        Dia já exportado: o arquivo é regravado com as linhas que já tinha (que podem não
+        estar mais no banco vivo) mais as que chegaram depois. Retorna as linhas novas.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = day_path(self.archive_dir, day)
+        tmp = path + ".tmp"
+        count = 0
+        with pq.ParquetWriter(tmp, self.schema, compression=COMPRESSION) as writer:
+            after_id = None
+            if os.path.exists(path):
+                writer.write_table(read_day(path).cast(self.schema))
+                after_id = archived_max_id(path)
+            for table in self._tables(day, after_id):
+                writer.write_table(table)
+                count += table.num_rows
+        os.replace(tmp, path)
+        return count
+
+    def prune(self, keep_days=KEEP_DAYS, today=None):
+        """Apaga de metrics as linhas brutas já arquivadas de dias mais antigos que keep_days.
+
+        Só até o último id de cada arquivo: linhas atrasadas que chegaram depois da exportação
+        ficam no banco até a próxima exportação do dia.
+        """
+        today = today or date.today()
+        limit = today - timedelta(days=keep_days)
+        days = {d: p for d, p in archived_days(self.archive_dir).items() if d < limit}
+        if not days:
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA busy_timeout=5000")
+        removed = 0
+        try:
+            with conn:
+                for day, path in days.items():
+                    start, end = day_bounds(day)
+                    archived = archived_max_id(path)
+                    conn.execute(
+                        "DELETE FROM trace_hops WHERE metric_id IN "
+                        "(SELECT id FROM metrics WHERE timestamp BETWEEN ? AND ? AND id <= ?)", (start, end, archived)
+                    )
+                    removed += conn.execute(
+                        "DELETE FROM metrics WHERE timestamp BETWEEN ? AND ? AND id <= ?", (start, end, archived)
+                    ).rowcount
+                conn.execute(
+                    "DELETE FROM traces WHERE hash NOT IN (SELECT trace_ref FROM metrics WHERE trace_ref IS NOT NULL)"
+                )
+        finally:
+            conn.close()
+        return removed
+
+    def run(self, prune=False, keep_days=KEEP_DAYS):
+        exported = 0
+        for day in self.pending_days():
+            count = self.export_day(day)
+            exported += count
+            print(f"📦 [ARCHIVE] {day.isoformat()}: {count} registro(s) exportados.")
+        removed = self.prune(keep_days) if prune else 0
+        if removed:
+            print(f"🧹 [ARCHIVE] {removed} registro(s) arquivados removidos do banco vivo.")
+        return exported, removed
+
+    def close(self):
+        self.db.close()
+
+def read_archive(archive_dir, start=None, end=None, columns=None, hosts=None, statuses=None):
+    """Carrega só as partições (dias) e colunas pedidas, com leitura mapeada em memória"""
+    _require_arrow()
+    columns = list(columns or ARCHIVE_COLUMNS)
+    first = start.date() if start is not None else date.min
+    last = end.date() if end is not None else date.max
+    paths = [p for d, p in archived_days(archive_dir).items() if first <= d <= last]
+    if not paths:
+        return pd.DataFrame(columns=columns)
+
+    filters = []
+    if start is not None:
+        filters.append(("timestamp", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("timestamp", "<=", pd.Timestamp(end)))
+    if hosts:
+        filters.append(("target_host", "in", [hosts] if isinstance(hosts, str) else list(hosts)))
+    if statuses:
+        filters.append(("status", "in", [statuses] if isinstance(statuses, str) else list(statuses)))
+    tables = [read_day(p, columns, filters or None) for p in paths]
+    return pa.concat_tables(tables).to_pandas()
+
+def read_period(db_path, start=None, end=None, columns=None, hosts=None, archive_dir=None):
+    """Histórico completo de um período: arquivo Parquet + linhas do banco vivo ainda não arquivadas"""
+    columns = list(columns or [c for c in ARCHIVE_COLUMNS if c != "trace_log"])
+    archive_dir = archive_dir or default_archive_dir(db_path)
+    frames = []
+    need_id = "id" not in columns
+    if ARROW_AVAILABLE and archived_days(archive_dir):
+        frames.append(read_archive(archive_dir, start, end, columns + ["id"] * need_id, hosts))
+
+    db = SentinelDB(db_path, readonly=True)
+    db_columns = [c for c in columns if c in db.columns] + ["id"] * need_id
+    # Banco vivo pelo mesmo período, sem as linhas que já estão no arquivo. Um cursor de id não
+    # serve: a frota insere linhas atrasadas de dias antigos depois das de hoje (ids fora de ordem)
+    live = pd.DataFrame.from_records(
+        list(db.query(start=start, end=end, hosts=hosts, columns=db_columns, order="asc")), columns=db_columns
+    )
+    db.close()
+    if frames and not live.empty:
+        live = live[~live['id'].isin(frames[0]['id'])]
+    if not live.empty:
+        live['timestamp'] = pd.to_datetime(live['timestamp'], format='ISO8601')
+        frames.append(live)
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df[columns]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta dias completos de metrics para Parquet")
+    parser.add_argument("--db", default="sentinel_data.db")
+    parser.add_argument("--dir", default=None, help="pasta do arquivo (padrão: archive/ ao lado do banco)")
+    parser.add_argument("--prune", action="store_true", help="remove do banco vivo os dias já arquivados")
+    parser.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    args = parser.parse_args()
+
+    archiver = Archiver(args.db, args.dir)
+    try:
+        exported, removed = archiver.run(prune=args.prune, keep_days=args.keep_days)
+    finally:
+        archiver.close()
+    print(f"✅ [ARCHIVE] {exported} exportado(s), {removed} removido(s) do banco.")
@@ -0,0 +1,86 @@
+import threading
+
+from ping3 import ping
+
+from dns_probe import ResolverSocket
+from forensics import run_traceroute
+from gateway import GatewayResolver
+from throughput import read_interface_counters, http_download, http_upload
+
+class ProbeBackend:
+    """Interface das sondagens do agente: ICMP, DNS, Gateway, traceroute e vazão.
+
+    O agente só fala com a rede por aqui, então trocar o backend (ex: pelo
+    simulador) exercita agente, banco, IA, dashboard e relatórios sem rede real.
+    """
+
+    def ping(self, host, unit='ms', timeout=1):
+        """RTT em ms (mesma assinatura do ping3); None = sem resposta"""
+        raise NotImplementedError
+
+    def resolve(self, name, server, rdtype='A', timeout=2):
+        """Tempo de resposta da consulta DNS em ms; levanta exceção em caso de falha (nunca retorna 0)"""
+        raise NotImplementedError
+
+    def default_gateway(self):
+        """IP do Gateway padrão (None se não houver rota)"""
+        raise NotImplementedError
+
+    def traceroute(self, target):
+        """Saída de texto no formato do tracert/traceroute"""
+        raise NotImplementedError
+
+    def interface_counters(self):
+        """{interface: (bytes recebidos, bytes enviados)} acumulados desde o boot"""
+        raise NotImplementedError
+
+    def http_download(self, url):
+        """Teste ativo de download: (bytes, segundos)"""
+        raise NotImplementedError
+
+    def http_upload(self, url):
+        """Teste ativo de upload: (bytes, segundos)"""
+        raise NotImplementedError
+
+class SystemBackend(ProbeBackend):
+    """Rede real: ping3, dnspython, tabela de rotas do SO, traceroute/tracert e /proc/net/dev"""
+
+    def __init__(self):
+        self.gateway_resolver = GatewayResolver()
+        # Um socket por (resolvedor, nome, tipo): consultas paralelas sem disputar o mesmo socket
+        self.dns_sockets = {}
+        self._lock = threading.Lock()
+
+    def ping(self, host, unit='ms', timeout=1):
+        return ping(host, unit=unit, timeout=timeout)
+
+    def resolve(self, name, server, rdtype='A', timeout=2):
+        with self._lock:
+            sock = self.dns_sockets.get((server, name, rdtype))
+            if sock is None:
+                sock = self.dns_sockets[(server, name, rdtype)] = ResolverSocket(server)
+        return sock.query(name, rdtype, timeout)
+
+    def default_gateway(self):
+        return self.gateway_resolver.get()
+
+    def traceroute(self, target):
+        return run_traceroute(target)
+
+    def interface_counters(self):
+        return read_interface_counters()
+
+    def http_download(self, url):
+        return http_download(url)
+
+    def http_upload(self, url):
+        return http_upload(url)
+
+def create_backend(name="system", **kwargs):
+    """Fábrica usada pelo agente: 'system' (padrão) ou 'sim' (simulador determinístico)"""
+    if name == "system":
+        return SystemBackend()
+    if name == "sim":
+        from simulator import SimulatedBackend
+        return SimulatedBackend(**kwargs)
+    raise ValueError(f"Backend de sondagem desconhecido: {name}")
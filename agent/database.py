@@ -1,10 +1,251 @@
 import sqlite3
-from datetime import datetime
+import threading
+import queue
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+import rollups
+import sketch
+import sla
+import stream_detector
+from forensics import parse_traceroute, trace_fingerprint
+from telemetry import telemetry
+
+# Configurações do gravador em lote (write-behind)
+BATCH_SIZE = 50        # Grava assim que acumular N registros
+FLUSH_INTERVAL = 2.0   # ...ou quando o registro mais antigo esperar mais que N segundos
+PURGE_INTERVAL = 3600  # Retenção aplicada pela thread gravadora a cada hora
+WRITE_RETRIES = 6         # Novas tentativas de um lote com o banco ocupado além do busy_timeout...
+WRITE_RETRY_BACKOFF = 0.5  # ...esperando N segundos antes da primeira, dobrando a cada uma (~30s no total)
+QUERY_CHUNK = 1000     # Linhas buscadas por vez ao percorrer um resultado
+STATS_RETENTION_DAYS = 7  # Snapshots da auto-instrumentação do agente (agent_stats)
+
+PROBLEM_STATUSES = ["PACKET_LOSS", "ISP_LATENCY", "INTERNAL_WIFI_ISSUE", "UNREACHABLE"]
+
+INSERT_METRIC = """
+INSERT INTO metrics
+(timestamp, ping_ms, jitter_ms, packet_loss, download_mbps, upload_mbps,
+ dns_response_ms, gateway_ping_ms, trace_log, target_host, status, agent_id, rtp_jitter_ms, ping_sketch)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_STAT = "INSERT INTO agent_stats (timestamp, name, labels, value) VALUES (?, ?, ?, ?)"
+INSERT_ANOMALY = "INSERT INTO anomalies (metric_id, timestamp, detector, score, reason) VALUES (?, ?, ?, ?, ?)"
+UPSERT_STREAM_STATE = "INSERT OR REPLACE INTO stream_state (target_host, state, updated_at) VALUES (?, ?, ?)"
+INSERT_DNS = "INSERT INTO dns_probes (timestamp, server, name, rdtype, response_ms, error) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_THROUGHPUT = """
+INSERT INTO throughput_tests (timestamp, server, download_mbps, upload_mbps, download_bytes, upload_bytes, error)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_HOP = """
+INSERT INTO trace_hops (metric_id, hop, ip, rtt1_ms, rtt2_ms, rtt3_ms, loss_pct)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _migration_1_indexes(conn):
+    # Índices de cobertura: faixa de tempo (com ou sem filtro de alvo) sem tocar a tabela
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_metrics_ts_cover ON metrics
+    (timestamp, target_host, status, ping_ms, jitter_ms, packet_loss, dns_response_ms, gateway_ping_ms)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_metrics_host_ts_cover ON metrics
+    (target_host, timestamp, status, ping_ms, jitter_ms, packet_loss, dns_response_ms, gateway_ping_ms)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_status_ts ON metrics (status, timestamp)")
+
+TRACES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    hash TEXT PRIMARY KEY,
+    data BLOB,
+    hop_count INTEGER,
+    first_seen DATETIME,
+    last_seen DATETIME,
+    hits INTEGER DEFAULT 1
+)
+"""
+
+def store_trace(conn, trace_log, hops, seen_at):
+    """Grava o texto do trace comprimido (zlib) na tabela endereçada por conteúdo; retorna a chave"""
+    ref = trace_fingerprint(trace_log, hops)
+    # Rota já conhecida: só conta a repetição (sem comprimir de novo)
+    updated = conn.execute(
+        "UPDATE traces SET hits = hits + 1, last_seen = ? WHERE hash = ?", (seen_at, ref)
+    ).rowcount
+    if not updated:
+        conn.execute(
+            "INSERT INTO traces (hash, data, hop_count, first_seen, last_seen, hits) VALUES (?, ?, ?, ?, ?, 1)",
+            (ref, zlib.compress(trace_log.encode('utf-8'), 9), len(hops), seen_at, seen_at)
+        )
+    return ref
+
+def _migration_2_trace_store(conn):
+    # Traces saem da tabela quente: metrics guarda só a referência (trace_ref)
+    conn.execute(TRACES_SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(metrics)")]
+    if "trace_ref" not in columns:
+        conn.execute("ALTER TABLE metrics ADD COLUMN trace_ref TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_trace_ref ON metrics (trace_ref)")
+
+    ids = [row[0] for row in conn.execute(
+        "SELECT id FROM metrics WHERE trace_log IS NOT NULL AND trace_log != ''"
+    )]
+    for i in range(0, len(ids), QUERY_CHUNK):
+        chunk = ids[i:i + QUERY_CHUNK]
+        rows = conn.execute(
+            f"SELECT id, timestamp, trace_log FROM metrics WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        for metric_id, timestamp, trace_log in rows:
+            hops = parse_traceroute(trace_log)
+            ref = store_trace(conn, trace_log, hops, timestamp)
+            # Traces antigos (anteriores a trace_hops) ganham também os saltos estruturados
+            if not conn.execute("SELECT 1 FROM trace_hops WHERE metric_id = ?", (metric_id,)).fetchone():
+                conn.executemany(INSERT_HOP, hop_rows(metric_id, hops))
+            conn.execute("UPDATE metrics SET trace_ref = ?, trace_log = NULL WHERE id = ?", (ref, metric_id))
+    if ids:
+        print(f"🔧 [DB] {len(ids)} traceroute(s) movidos para a tabela traces.")
+    return bool(ids)
+
+def _migration_3_agent_id(conn):
+    # Frota: linhas recebidas pelo servidor de ingestão guardam o agente de origem (NULL = local)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(metrics)")]
+    if "agent_id" not in columns:
+        conn.execute("ALTER TABLE metrics ADD COLUMN agent_id TEXT")
+
+def _migration_4_dns_failures_null(conn):
+    # Versões antigas gravavam 0 ms quando o DNS falhava: falha agora é NULL (fora das médias)
+    # Agregados: antes de anular os brutos, tira dos baldes os zeros que eles ainda cobrem
+    # (soma e soma dos quadrados não mudam; o mínimo volta a ser o menor tempo real)
+    m = "dns_response_ms"
+    for res, (_, fmt) in rollups.RESOLUTIONS.items():
+        table = rollups.table_for(res)
+        conn.execute(f"""
+        UPDATE {table} SET
+            {m}_count = {m}_count - z.zeros,
+            {m}_min = CASE WHEN {m}_count = z.zeros THEN NULL WHEN {m}_min = 0 THEN z.low ELSE {m}_min END,
+            {m}_max = CASE WHEN {m}_count = z.zeros THEN NULL ELSE {m}_max END
+        FROM (
+            SELECT strftime('{fmt}', timestamp) AS bucket, target_host,
+                   SUM({m} = 0) AS zeros, MIN(NULLIF({m}, 0)) AS low
+            FROM metrics GROUP BY 1, 2 HAVING zeros > 0
+        ) AS z
+        WHERE {table}.bucket = z.bucket AND {table}.target_host IS z.target_host
+        """)
+    conn.execute(f"UPDATE metrics SET {m} = NULL WHERE {m} = 0")
+    # Baldes além da retenção dos brutos: como na migração 5, balde só com zeros (máximo 0)
+    # era só falha; zera a estatística no próprio balde
+    for res in rollups.RESOLUTIONS:
+        conn.execute(
+            f"UPDATE {rollups.table_for(res)} SET {m}_count = 0, {m}_min = NULL, "
+            f"{m}_max = NULL, {m}_sum = 0, {m}_sumsq = 0 WHERE {m}_max = 0"
+        )
+
+def _migration_5_throughput_null(conn):
+    # Versões antigas gravavam 0 em download/upload sem medir nada: sem medida agora é NULL
+    conn.execute("UPDATE metrics SET download_mbps = NULL, upload_mbps = NULL "
+                 "WHERE download_mbps = 0 AND upload_mbps = 0")
+    # Agregados: balde só com zeros (máximo 0) era só placeholder. Não dá para reconstruir
+    # dos brutos, que já podem ter saído da retenção; zera a estatística no próprio balde
+    for res in rollups.RESOLUTIONS:
+        for metric in ("download_mbps", "upload_mbps"):
+            conn.execute(
+                f"UPDATE {rollups.table_for(res)} SET {metric}_count = 0, {metric}_min = NULL, "
+                f"{metric}_max = NULL, {metric}_sum = 0, {metric}_sumsq = 0 WHERE {metric}_max = 0"
+            )
+
+def _add_columns(conn, table, definitions):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    for definition in definitions:
+        if definition.split()[0] not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+LATENCY_COLUMNS = ["rtp_jitter_ms REAL", f"{rollups.SKETCH_COLUMN} BLOB"]
+
+def _migration_6_latency_sketch(conn):
+    # Jitter RFC 3550 e sketch dos RTTs por ciclo; linhas e baldes antigos ficam sem (NULL/0)
+    _add_columns(conn, "metrics", LATENCY_COLUMNS)
+    for res in rollups.RESOLUTIONS:
+        _add_columns(conn, rollups.table_for(res),
+                     [*rollups.metric_columns("rtp_jitter_ms"), f"{rollups.SKETCH_COLUMN} BLOB"])
+
+def _migration_7_unreachable_status(conn):
+    # Ciclos com o alvo inacessível ganham contagem própria nos baldes (antes caíam em status_other);
+    # baldes ainda cobertos pelos brutos movem essas linhas de status_other para a coluna nova
+    for res, (_, fmt) in rollups.RESOLUTIONS.items():
+        table = rollups.table_for(res)
+        _add_columns(conn, table, ["status_unreachable INTEGER DEFAULT 0"])
+        conn.execute(f"""
+        UPDATE {table} SET status_unreachable = z.down, status_other = MAX(status_other - z.down, 0)
+        FROM (
+            SELECT strftime('{fmt}', timestamp) AS bucket, target_host, COUNT(*) AS down
+            FROM metrics WHERE status = 'UNREACHABLE' GROUP BY 1, 2
+        ) AS z
+        WHERE {table}.bucket = z.bucket AND {table}.target_host IS z.target_host
+        """)
+
+# Migrações de esquema, aplicadas em ordem; PRAGMA user_version guarda a última aplicada.
+# Uma migração que retorna True liberou espaço: o arquivo é compactado (VACUUM) ao final.
+MIGRATIONS = [
+    _migration_1_indexes,
+    _migration_2_trace_store,
+    _migration_3_agent_id,
+    _migration_4_dns_failures_null,
+    _migration_5_throughput_null,
+    _migration_6_latency_sketch,
+    _migration_7_unreachable_status,
+]
+
+def is_locked(error):
+    """SQLITE_BUSY/LOCKED: outra conexão (ex: NetworkBrain do dashboard) segura o banco; é transitório"""
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+def hop_rows(metric_id, hops):
+    return [
+        (metric_id, h['hop'], h['ip'], h['rtt1'], h['rtt2'], h['rtt3'], h['loss'])
+        for h in hops
+    ]
 
 class SentinelDB:
-    def __init__(self, db_name="sentinel_data.db"):
+    def __init__(self, db_name="sentinel_data.db", buffered=True,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 retention_days=rollups.RAW_RETENTION_DAYS, readonly=False,
+                 write_retries=WRITE_RETRIES, retry_backoff=WRITE_RETRY_BACKOFF):
+        self.db_name = db_name
+        self.retention_days = retention_days
+        self.write_retries = write_retries
+        self.retry_backoff = retry_backoff
         self.conn = sqlite3.connect(db_name, check_same_thread=False)
-        self.create_table()
+        self._columns = None
+        if readonly:
+            # Leitores (Dashboard / IA / Relatórios): só consultas, o esquema é do agente
+            self.conn.execute("PRAGMA busy_timeout=5000")
+            buffered = False
+        else:
+            self.configure(self.conn)
+            self.create_table()
+            self.migrate()
+
+        # Gravação assíncrona: a fila é drenada por uma thread dedicada
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._writer = None
+        if buffered:
+            self._writer = threading.Thread(target=self._writer_loop, name="sentinel-db-writer", daemon=True)
+            self._writer.start()
+
+    @staticmethod
+    def configure(conn):
+        # WAL: leitores (Dashboard / NetworkBrain) não bloqueiam durante a escrita
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL em WAL é seguro contra corrupção; só perde o último lote em queda de energia
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Os agregados somam os sketches de latência dentro do próprio upsert
+        sketch.register(conn)
 
     def create_table(self):
         # Adicionamos colunas novas: gateway_ping_ms e trace_log
@@ -18,24 +259,106 @@ class SentinelDB:
             download_mbps REAL,
             upload_mbps REAL,
             dns_response_ms REAL,
-            gateway_ping_ms REAL, 
+            gateway_ping_ms REAL,
             trace_log TEXT,
             target_host TEXT,
-            status TEXT
+            status TEXT,
+            rtp_jitter_ms REAL,
+            ping_sketch BLOB
         )
         """
         self.conn.execute(query)
+        # Saltos do traceroute forense, vinculados à linha de métrica que disparou a perícia
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS trace_hops (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_id INTEGER REFERENCES metrics(id),
+            hop INTEGER,
+            ip TEXT,
+            rtt1_ms REAL,
+            rtt2_ms REAL,
+            rtt3_ms REAL,
+            loss_pct REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trace_hops_metric ON trace_hops(metric_id)")
+        # Snapshots da telemetria do próprio agente (painel de saúde do dashboard)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS agent_stats (
+            timestamp DATETIME,
+            name TEXT,
+            labels TEXT,
+            value REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_stats_time ON agent_stats(timestamp)")
+        # Detalhe da sondagem DNS: uma linha por (resolvedor, nome, tipo) em cada ciclo
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS dns_probes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            server TEXT,
+            name TEXT,
+            rdtype TEXT,
+            response_ms REAL,
+            error TEXT
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_dns_probes_time ON dns_probes(timestamp)")
+        # Testes de banda ativos (ocasionais, com o link ocioso): mantidos para a auditoria do plano
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS throughput_tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            server TEXT,
+            download_mbps REAL,
+            upload_mbps REAL,
+            download_bytes INTEGER,
+            upload_bytes INTEGER,
+            error TEXT
+        )
+        """)
+        # Alertas: detector em fluxo do agente (e NetworkBrain do dashboard, mesmo esquema)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS anomalies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_id INTEGER,
+            timestamp DATETIME,
+            detector TEXT,
+            score REAL,
+            reason TEXT
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_metric ON anomalies(metric_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_detector_time ON anomalies(detector, timestamp)")
+        self.conn.execute(stream_detector.STATE_SCHEMA)
+        # Agregados 1m/1h/1d mantidos a cada lote gravado (num banco antigo sem eles, a
+        # reconstrução já lê as colunas da migração 6)
+        _add_columns(self.conn, "metrics", LATENCY_COLUMNS)
+        rollups.ensure_schema(self.conn)
+        # Acumuladores diários de disponibilidade (SLA)
+        sla.ensure_schema(self.conn)
         self.conn.commit()
 
+    def migrate(self):
+        """Aplica as migrações pendentes em bancos criados por versões anteriores"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        vacuum = False
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            print(f"🔧 [DB] Aplicando migração de esquema {number}: {migration.__name__}")
+            with self.conn:
+                freed = migration(self.conn)
+                self.conn.execute(f"PRAGMA user_version = {number}")
+            vacuum = vacuum or bool(freed)
+        if vacuum:
+            print("🔧 [DB] Compactando o banco (VACUUM)...")
+            self.conn.execute("VACUUM")
+        self._columns = None
+
     def save_metric(self, data):
-        query = """
-        INSERT INTO metrics 
-        (timestamp, ping_ms, jitter_ms, packet_loss, download_mbps, upload_mbps, 
-         dns_response_ms, gateway_ping_ms, trace_log, target_host, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        self.conn.execute(query, (
-            datetime.now(),
+        """Enfileira a métrica e retorna um Future que recebe o id da linha após o flush"""
+        params = (
+            data.get('timestamp') or datetime.now(),
             data.get('ping'),
             data.get('jitter'),
             data.get('packet_loss'),
@@ -45,11 +368,425 @@ class SentinelDB:
             data.get('gateway_ping'),  # Novo
             data.get('trace_log'),     # Novo (Evidência Forense)
             data.get('host'),
-            data.get('status')
-        ))
-        self.conn.commit()
-        print(f"💾 [DB] Dados salvos com RCA às {datetime.now().strftime('%H:%M:%S')}")
+            data.get('status'),
+            data.get('agent_id'),
+            data.get('rtp_jitter'),
+            data.get('ping_sketch')
+        )
+        ticket = Future()
+        if not self.buffered:
+            with self.conn:
+                cursor = self.conn.execute(INSERT_METRIC, params)
+                rollups.apply_range(self.conn, cursor.lastrowid, cursor.lastrowid)
+                sla.apply_range(self.conn, cursor.lastrowid, cursor.lastrowid)
+            ticket.set_result(cursor.lastrowid)
+            print(f"💾 [DB] Dados salvos com RCA às {datetime.now().strftime('%H:%M:%S')}")
+            return ticket
+
+        self._queue.put(("metric", params, ticket))
+        return ticket
+
+    def save_trace(self, metric_ticket, trace_log, hops):
+        """Anexa o traceroute (texto + saltos) à métrica indicada pelo ticket de save_metric"""
+        if not self.buffered:
+            with self.conn:
+                self._write_trace(self.conn, metric_ticket.result(), trace_log, hops)
+            return
+        self._queue.put(("trace", (metric_ticket, trace_log, hops), None))
+
+    def save_stats(self, rows):
+        """Grava um snapshot da telemetria (Telemetry.snapshot) na tabela agent_stats"""
+        if not self.buffered:
+            with self.conn:
+                self.conn.executemany(INSERT_STAT, rows)
+            return
+        self._queue.put(("stats", rows, None))
+
+    def save_anomaly(self, metric_ticket, timestamp, detector, score, reason):
+        """Registra um alerta vinculado à métrica indicada pelo ticket de save_metric"""
+        if not self.buffered:
+            with self.conn:
+                self.conn.execute(INSERT_ANOMALY, (metric_ticket.result(), timestamp, detector, score, reason))
+            return
+        self._queue.put(("anomaly", (metric_ticket, timestamp, detector, score, reason), None))
+
+    def save_stream_state(self, rows):
+        """Persiste o estado do detector em fluxo: (target_host, estado JSON, atualizado_em)"""
+        if not self.buffered:
+            with self.conn:
+                self.conn.executemany(UPSERT_STREAM_STATE, rows)
+            return
+        self._queue.put(("stream_state", rows, None))
+
+    def save_dns(self, results):
+        """Grava o detalhe de um ciclo da sondagem DNS (DnsProbe.run); response_ms None = falha"""
+        rows = [(r['timestamp'], r['server'], r['name'], r['rdtype'], r['response_ms'], r['error']) for r in results]
+        if not self.buffered:
+            with self.conn:
+                self.conn.executemany(INSERT_DNS, rows)
+            return
+        self._queue.put(("dns", rows, None))
+
+    def save_throughput(self, result):
+        """Grava o resultado de um teste de banda ativo (ActiveThroughputTest.run)"""
+        rows = [(result['timestamp'], result['server'], result['download_mbps'], result['upload_mbps'],
+                 result['download_bytes'], result['upload_bytes'], result['error'])]
+        if not self.buffered:
+            with self.conn:
+                self.conn.executemany(INSERT_THROUGHPUT, rows)
+            return
+        self._queue.put(("throughput", rows, None))
+
+    @staticmethod
+    def _write_trace(conn, metric_id, trace_log, hops):
+        ref = store_trace(conn, trace_log, hops, datetime.now())
+        conn.execute("UPDATE metrics SET trace_ref = ? WHERE id = ?", (ref, metric_id))
+        conn.executemany(INSERT_HOP, hop_rows(metric_id, hops))
+
+    def _writer_loop(self):
+        # Conexão própria da thread gravadora
+        conn = sqlite3.connect(self.db_name)
+        self.configure(conn)
+        stop = False
+        next_purge = time.monotonic()
+        while not stop:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    # Pedido de flush explícito: grava o que tiver e libera quem pediu
+                    self._write_batch(conn, batch)
+                    batch = []
+                    item.set()
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            self._write_batch(conn, batch)
+            if time.monotonic() >= next_purge:
+                self.purge(conn)
+                next_purge = time.monotonic() + PURGE_INTERVAL
+        conn.close()
+
+    def _transaction(self, conn, label, write):
+        """write(conn) numa transação; com o banco ocupado, desfaz e tenta de novo com espera crescente"""
+        delay = self.retry_backoff
+        for attempt in range(self.write_retries + 1):
+            try:
+                with conn:
+                    return write(conn)
+            except Exception as e:
+                if not is_locked(e) or attempt == self.write_retries:
+                    raise
+                telemetry.inc("db_write_retries_total")
+                print(f"⏳ [DB] Banco ocupado ao gravar {label}; nova tentativa em {delay:.1f}s...")
+                time.sleep(delay)
+                delay *= 2
+
+    def _write_metrics(self, conn, rows):
+        conn.executemany(INSERT_METRIC, rows)
+        # Escritor único + AUTOINCREMENT: os ids do lote são consecutivos
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(rows) + 1
+        rollups.apply_range(conn, first_id, last_id)
+        sla.apply_range(conn, first_id, last_id)
+        return first_id
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        metrics = [(params, ticket) for kind, params, ticket in batch if kind == "metric"]
+        traces = [params for kind, params, _ in batch if kind == "trace"]
+        stats = [row for kind, rows, _ in batch if kind == "stats" for row in rows]
+        dns_rows = [row for kind, rows, _ in batch if kind == "dns" for row in rows]
+        throughput = [row for kind, rows, _ in batch if kind == "throughput" for row in rows]
+        anomalies = [params for kind, params, _ in batch if kind == "anomaly"]
+        # Só o estado mais recente do detector importa
+        stream_state = next((rows for kind, rows, _ in reversed(batch) if kind == "stream_state"), [])
+        started = time.perf_counter()
+
+        # 1. Métricas primeiro: os traces do mesmo lote precisam dos ids já resolvidos.
+        # Banco ocupado não descarta o lote: _transaction tenta de novo antes de desistir
+        if metrics:
+            rows = [params for params, _ in metrics]
+            try:
+                first_id = self._transaction(conn, "métricas", lambda c: self._write_metrics(c, rows))
+            except Exception as e:
+                print(f"❌ [DB] Falha ao gravar lote de {len(metrics)} registros: {e}")
+                telemetry.inc("db_write_errors_total")
+                for _, ticket in metrics:
+                    ticket.set_exception(e)
+            else:
+                for offset, (_, ticket) in enumerate(metrics):
+                    ticket.set_result(first_id + offset)
+                telemetry.inc("db_rows_written_total", len(metrics))
+                print(f"💾 [DB] {len(metrics)} registro(s) gravado(s) às {datetime.now().strftime('%H:%M:%S')}")
+
+        # 2. Evidências forenses
+        for metric_ticket, trace_log, hops in traces:
+            try:
+                metric_id = metric_ticket.result(timeout=0)
+                self._transaction(conn, "traceroute", lambda c: self._write_trace(c, metric_id, trace_log, hops))
+            except Exception as e:
+                print(f"❌ [DB] Falha ao gravar traceroute: {e}")
+
+        # 3. Alertas do detector em fluxo (também precisam do id da métrica)
+        if anomalies:
+            try:
+                rows = [(ticket.result(timeout=0), ts, detector, score, reason)
+                        for ticket, ts, detector, score, reason in anomalies]
+                self._transaction(conn, "alertas", lambda c: c.executemany(INSERT_ANOMALY, rows))
+            except Exception as e:
+                print(f"❌ [DB] Falha ao gravar {len(anomalies)} alerta(s): {e}")
+
+        # 4. Detalhe do DNS, testes de banda, telemetria e estado do detector
+        for sql, rows, label in ((INSERT_DNS, dns_rows, "sondagem DNS"), (INSERT_THROUGHPUT, throughput, "teste de banda"),
+                                 (INSERT_STAT, stats, "telemetria"),
+                                 (UPSERT_STREAM_STATE, stream_state, "estado do detector")):
+            if not rows:
+                continue
+            try:
+                self._transaction(conn, label, lambda c, sql=sql, rows=rows: c.executemany(sql, rows))
+            except Exception as e:
+                print(f"❌ [DB] Falha ao gravar {label}: {e}")
+        telemetry.observe("db_flush_seconds", time.perf_counter() - started)
+
+    def purge(self, conn=None):
+        """Aplica a retenção em camadas (brutos e agregados)"""
+        conn = conn or self.conn
+        try:
+            with conn:
+                removed = rollups.purge(conn, raw_days=self.retention_days)
+                conn.execute("DELETE FROM agent_stats WHERE timestamp < ?",
+                             (datetime.now() - timedelta(days=STATS_RETENTION_DAYS),))
+                if self.retention_days is not None:
+                    conn.execute("DELETE FROM dns_probes WHERE timestamp < ?",
+                                 (datetime.now() - timedelta(days=self.retention_days),))
+            if removed:
+                print(f"🧹 [DB] {removed} registro(s) brutos além da retenção removidos.")
+        except Exception as e:
+            print(f"❌ [DB] Falha na retenção: {e}")
+
+    def flush(self, timeout=None):
+        """Bloqueia até que tudo o que foi enfileirado antes desta chamada esteja gravado"""
+        if not self.buffered:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Drena a fila, encerra a thread gravadora e fecha a conexão"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self.conn.close()
+
+    @property
+    def queue_depth(self):
+        """Itens aguardando o gravador (telemetria do agente)"""
+        return self._queue.qsize()
+
+    # --- API DE CONSULTA ---
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = [row[1] for row in self.conn.execute("PRAGMA table_info(metrics)")]
+        return self._columns
+
+    def _build_query(self, start=None, end=None, hosts=None, statuses=None, columns=None,
+                     after_id=None, order="desc", limit=None):
+        columns = list(columns or self.columns)
+        unknown = set(columns) - set(self.columns)
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas em metrics: {sorted(unknown)}")
+
+        where, params = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("timestamp <= ?")
+            params.append(end)
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+        for column, values in (("target_host", hosts), ("status", statuses)):
+            if values:
+                values = [values] if isinstance(values, str) else list(values)
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+
+        sql = f"SELECT {', '.join(columns)} FROM metrics"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Faixa de tempo: ordena pelo índice de timestamp; cursor incremental: pela chave primária
+        key = "timestamp" if (start is not None or end is not None) and after_id is None else "id"
+        sql += f" ORDER BY {key} {'ASC' if order == 'asc' else 'DESC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return sql, params
+
+    def _stream(self, sql, params):
+        cursor = self.conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(QUERY_CHUNK)
+            if not rows:
+                break
+            yield from rows
+
+    def query(self, start=None, end=None, hosts=None, statuses=None, columns=None,
+              after_id=None, order="desc", limit=None):
+        """Consulta parametrizada em metrics; retorna um gerador de tuplas (na ordem de `columns`)"""
+        sql, params = self._build_query(start, end, hosts, statuses, columns, after_id, order, limit)
+        return self._stream(sql, params)
+
+    def explain(self, **kwargs):
+        """Plano do SQLite para uma consulta de query() (usado para garantir que não há varredura)"""
+        sql, params = self._build_query(**kwargs)
+        return [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    @staticmethod
+    def _rollup_where(resolution, start=None, end=None, hosts=None):
+        fmt = rollups.RESOLUTIONS[resolution][1]
+        where, params = [], []
+        if start is not None:
+            where.append("bucket >= ?")
+            params.append(start if isinstance(start, str) else start.strftime(fmt))
+        if end is not None:
+            where.append("bucket <= ?")
+            params.append(end if isinstance(end, str) else end.strftime(fmt))
+        if hosts:
+            hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+            where.append(f"target_host IN ({', '.join('?' * len(hosts))})")
+            params.extend(hosts)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def query_rollup(self, resolution, start=None, end=None, hosts=None):
+        """Baldes agregados (1m/1h/1d) com as colunas de rollups.ROLLUP_COLUMNS, mais recente primeiro"""
+        where, params = self._rollup_where(resolution, start, end, hosts)
+        return self._stream(rollups.rollup_select(resolution) + where + " ORDER BY bucket DESC", params)
+
+    def summarize(self, start, end, hosts=None, by_day=False):
+        """Totais do período (rollups.SUMMARY_COLUMNS) calculados no SQLite a partir dos agregados.
+
+        Sem by_day retorna um dict; com by_day, uma lista de dicts por dia (mais antigo primeiro).
+        """
+        resolution = rollups.summary_resolution(start)
+        where, params = self._rollup_where(resolution, start, end, hosts)
+        sql = rollups.summary_select(resolution, by_day) + where
+        if not by_day:
+            return dict(zip(rollups.SUMMARY_COLUMNS, self.conn.execute(sql, params).fetchone()))
+        columns = ["day", *rollups.SUMMARY_COLUMNS]
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql + " GROUP BY day ORDER BY day", params)]
+
+    def latency_percentiles(self, start, end, hosts=None, percentiles=sketch.PERCENTILES, by_day=False):
+        """Percentis do RTT de cada pacote em [start, end) somando os sketches dos agregados.
+
+        A faixa é coberta com o mínimo de baldes (rollups.cover): dias em 1d, horas
+        em 1h, pontas em 1m (baldes parciais nas pontas entram inteiros). Retorna {"samples": n, "p50": ..., ...} (valores None
+        sem sketches no período); com by_day, {dia 'AAAA-MM-DD': dict}.
+        """
+        if by_day:
+            days = {}
+            day = datetime.combine(start.date(), datetime.min.time())
+            while day < end:
+                following = day + timedelta(days=1)
+                days[day.date().isoformat()] = self.latency_percentiles(max(start, day), min(end, following),
+                                                                        hosts, percentiles)
+                day = following
+            return days
+        merged = sketch.DDSketch()
+        for resolution, first, stop in rollups.cover(start, end):
+            sql = (f"SELECT {rollups.SKETCH_COLUMN} FROM {rollups.table_for(resolution)} "
+                   f"WHERE bucket >= ? AND bucket < ? AND {rollups.SKETCH_COLUMN} IS NOT NULL")
+            params = [first.strftime(rollups.RESOLUTIONS[resolution][1]), stop.strftime('%Y-%m-%d %H:%M:%S')]
+            if hosts:
+                hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+                sql += f" AND target_host IN ({', '.join('?' * len(hosts))})"
+                params.extend(hosts)
+            for (blob,) in self.conn.execute(sql, params):
+                merged.merge_bytes(blob)
+        return {"samples": merged.count, **merged.percentiles(percentiles)}
+
+    def sla_summary(self, first_day, last_day, hosts=None, by_day=False):
+        """Disponibilidade de [first_day, last_day] pelos acumuladores diários (ver sla.summary)"""
+        if by_day:
+            return sla.daily(self.conn, first_day, last_day, hosts)
+        return sla.summary(self.conn, first_day, last_day, hosts)
+
+    def data_version(self, end=None):
+        """Id da última linha até `end`: muda sempre que o período ganha dados novos"""
+        if end is None:
+            row = self.conn.execute("SELECT MAX(id) FROM metrics").fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT id FROM metrics WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1", (end,)
+            ).fetchone()
+        return row[0] if row and row[0] is not None else 0
+
+    def query_range(self, start, end, hosts=None, max_points=1000, columns=None):
+        """Escolhe a resolução que cabe em max_points; retorna (resolução, colunas, gerador)"""
+        resolution = rollups.choose_resolution(start, end, max_points)
+        if resolution == "raw":
+            columns = list(columns or self.columns)
+            return resolution, columns, self.query(start=start, end=end, hosts=hosts, columns=columns)
+        return resolution, rollups.ROLLUP_COLUMNS, self.query_rollup(resolution, start, end, hosts)
+
+    def get_trace(self, ref):
+        """Texto do traceroute pela referência; a descompressão só acontece aqui"""
+        row = self.conn.execute("SELECT data FROM traces WHERE hash = ?", (ref,)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def latest_trace(self):
+        """(timestamp, trace_log) do último traceroute forense"""
+        row = self.conn.execute(
+            "SELECT timestamp, trace_ref FROM metrics WHERE id = "
+            "(SELECT MAX(id) FROM metrics WHERE trace_ref IS NOT NULL)"
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], self.get_trace(row[1])
+
+    def latest_throughput_test(self):
+        """Último teste de banda ativo como dict (None se nunca rodou)"""
+        row = self.conn.execute(
+            "SELECT timestamp, server, download_mbps, upload_mbps, error FROM throughput_tests "
+            "ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("timestamp", "server", "download_mbps", "upload_mbps", "error"), row))
+
+    def recent_anomalies(self, since, detector):
+        """Alertas de um detector a partir de `since`, mais recente primeiro"""
+        return [
+            {"timestamp": ts, "reason": reason, "score": score}
+            for ts, reason, score in self.conn.execute(
+                "SELECT timestamp, reason, score FROM anomalies WHERE detector = ? AND timestamp >= ? "
+                "ORDER BY timestamp DESC", (detector, since)
+            )
+        ]
+
+    def agent_stats(self, start):
+        """Snapshots da telemetria do agente desde `start`: (timestamp, name, labels, value)"""
+        return self.conn.execute(
+            "SELECT timestamp, name, labels, value FROM agent_stats WHERE timestamp >= ? ORDER BY timestamp",
+            (start,)
+        ).fetchall()
 
     def get_recent_data(self, limit=10):
-        cursor = self.conn.execute(f"SELECT * FROM metrics ORDER BY id DESC LIMIT {limit}")
-        return cursor.fetchall()
\ No newline at end of file
+        return list(self.query(limit=limit))
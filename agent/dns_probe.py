@@ -0,0 +1,106 @@
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import dns.message
+import dns.query
+import dns.rcode
+
+# Configurações da sondagem DNS
+DNS_RESOLVERS = ["8.8.8.8", "1.1.1.1"]  # "ip" ou "ip:porta" (ex: stub local "127.0.0.1:5353")
+DNS_NAMES = ["google.com"]
+DNS_TYPES = ["A", "AAAA"]
+DNS_TIMEOUT = 2.0                        # Segundos por consulta
+
+def split_server(server):
+    """'1.1.1.1' -> ('1.1.1.1', 53); '127.0.0.1:5353' -> ('127.0.0.1', 5353); IPv6 como '[::1]:53'"""
+    if server.startswith("["):
+        host, _, port = server[1:].partition("]:")
+        return host, int(port or 53)
+    if server.count(":") == 1:
+        host, port = server.split(":")
+        return host, int(port)
+    return server, 53
+
+class DnsFailure(Exception):
+    """Consulta sem resposta útil (timeout, erro de rede ou rcode diferente de NOERROR)"""
+
+class ResolverSocket:
+    """Socket UDP persistente para um resolvedor: reaproveitado entre ciclos.
+
+    Só uma consulta em voo por socket (lock); depois de um timeout o socket é
+    recriado, para que uma resposta atrasada não seja lida como a da próxima consulta.
+    """
+
+    def __init__(self, server):
+        self.host, self.port = split_server(server)
+        self.family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        self.sock = None
+        self._lock = threading.Lock()
+
+    def _socket(self):
+        if self.sock is None:
+            self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+        return self.sock
+
+    def query(self, name, rdtype='A', timeout=DNS_TIMEOUT):
+        """Tempo até a resposta em ms (perf_counter); levanta DnsFailure em caso de falha"""
+        request = dns.message.make_query(name, rdtype)
+        with self._lock:
+            try:
+                start = time.perf_counter()
+                response = dns.query.udp(request, self.host, timeout=timeout, port=self.port,
+                                         sock=self._socket(), ignore_unexpected=True)
+                elapsed = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                self.close()
+                raise DnsFailure(f"{type(e).__name__}: {e}") from e
+        if response.rcode() != dns.rcode.NOERROR:
+            raise DnsFailure(dns.rcode.to_text(response.rcode()))
+        return round(elapsed, 2)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+class DnsProbe:
+    """Consulta todos os (resolvedor, nome, tipo) ao mesmo tempo a cada ciclo.
+
+    As consultas passam por backend.resolve (rede real ou simulador). O resultado
+    principal do ciclo é a mediana das respostas bem-sucedidas; se todas
+    falharem é None (gravado como NULL, nunca como 0 ms).
+    """
+
+    def __init__(self, backend, resolvers=DNS_RESOLVERS, names=DNS_NAMES, types=DNS_TYPES,
+                 timeout=DNS_TIMEOUT):
+        self.backend = backend
+        self.queries = [(server, name, rdtype) for server in resolvers for name in names for rdtype in types]
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=len(self.queries), thread_name_prefix="dns")
+
+    def _query(self, server, name, rdtype):
+        try:
+            return self.backend.resolve(name, server, rdtype, timeout=self.timeout), None
+        except Exception as e:
+            return None, str(e) or type(e).__name__
+
+    def run(self):
+        """Executa o ciclo; retorna (ms ou None, lista de resultados por consulta)"""
+        timestamp = datetime.now()
+        futures = [self.executor.submit(self._query, *q) for q in self.queries]
+        wait(futures)
+        results = []
+        for (server, name, rdtype), future in zip(self.queries, futures):
+            response_ms, error = future.result()
+            results.append({"timestamp": timestamp, "server": server, "name": name, "rdtype": rdtype,
+                            "response_ms": response_ms, "error": error})
+        answered = [r['response_ms'] for r in results if r['response_ms'] is not None]
+        return (round(statistics.median(answered), 2) if answered else None), results
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,84 @@
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+# Servidor DNS mínimo para testar a sondagem sem rede (respostas fixas, atraso e perda configuráveis)
+STUB_HOST = "127.0.0.1"
+STUB_ANSWERS = {"A": "93.184.216.34", "AAAA": "2606:2800:220:1:248:1893:25c8:1946"}
+
+class StubHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        server = self.server
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        server.queries += 1
+        if server.drop and server.rng.random() < server.drop:
+            return  # Pacote "perdido": o cliente leva timeout
+        if server.delay:
+            time.sleep(server.delay)
+
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text().rstrip(".")
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        if name in server.nxdomain:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif rdtype in STUB_ANSWERS:
+            response.answer.append(dns.rrset.from_text(question.name, 60, "IN", rdtype, STUB_ANSWERS[rdtype]))
+        sock.sendto(response.to_wire(), self.client_address)
+
+class StubDnsServer(socketserver.ThreadingUDPServer):
+    """Resolvedor falso em loopback: `delay` (s) antes de responder, `drop` = fração ignorada"""
+    daemon_threads = True
+
+    def __init__(self, host=STUB_HOST, port=0, delay=0.0, drop=0.0, nxdomain=(), seed=0):
+        super().__init__((host, port), StubHandler)
+        self.delay = delay
+        self.drop = drop
+        self.nxdomain = set(nxdomain)
+        self.rng = random.Random(seed)
+        self.queries = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="sentinel-dns-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    @property
+    def address(self):
+        """Endereço no formato aceito por DNS_RESOLVERS ("ip:porta")"""
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor DNS falso para testes da sondagem")
+    parser.add_argument("--port", type=int, default=5353)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubDnsServer(port=args.port, delay=args.delay, drop=args.drop)
+    print(f"🧪 [DNS] Stub respondendo em {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Parado.")
+    finally:
+        server.close()
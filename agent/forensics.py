@@ -0,0 +1,123 @@
+import hashlib
+import platform
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurações da perícia (Traceroute)
+TRACE_WORKERS = 2          # Traceroutes simultâneos no máximo
+TRACE_MAX_PENDING = 4      # Pedidos além disso são descartados (o ciclo de coleta nunca espera)
+TRACE_MIN_INTERVAL = 60    # Segundos mínimos entre dois traces do mesmo alvo
+TRACE_TIMEOUT = 30         # Segundos até abortar o processo do traceroute
+
+HOP_RE = re.compile(r'^\s*(\d+)\s+(.*)$')
+IP_RE = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+PROBE_RE = re.compile(r'(<?\d+(?:[.,]\d+)?)\s*ms|\*')
+
+def run_traceroute(target):
+    """Roda um tracert/traceroute real para anexar como prova no relatório"""
+    if platform.system() == "Windows":
+        # -d: Não resolve nomes (mais rápido)
+        # -h 10: Máximo 10 saltos (suficiente para ver se saiu da operadora)
+        # -w 100: Timeout rápido
+        cmd = ["tracert", "-d", "-h", "10", "-w", "100", target]
+    else:
+        cmd = ["traceroute", "-n", "-m", "10", "-w", "1", "-q", "3", target]
+    try:
+        output = subprocess.check_output(cmd, timeout=TRACE_TIMEOUT, stderr=subprocess.STDOUT)
+        return output.decode('cp850', errors='ignore')
+    except Exception as e:
+        return f"Erro no traceroute: {e}"
+
+def parse_traceroute(output):
+    """Converte a saída do tracert (Windows) ou traceroute (Linux) em saltos estruturados"""
+    hops = []
+    for line in output.splitlines():
+        match = HOP_RE.match(line)
+        if not match:
+            continue
+        rest = match.group(2)
+        probes = PROBE_RE.findall(rest)
+        if not probes:
+            continue
+
+        # Mantém a posição de cada sonda: '*' = sonda sem resposta (None)
+        # "<1 ms" do Windows é registrado como 1 ms (limite superior)
+        rtts = [float(v.lstrip('<').replace(',', '.')) if v else None for v in probes]
+        lost = rtts.count(None)
+
+        ip_search = IP_RE.search(rest)
+        padded = (rtts + [None, None, None])[:3]
+        hops.append({
+            "hop": int(match.group(1)),
+            "ip": ip_search.group(0) if ip_search else None,
+            "rtt1": padded[0],
+            "rtt2": padded[1],
+            "rtt3": padded[2],
+            "loss": round(lost / len(rtts) * 100, 2)
+        })
+    return hops
+
+def trace_fingerprint(trace_log, hops):
+    """Chave de conteúdo do trace: hash da lista normalizada de saltos (ignora RTTs).
+
+    Durante um incidente os traces se repetem com RTTs ligeiramente diferentes;
+    pela rota eles viram uma única entrada armazenada.
+    """
+    if hops:
+        normalized = "|".join(f"{h['hop']}:{h['ip'] or '*'}" for h in hops)
+    else:
+        # Sem saltos reconhecidos (ex: erro do traceroute): usa o texto inteiro
+        normalized = trace_log.strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+class TracerouteWorker:
+    """Pool limitado que roda traceroutes fora do ciclo de coleta.
+
+    Ignora pedidos repetidos para um alvo que já tem trace em andamento e
+    respeita um intervalo mínimo por alvo, para que uma queda longa não vire
+    uma fila de traceroutes idênticos.
+    """
+
+    def __init__(self, db, runner=run_traceroute, max_workers=TRACE_WORKERS,
+                 max_pending=TRACE_MAX_PENDING, min_interval=TRACE_MIN_INTERVAL):
+        self.db = db
+        self.runner = runner
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trace")
+        self._lock = threading.Lock()
+        self._active = set()
+        self._last_start = {}
+
+    def submit(self, target, metric_ticket):
+        """Agenda um trace vinculado à métrica; retorna False se o pedido foi descartado"""
+        now = time.monotonic()
+        with self._lock:
+            if target in self._active:
+                return False
+            if now - self._last_start.get(target, float('-inf')) < self.min_interval:
+                return False
+            if len(self._active) >= self.max_pending:
+                return False
+            self._active.add(target)
+            self._last_start[target] = now
+        self.executor.submit(self._run, target, metric_ticket)
+        return True
+
+    def _run(self, target, metric_ticket):
+        try:
+            print(f"🕵️ EXECUTANDO TRACEROUTE FORENSE em background ({target})...")
+            output = self.runner(target)
+            self.db.save_trace(metric_ticket, output, parse_traceroute(output))
+            print(f"🕵️ Evidência de Traceroute capturada ({target}).")
+        except Exception as e:
+            print(f"❌ Falha no traceroute forense ({target}): {e}")
+        finally:
+            with self._lock:
+                self._active.discard(target)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
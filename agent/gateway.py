@@ -0,0 +1,125 @@
+import platform
+import re
+import socket
+import struct
+import subprocess
+import time
+
+ROUTE_FILE = "/proc/net/route"
+GATEWAY_TTL = 300  # Revalida o Gateway no máximo a cada 5 minutos
+FAILURE_TTL = 10   # Sem Gateway encontrado: tenta de novo no próximo ciclo
+
+RTF_UP = 0x1
+RTF_GATEWAY = 0x2
+RTMGRP_IPV4_ROUTE = 0x40
+
+def parse_proc_route(text):
+    """Extrai (gateway_ip, interface) da rota padrão de menor métrica em /proc/net/route"""
+    best = None
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 8:
+            continue
+        iface, destination, gateway, flags, metric = fields[0], fields[1], fields[2], fields[3], fields[6]
+        flags = int(flags, 16)
+        if destination != "00000000" or not (flags & RTF_UP) or not (flags & RTF_GATEWAY):
+            continue
+        # O kernel escreve o endereço em hexadecimal little-endian
+        ip = socket.inet_ntoa(struct.pack("<L", int(gateway, 16)))
+        if best is None or int(metric) < best[0]:
+            best = (int(metric), ip, iface)
+    return (best[1], best[2]) if best else (None, None)
+
+def parse_ipconfig(text):
+    """Busca o IP do Gateway Padrão na saída do ipconfig (Windows)"""
+    for line in text.split('\n'):
+        if "Gateway" in line or "Padrão" in line:
+            ip_search = re.search(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', line)
+            if ip_search:
+                return ip_search.group(0)
+    return None
+
+class RouteWatcher:
+    """Sinaliza mudanças na tabela de rotas do Linux via netlink (sem polling de processo)"""
+
+    def __init__(self):
+        self.sock = None
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            self.sock.bind((0, RTMGRP_IPV4_ROUTE))
+            self.sock.setblocking(False)
+        except (AttributeError, OSError):
+            self.sock = None
+
+    @property
+    def available(self):
+        return self.sock is not None
+
+    def changed(self):
+        """Drena as notificações pendentes; True se alguma rota mudou desde a última chamada"""
+        changed = False
+        while True:
+            try:
+                if not self.sock.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Overflow do buffer (ENOBUFS) também significa que algo mudou
+                changed = True
+                break
+        return changed
+
+class GatewayResolver:
+    """Descobre o Gateway Padrão e mantém em cache até a rota mudar ou o TTL expirar"""
+
+    def __init__(self, ttl=GATEWAY_TTL, route_file=ROUTE_FILE):
+        self.ttl = ttl
+        self.route_file = route_file
+        self.is_linux = platform.system() == "Linux"
+        self.watcher = RouteWatcher() if self.is_linux else None
+        self.gateway_ip = None
+        self.interface = None
+        self._expires = 0
+        self._routes = None
+
+    def _read_routes(self):
+        try:
+            with open(self.route_file) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _is_stale(self):
+        if time.monotonic() >= self._expires:
+            return True
+        if not self.is_linux:
+            return False
+        if self.watcher.available:
+            return self.watcher.changed()
+        # Sem netlink: relê a tabela (poucas linhas) e compara o conteúdo. stat não serve:
+        # no procfs o tamanho é sempre 0 e o mtime é a hora da consulta
+        return self._read_routes() != self._routes
+
+    def _resolve(self):
+        if self.is_linux:
+            self._routes = self._read_routes()
+            return parse_proc_route(self._routes) if self._routes is not None else (None, None)
+        try:
+            # Executa ipconfig direto (sem shell) e busca a linha do Gateway Padrão
+            result = subprocess.check_output(["ipconfig"]).decode('cp850', errors='ignore') # cp850 é comum no CMD pt-br
+            return parse_ipconfig(result), None
+        except Exception:
+            return None, None
+
+    def get(self):
+        if self._is_stale():
+            self.gateway_ip, self.interface = self._resolve()
+            # Falha na descoberta (ex: cabo desconectado) é revalidada logo
+            ttl = self.ttl if self.gateway_ip else min(self.ttl, FAILURE_TTL)
+            self._expires = time.monotonic() + ttl
+        return self.gateway_ip
+
+    def invalidate(self):
+        self._expires = 0
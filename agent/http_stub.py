@@ -0,0 +1,121 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Servidor HTTP mínimo para testar o teste de banda ativo sem internet (taxa limitada configurável)
+STUB_HOST = "127.0.0.1"
+DEFAULT_BYTES = 10_000_000
+CHUNK = 64 * 1024
+
+class StubHttpHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # Silencioso: o teste não quer uma linha por requisição
+
+    def _throttle(self, sent, start):
+        """Espera o suficiente para não passar de rate_mbps"""
+        rate = self.server.rate_mbps
+        if rate:
+            ahead = sent * 8 / (rate * 1e6) - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def do_GET(self):
+        """/download?bytes=N: N bytes de zeros"""
+        query = parse_qs(urlparse(self.path).query)
+        total = int(query.get("bytes", [DEFAULT_BYTES])[0])
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(total))
+        self.end_headers()
+        block = bytes(CHUNK)
+        sent, start = 0, time.perf_counter()
+        try:
+            while sent < total:
+                size = min(CHUNK, total - sent)
+                self.wfile.write(block[:size])
+                sent += size
+                self._throttle(sent, start)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Cliente parou no limite de tempo
+        self.server.bytes_sent += sent
+
+    def _body(self):
+        """Lê e descarta o corpo (Content-Length ou chunked); retorna os bytes recebidos"""
+        received, start = 0, time.perf_counter()
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return received
+                while size:
+                    data = self.rfile.read(min(CHUNK, size))
+                    size -= len(data)
+                    received += len(data)
+                    self._throttle(received, start)
+                self.rfile.readline()
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            data = self.rfile.read(min(CHUNK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            received += len(data)
+            self._throttle(received, start)
+        return received
+
+    def do_POST(self):
+        """/upload: descarta o corpo e responde com o total recebido"""
+        received = self._body()
+        self.server.requests += 1
+        self.server.bytes_received += received
+        body = str(received).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StubHttpServer(ThreadingHTTPServer):
+    """Servidor de teste de banda falso em loopback: `rate_mbps` limita a taxa nos dois sentidos"""
+    daemon_threads = True
+
+    def __init__(self, host=STUB_HOST, port=0, rate_mbps=None):
+        super().__init__((host, port), StubHttpHandler)
+        self.rate_mbps = rate_mbps
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="sentinel-http-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def url(self, path="/"):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP falso para o teste de banda ativo")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--rate", type=float, default=None, help="limite em Mbps (padrão: sem limite)")
+    args = parser.parse_args()
+
+    server = StubHttpServer(port=args.port, rate_mbps=args.rate)
+    print(f"🧪 [HTTP] Stub de banda em {server.url('/download?bytes=50000000')} e {server.url('/upload')}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Parado.")
+    finally:
+        server.close()
@@ -0,0 +1,218 @@
+import argparse
+import base64
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database import SentinelDB
+from sketch import DDSketch
+from stream_detector import StreamDetector, DETECTOR
+
+# Servidor de ingestão da frota: agentes enviam lotes JSON (gzip) via POST
+INGEST_HOST = "127.0.0.1"
+INGEST_PORT = 8765
+INGEST_PATH = "/ingest"
+INGEST_TOKEN = None             # Se definido, agentes precisam mandar o mesmo valor em X-Sentinel-Token
+MAX_BODY = 8 * 1024 * 1024      # Tamanho máximo do corpo (comprimido e descomprimido)
+ACK_TIMEOUT = 30                # Segundos esperando o lote ser gravado antes de responder
+SERVER_BATCH_SIZE = 500         # Lotes maiores no gravador: muitos agentes escrevendo ao mesmo tempo
+HOST_SEPARATOR = "/"            # target_host gravado como "<agente>/<alvo>"
+
+AGENT_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+NUMERIC_FIELDS = ["ping", "jitter", "rtp_jitter", "packet_loss", "download", "upload", "dns", "gateway_ping"]
+
+AGENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_agents (
+    agent_id TEXT PRIMARY KEY,
+    epoch TEXT,
+    last_seq INTEGER,
+    last_seen DATETIME,
+    rows INTEGER DEFAULT 0
+)
+"""
+
+def qualified_host(agent_id, host):
+    # Agregados, SLA e faixas sazonais são por target_host: cada agente tem os seus
+    return f"{agent_id}{HOST_SEPARATOR}{host}"
+
+def parse_row(agent_id, row):
+    """Converte uma linha recebida no dict aceito por SentinelDB.save_metric (None se inválida)"""
+    try:
+        data = {field: (None if row.get(field) is None else float(row[field])) for field in NUMERIC_FIELDS}
+        data['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        data['host'] = qualified_host(agent_id, str(row['host']))
+        data['status'] = str(row.get('status') or "OK")
+        data['agent_id'] = agent_id
+        if row.get('ping_sketch') is not None:
+            data['ping_sketch'] = base64.b64decode(row['ping_sketch'], validate=True)
+            DDSketch.from_bytes(data['ping_sketch'])  # Sketch inválido derrubaria o upsert dos agregados
+        return int(row['seq']), data
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def decompress(body, limit=MAX_BODY):
+    """gzip com limite de tamanho descomprimido (protege contra 'bombas' de compressão)"""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(body, limit)
+    if inflater.unconsumed_tail:
+        raise ValueError("corpo descomprimido excede o limite")
+    return data
+
+class IngestHandler(BaseHTTPRequestHandler):
+    server_version = "SentinelIngest/1.0"
+
+    def _reply(self, code, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != INGEST_PATH:
+            return self._reply(404, {"error": "not found"})
+        if self.server.token and self.headers.get("X-Sentinel-Token") != self.server.token:
+            return self._reply(401, {"error": "token inválido"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY:
+            return self._reply(413, {"error": "tamanho do corpo inválido"})
+
+        try:
+            body = self.rfile.read(length)
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = decompress(body)
+            payload = json.loads(body)
+            agent_id = payload['agent_id']
+            epoch = payload.get('epoch')
+            rows = payload['metrics']
+            if not isinstance(agent_id, str) or not AGENT_ID_RE.match(agent_id) or not isinstance(rows, list):
+                raise ValueError("agent_id ou metrics inválidos")
+            if epoch is not None and (not isinstance(epoch, str) or not AGENT_ID_RE.match(epoch)):
+                raise ValueError("epoch inválida")
+        except (ValueError, KeyError, TypeError, OSError, zlib.error) as e:
+            return self._reply(400, {"error": str(e)})
+
+        try:
+            result = self.server.ingest(agent_id, rows, epoch)
+        except Exception as e:
+            # Nada confirmado: o agente mantém o lote no spool e reenvia depois
+            print(f"❌ [INGEST] Falha ao gravar lote de {agent_id}: {e}")
+            return self._reply(503, {"error": "falha ao gravar"})
+        self._reply(200, result)
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha de log por requisição (centenas de agentes)
+
+class IngestServer(ThreadingHTTPServer):
+    """Recebe lotes dos agentes e grava no banco compartilhado pelo gravador em lote do SentinelDB.
+
+    Cada linha traz um `seq` crescente por agente; linhas com seq já confirmado
+    são ignoradas, então reenvios do spool (ex: resposta perdida) não duplicam dados.
+    O seq vale dentro da época do spool do agente: spool apagado chega com outra
+    época e seq desde 1, e a contagem do agente recomeça em vez de descartar tudo.
+    """
+    daemon_threads = True
+    request_queue_size = 256  # Muitos agentes conectando ao mesmo tempo
+
+    def __init__(self, db_path="fleet_data.db", host=INGEST_HOST, port=INGEST_PORT, token=INGEST_TOKEN):
+        super().__init__((host, port), IngestHandler)
+        self.token = token
+        self.db = SentinelDB(db_path, batch_size=SERVER_BATCH_SIZE)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        with self.conn:
+            self.conn.execute(AGENTS_SCHEMA)
+            # Banco de versão anterior: sem época, o primeiro lote de cada agente a registra
+            if "epoch" not in [row[1] for row in self.conn.execute("PRAGMA table_info(ingest_agents)")]:
+                self.conn.execute("ALTER TABLE ingest_agents ADD COLUMN epoch TEXT")
+        self.last_seq = {agent_id: (epoch, seq) for agent_id, epoch, seq
+                         in self.conn.execute("SELECT agent_id, epoch, last_seq FROM ingest_agents")}
+        # Detecção na ingestão: cada "<agente>/<alvo>" tem seu próprio estado
+        self.detector = StreamDetector()
+        self.detector.load(self.conn)
+        self._agent_locks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _agent_lock(self, agent_id):
+        with self._lock:
+            return self._agent_locks.setdefault(agent_id, threading.Lock())
+
+    def ingest(self, agent_id, rows, epoch=None):
+        # Lotes do mesmo agente em série: a deduplicação por seq não tem corrida
+        with self._agent_lock(agent_id):
+            known, last = self.last_seq.get(agent_id, (epoch, 0))
+            if known != epoch:
+                last = 0  # Spool novo do agente: o seq recomeçou em 1
+            fresh, rejected = [], 0
+            for row in rows:
+                parsed = parse_row(agent_id, row) if isinstance(row, dict) else None
+                if parsed is None:
+                    rejected += 1
+                elif parsed[0] > last:
+                    fresh.append(parsed)
+            fresh.sort(key=lambda item: item[0])
+
+            tickets = [self.db.save_metric(data) for _, data in fresh]
+            if tickets:
+                # Só confirma depois que o gravador fez o commit de todas as linhas
+                for ticket in tickets:
+                    ticket.result(timeout=ACK_TIMEOUT)
+                # O detector só avança com o lote gravado: se a gravação falhar, o agente reenvia
+                # o lote e as mesmas amostras não entram duas vezes na estatística
+                for ticket, (_, data) in zip(tickets, fresh):
+                    for score, reason in self.detector.update(data['host'], data):
+                        self.db.save_anomaly(ticket, data['timestamp'], DETECTOR, round(score, 2), reason)
+                hosts = {data['host'] for _, data in fresh}
+                self.db.save_stream_state(self.detector.state_rows(datetime.now(), hosts))
+                last = fresh[-1][0]
+                self.last_seq[agent_id] = (epoch, last)
+                with self._lock, self.conn:
+                    self.conn.execute("""
+                    INSERT INTO ingest_agents (agent_id, epoch, last_seq, last_seen, rows) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (agent_id) DO UPDATE SET epoch = excluded.epoch,
+                        last_seq = excluded.last_seq, last_seen = excluded.last_seen, rows = rows + excluded.rows
+                    """, (agent_id, epoch, last, datetime.now(), len(tickets)))
+            return {"accepted": len(tickets), "duplicates": len(rows) - len(tickets) - rejected,
+                    "rejected": rejected, "last_seq": last}
+
+    def start(self):
+        """Atende em segundo plano (testes e benchmarks em loopback)"""
+        self._thread = threading.Thread(target=self.serve_forever, name="sentinel-ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+        self.db.close()
+        self.conn.close()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{INGEST_PATH}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de ingestão da frota de agentes Sentinel")
+    parser.add_argument("--db", default="fleet_data.db")
+    parser.add_argument("--host", default=INGEST_HOST)
+    parser.add_argument("--port", type=int, default=INGEST_PORT)
+    parser.add_argument("--token", default=INGEST_TOKEN)
+    args = parser.parse_args()
+
+    server = IngestServer(args.db, args.host, args.port, args.token)
+    print(f"🛰️ [INGEST] Recebendo lotes em {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Parado.")
+    finally:
+        server.close()
@@ -0,0 +1,167 @@
+import math
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+
+# Anel de amostras ao vivo: arquivo mapeado em memória, um escritor (o agente) e N leitores
+RING_CAPACITY = 1024   # Registros no anel (~3h de um alvo a cada 10s)
+RING_SUFFIX = "-live"  # Ao lado do banco, como o -wal/-shm do SQLite
+RING_MAGIC = b"SNTLRING"
+RING_VERSION = 1
+
+# Cabeçalho (64 bytes): magic, versão, tamanho do registro, capacidade, sequência do último registro
+HEADER = struct.Struct("<8sIII4xQ")
+HEADER_SIZE = 64
+SEQ_OFFSET = 24
+# Registro (128 bytes): seq, timestamp (epoch), ping, jitter, perda, dns, gateway (NaN = sem medida), status, alvo
+RECORD = struct.Struct("<Qd5d24s48s")
+SEQ = struct.Struct("<Q")
+SAMPLE_KEYS = ("ping", "jitter", "packet_loss", "dns", "gateway_ping")
+READ_RETRIES = 3
+
+def ring_path(db_path):
+    return f"{db_path}{RING_SUFFIX}"
+
+def _float(value):
+    return math.nan if value is None else float(value)
+
+def _value(value):
+    return None if value != value else value  # NaN -> None
+
+def _text(raw):
+    return raw.rstrip(b"\0").decode("utf-8", "replace")
+
+class LiveRing:
+    """Lado do agente: publica cada amostra no anel (sem SQLite, sem lock entre processos).
+
+    Cada registro leva a própria sequência. O escritor zera a sequência do slot,
+    grava os dados, grava a sequência nova e só então avança a do cabeçalho; o
+    leitor confere a sequência do slot antes e depois de ler (seqlock) e descarta
+    leituras rasgadas. Um único escritor por arquivo.
+    """
+
+    def __init__(self, path, capacity=RING_CAPACITY):
+        self.path = path
+        size = HEADER_SIZE + capacity * RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            current = os.fstat(fd).st_size
+            header = os.pread(fd, HEADER.size, 0) if current >= HEADER_SIZE and hasattr(os, "pread") else b""
+            if current != size:
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.capacity = capacity
+        layout = (RING_MAGIC, RING_VERSION, RECORD.size, capacity)
+        if len(header) == HEADER.size and HEADER.unpack(header)[:4] == layout and current == size:
+            self.seq = HEADER.unpack(header)[4]  # Mesmo layout: continua a sequência (leitores não percebem o reinício)
+        else:
+            self.mm[:] = bytes(size)
+            self.seq = 0
+            HEADER.pack_into(self.mm, 0, *layout, 0)
+
+    def publish(self, data):
+        """Grava a amostra (dict do agente) no próximo slot"""
+        seq = self.seq + 1
+        offset = HEADER_SIZE + (seq - 1) % self.capacity * RECORD.size
+        SEQ.pack_into(self.mm, offset, 0)  # Slot em escrita: leitores descartam
+        RECORD.pack_into(
+            self.mm, offset, 0, data['timestamp'].timestamp(),
+            *(_float(data.get(key)) for key in SAMPLE_KEYS),
+            str(data.get('status', ''))[:24].encode(), str(data['host']).encode()[:48],
+        )
+        SEQ.pack_into(self.mm, offset, seq)
+        SEQ.pack_into(self.mm, SEQ_OFFSET, seq)
+        self.seq = seq
+
+    def close(self):
+        self.mm.close()
+
+class LiveRingReader:
+    """Lado do dashboard: lê as últimas amostras direto do mapeamento, sem cópia do arquivo e sem lock.
+
+    Se o arquivo ainda não existe (agente parado ou banco da frota) retorna
+    lista vazia; o chamador cai no banco.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mm = None
+        self.capacity = 0
+        self._lock = threading.Lock()  # Só para (re)abrir: a leitura em si não trava
+
+    def _open(self):
+        mm = self.mm
+        if mm is not None and self._layout_ok(mm):
+            return mm
+        with self._lock:
+            if self.mm is not None and self._layout_ok(self.mm):
+                return self.mm
+            self.close()
+            try:
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None  # Inexistente ou vazio
+            if not self._layout_ok(mm):
+                mm.close()
+                return None
+            self.capacity = HEADER.unpack_from(mm, 0)[3]
+            self.mm = mm
+            return mm
+
+    @staticmethod
+    def _layout_ok(mm):
+        if len(mm) < HEADER_SIZE:
+            return False
+        magic, version, record_size, capacity, _ = HEADER.unpack_from(mm, 0)
+        return (magic, version, record_size) == (RING_MAGIC, RING_VERSION, RECORD.size) \
+            and len(mm) == HEADER_SIZE + capacity * RECORD.size
+
+    @property
+    def seq(self):
+        """Sequência do último registro publicado (0 = nenhum)"""
+        mm = self._open()
+        return SEQ.unpack_from(mm, SEQ_OFFSET)[0] if mm is not None else 0
+
+    def _read(self, mm, seq):
+        offset = HEADER_SIZE + (seq - 1) % self.capacity * RECORD.size
+        for _ in range(READ_RETRIES):
+            if SEQ.unpack_from(mm, offset)[0] != seq:
+                return None  # Sobrescrito (leitor ficou para trás) ou em escrita
+            record = RECORD.unpack_from(mm, offset)
+            if SEQ.unpack_from(mm, offset)[0] == seq:
+                break
+        else:
+            return None
+        _, ts, ping, jitter, loss, dns, gateway, status, host = record
+        return {"seq": seq, "timestamp": datetime.fromtimestamp(ts), "target_host": _text(host),
+                "ping_ms": _value(ping), "jitter_ms": _value(jitter), "packet_loss": _value(loss),
+                "dns_response_ms": _value(dns), "gateway_ping_ms": _value(gateway), "status": _text(status)}
+
+    def latest(self, n=1, host=None):
+        """Até n registros mais recentes (do mais novo para o mais antigo), opcionalmente de um alvo"""
+        mm = self._open()
+        if mm is None:
+            return []
+        rows = []
+        seq = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+        for s in range(seq, max(seq - self.capacity, 0), -1):
+            row = self._read(mm, s)
+            if row is None:
+                if s < seq:
+                    break  # O escritor já deu a volta no anel
+                continue
+            if host is None or row['target_host'] == host:
+                rows.append(row)
+                if len(rows) == n:
+                    break
+        return rows
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
@@ -0,0 +1,129 @@
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from ping3 import ping
+import sketch
+from telemetry import telemetry
+
+# Configurações do motor de sondagem
+PROBE_INTERVAL = 0.1   # Intervalo fixo entre envios (s), independente da resposta
+PROBE_TIMEOUT = 1      # Timeout de cada ICMP (s)
+GATEWAY_TIMEOUT = 0.5  # Timeout do ping interno (s)
+GATEWAY_COUNT = 5      # Amostras enviadas ao Gateway por ciclo
+RTP_JITTER_GAIN = 1 / 16  # Ganho do estimador de jitter entre chegadas (RFC 3550, seção 6.4.1)
+
+class ProbeEngine:
+    """Dispara as séries ICMP do Gateway e de todos os alvos ao mesmo tempo (asyncio).
+
+    Cada série envia um pacote a cada `interval` segundos sem esperar a resposta
+    do anterior, então o ciclo dura aproximadamente count * interval + timeout,
+    limitado pelo alvo mais lento e não pela soma de todos.
+    """
+
+    def __init__(self, ping_func=ping, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT, max_workers=64):
+        self.ping_func = ping_func
+        self.interval = interval
+        self.timeout = timeout
+        # ping3 é bloqueante: cada envio em voo ocupa uma thread do pool
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+        # Jitter RFC 3550 é um estimador contínuo: o estado de cada alvo passa de um ciclo para o outro
+        self.rtp_state = {}
+
+    def _ping_once(self, host, timeout):
+        telemetry.inc("probes_sent_total")
+        try:
+            res = self.ping_func(host, unit='ms', timeout=timeout)
+        except Exception:
+            telemetry.inc("probe_errors_total")
+            return None
+        # ping3 retorna None (timeout) ou False (erro de resolução/envio)
+        if res is None or res is False:
+            telemetry.inc("probe_errors_total" if res is False else "probe_timeouts_total")
+            return None
+        return res
+
+    async def probe_series(self, host, count, timeout=None):
+        """Envia `count` pings em cadência fixa e retorna a lista de RTTs (None = perdido)"""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pending = []
+        for i in range(count):
+            # Agenda pelo relógio do loop (sem acumular atraso de cada resposta)
+            delay = start + i * self.interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(loop.run_in_executor(self.executor, self._ping_once, host, timeout))
+        return await asyncio.gather(*pending)
+
+    async def _run_cycle(self, targets, count, gateway_ip):
+        series = [self.probe_series(host, count) for host in targets]
+        if gateway_ip:
+            series.append(self.probe_series(gateway_ip, GATEWAY_COUNT, GATEWAY_TIMEOUT))
+        results = await asyncio.gather(*series)
+
+        gateway_ping = 0
+        if gateway_ip:
+            g_samples = [r for r in results.pop() if r is not None]
+            gateway_ping = round(statistics.mean(g_samples), 2) if g_samples else 999
+
+        health = []
+        for host, samples in zip(targets, results):
+            self.rtp_state[host] = interarrival_jitter(samples, *self.rtp_state.get(host, (0.0, None)))
+            health.append(summarize(host, samples, count, gateway_ping, gateway_ip, self.rtp_state[host][0]))
+        return health
+
+    def run_cycle(self, targets, count, gateway_ip=None):
+        """Executa um ciclo completo de medição e retorna um dict de saúde por alvo"""
+        return asyncio.run(self._run_cycle(list(targets), count, gateway_ip))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+def interarrival_jitter(samples, jitter=0.0, last=None):
+    """Jitter entre chegadas da RFC 3550: J += (|D| - J) / 16 a cada resposta, em ordem de envio.
+
+    Com envios em cadência fixa, D entre duas respostas é a diferença dos RTTs
+    (o intervalo de envio se cancela). Pacotes perdidos são pulados. Retorna
+    (jitter, último RTT) para continuar no próximo ciclo.
+    """
+    for rtt in samples:
+        if rtt is None:
+            continue
+        if last is not None:
+            jitter += (abs(rtt - last) - jitter) * RTP_JITTER_GAIN
+        last = rtt
+    return jitter, last
+
+def summarize(host, samples, count, gateway_ping, gateway_ip, rtp_jitter=None):
+    """Reduz a série de RTTs ao formato de saúde usado pelo agente (a distribuição vai no sketch)"""
+    latencies = [s for s in samples if s is not None]
+    lost = count - len(latencies)
+    packet_loss_pct = (lost / count) * 100 if count else 0
+
+    if not latencies:
+        # Alvo inacessível: nenhuma resposta no ciclo
+        return {
+            "ping": None,
+            "jitter": None,
+            "rtp_jitter": None,
+            "ping_sketch": None,
+            "packet_loss": round(packet_loss_pct, 2),
+            "gateway_ping": gateway_ping,
+            "gateway_ip": gateway_ip,
+            "host": host
+        }
+
+    avg_ping = statistics.mean(latencies)
+    jitter = statistics.stdev(latencies) if len(latencies) > 1 else 0
+
+    return {
+        "ping": round(avg_ping, 2),
+        "jitter": round(jitter, 2),
+        "rtp_jitter": None if rtp_jitter is None else round(rtp_jitter, 2),
+        "ping_sketch": sketch.encode(latencies),
+        "packet_loss": round(packet_loss_pct, 2),
+        "gateway_ping": gateway_ping,
+        "gateway_ip": gateway_ip,
+        "host": host
+    }
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta
+
+# Resoluções agregadas (nome -> segundos por balde) e formato do início do balde
+RESOLUTIONS = {
+    "1m": (60, '%Y-%m-%d %H:%M:00'),
+    "1h": (3600, '%Y-%m-%d %H:00:00'),
+    "1d": (86400, '%Y-%m-%d 00:00:00'),
+}
+RAW_PERIOD = 10  # Segundos entre amostras brutas do agente
+
+# Retenção em dias (None = para sempre)
+RAW_RETENTION_DAYS = 30
+ROLLUP_RETENTION_DAYS = {"1m": 90, "1h": 730, "1d": None}
+
+ROLLUP_METRICS = [
+    "ping_ms", "jitter_ms", "packet_loss", "dns_response_ms",
+    "gateway_ping_ms", "download_mbps", "upload_mbps", "rtp_jitter_ms"
+]
+# Distribuição dos RTTs de cada pacote (sketch.DDSketch): somada balde a balde nos agregados
+SKETCH_COLUMN = "ping_sketch"
+STATUSES = {
+    "status_ok": "OK",
+    "status_packet_loss": "PACKET_LOSS",
+    "status_isp_latency": "ISP_LATENCY",
+    "status_internal": "INTERNAL_WIFI_ISSUE",
+    "status_unreachable": "UNREACHABLE",
+}
+
+def table_for(resolution):
+    return f"metrics_{resolution}"
+
+def metric_columns(metric):
+    """Definições das colunas de estatística de uma métrica nos baldes"""
+    return [f"{metric}_count INTEGER DEFAULT 0", f"{metric}_min REAL", f"{metric}_max REAL",
+            f"{metric}_sum REAL DEFAULT 0", f"{metric}_sumsq REAL DEFAULT 0"]
+
+def _schema(resolution):
+    metric_cols = ",\n".join(f"    {', '.join(metric_columns(m))}" for m in ROLLUP_METRICS)
+    status_cols = ",\n".join(f"    {col} INTEGER DEFAULT 0" for col in [*STATUSES, "status_other"])
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_for(resolution)} (
+        bucket DATETIME,
+        target_host TEXT,
+        count INTEGER DEFAULT 0,
+    {metric_cols},
+        loss_events INTEGER DEFAULT 0,
+    {status_cols},
+        {SKETCH_COLUMN} BLOB,
+        PRIMARY KEY (bucket, target_host)
+    )
+    """
+
+def _upsert_sql(resolution):
+    """INSERT ... SELECT agregando linhas brutas de metrics e somando ao balde existente"""
+    _, fmt = RESOLUTIONS[resolution]
+    table = table_for(resolution)
+
+    cols = ["bucket", "target_host", "count"]
+    selects = [f"strftime('{fmt}', timestamp) AS bucket", "target_host", "COUNT(*)"]
+    updates = ["count = count + excluded.count"]
+    for m in ROLLUP_METRICS:
+        cols += [f"{m}_count", f"{m}_min", f"{m}_max", f"{m}_sum", f"{m}_sumsq"]
+        selects += [f"COUNT({m})", f"MIN({m})", f"MAX({m})", f"TOTAL({m})", f"TOTAL({m} * {m})"]
+        updates += [
+            f"{m}_count = {m}_count + excluded.{m}_count",
+            # MIN/MAX escalares do SQLite retornam NULL se um lado for NULL
+            f"{m}_min = MIN(COALESCE({m}_min, excluded.{m}_min), COALESCE(excluded.{m}_min, {m}_min))",
+            f"{m}_max = MAX(COALESCE({m}_max, excluded.{m}_max), COALESCE(excluded.{m}_max, {m}_max))",
+            f"{m}_sum = {m}_sum + excluded.{m}_sum",
+            f"{m}_sumsq = {m}_sumsq + excluded.{m}_sumsq",
+        ]
+    cols.append("loss_events")
+    selects.append("SUM(packet_loss > 0)")
+    updates.append("loss_events = loss_events + excluded.loss_events")
+    for col, status in STATUSES.items():
+        cols.append(col)
+        selects.append(f"SUM(status = '{status}')")
+        updates.append(f"{col} = {col} + excluded.{col}")
+    known = ", ".join(f"'{s}'" for s in STATUSES.values())
+    cols.append("status_other")
+    selects.append(f"SUM(COALESCE(status, '') NOT IN ({known}))")
+    updates.append("status_other = status_other + excluded.status_other")
+    # Funções registradas por sketch.register (SentinelDB.configure)
+    cols.append(SKETCH_COLUMN)
+    selects.append(f"sketch_agg({SKETCH_COLUMN})")
+    updates.append(f"{SKETCH_COLUMN} = sketch_merge({SKETCH_COLUMN}, excluded.{SKETCH_COLUMN})")
+
+    # "WHERE true" desfaz a ambiguidade do parser entre INSERT...SELECT e ON CONFLICT
+    return f"""
+    INSERT INTO {table} ({", ".join(cols)})
+    SELECT {", ".join(selects)}
+    FROM metrics WHERE id BETWEEN ? AND ? AND true
+    GROUP BY bucket, target_host
+    ON CONFLICT (bucket, target_host) DO UPDATE SET {", ".join(updates)}
+    """
+
+UPSERT_SQL = {res: _upsert_sql(res) for res in RESOLUTIONS}
+
+def ensure_schema(conn):
+    """Cria as tabelas agregadas; se forem novas num banco com histórico, reconstrói"""
+    created = False
+    for res in RESOLUTIONS:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_for(res),)
+        ).fetchone()
+        if not exists:
+            conn.execute(_schema(res))
+            created = True
+    if created:
+        rebuild(conn)
+
+def apply_range(conn, first_id, last_id):
+    """Soma as linhas brutas [first_id, last_id] recém-gravadas aos baldes 1m/1h/1d"""
+    for res in RESOLUTIONS:
+        conn.execute(UPSERT_SQL[res], (first_id, last_id))
+
+def rebuild(conn):
+    """Recalcula todos os baldes a partir das linhas brutas existentes"""
+    for res in RESOLUTIONS:
+        conn.execute(f"DELETE FROM {table_for(res)}")
+    bounds = conn.execute("SELECT MIN(id), MAX(id) FROM metrics").fetchone()
+    if bounds[0] is not None:
+        apply_range(conn, *bounds)
+
+def purge(conn, raw_days=RAW_RETENTION_DAYS, rollup_days=ROLLUP_RETENTION_DAYS, now=None):
+    """Retenção em camadas: apaga linhas brutas antigas e baldes além do prazo de cada resolução"""
+    now = now or datetime.now()
+    removed = 0
+    if raw_days is not None:
+        cutoff = now - timedelta(days=raw_days)
+        conn.execute(
+            "DELETE FROM trace_hops WHERE metric_id IN (SELECT id FROM metrics WHERE timestamp < ?)",
+            (cutoff,)
+        )
+        removed = conn.execute("DELETE FROM metrics WHERE timestamp < ?", (cutoff,)).rowcount
+        if removed:
+            # Traces que nenhuma linha restante referencia
+            conn.execute(
+                "DELETE FROM traces WHERE hash NOT IN (SELECT trace_ref FROM metrics WHERE trace_ref IS NOT NULL)"
+            )
+    for res, days in rollup_days.items():
+        if days is not None:
+            cutoff = (now - timedelta(days=days)).strftime(RESOLUTIONS[res][1])
+            conn.execute(f"DELETE FROM {table_for(res)} WHERE bucket < ?", (cutoff,))
+    return removed
+
+def choose_resolution(start, end, max_points=1000):
+    """Resolução mais fina cujo número de pontos no intervalo cabe em max_points"""
+    span = (end - start).total_seconds()
+    if span / RAW_PERIOD <= max_points:
+        return "raw"
+    for res, (seconds, _) in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return res
+    return "1d"
+
+def summary_resolution(start, now=None):
+    """Resolução mais fina cujos baldes ainda cobrem `start` pela retenção"""
+    now = now or datetime.now()
+    for res, days in ROLLUP_RETENTION_DAYS.items():
+        if days is None or start >= now - timedelta(days=days):
+            return res
+    return "1d"
+
+def bucket_floor(ts, resolution):
+    """Início do balde que contém `ts`"""
+    return datetime.strptime(ts.strftime(RESOLUTIONS[resolution][1]), '%Y-%m-%d %H:%M:%S')
+
+def _cover(start, end, order):
+    res, finer = order[0], order[1:]
+    if start >= end:
+        return []
+    if not finer:
+        return [(res, bucket_floor(start, res), end)]
+    lo = bucket_floor(start, res)
+    if lo < start:
+        lo += timedelta(seconds=RESOLUTIONS[res][0])
+    hi = bucket_floor(end, res)
+    if lo >= hi:
+        return _cover(start, end, finer)
+    return _cover(start, lo, finer) + [(res, lo, hi)] + _cover(hi, end, finer)
+
+def cover(start, end, now=None):
+    """Decompõe [start, end) em faixas (resolução, primeiro balde, fim exclusivo) com o menor nº de baldes.
+
+    Dias inteiros vêm de 1d, horas inteiras de 1h e as pontas da resolução mais
+    fina ainda retida para `start` (os baldes parciais das pontas entram
+    inteiros, como em summarize).
+    """
+    finest = summary_resolution(start, now)
+    order = list(RESOLUTIONS)[::-1]
+    return _cover(start, end, order[:order.index(finest) + 1])
+
+# Colunas de summary_select (com by_day, a primeira coluna é o dia 'AAAA-MM-DD')
+SUMMARY_COLUMNS = [
+    "samples", "problem_samples", "loss_events",
+    "ping_ms", "ping_ms_max", "jitter_ms", "jitter_ms_max"
+]
+
+def summary_select(resolution, by_day=False):
+    """Totais do período somando os baldes (médias ponderadas pelo nº de amostras)"""
+    day = "substr(bucket, 1, 10) AS day, " if by_day else ""
+    return f"""
+    SELECT {day}SUM(count), SUM(count - status_ok), SUM(loss_events),
+        TOTAL(ping_ms_sum) / NULLIF(SUM(ping_ms_count), 0), MAX(ping_ms_max),
+        TOTAL(jitter_ms_sum) / NULLIF(SUM(jitter_ms_count), 0), MAX(jitter_ms_max)
+    FROM {table_for(resolution)}
+    """
+
+# Colunas expostas por rollup_select (mesmos nomes das linhas brutas + contagens do balde)
+ROLLUP_COLUMNS = [
+    "timestamp", "target_host", *ROLLUP_METRICS, "status",
+    "samples", "problem_samples", "loss_events", "ping_ms_max", "jitter_ms_max"
+]
+
+def rollup_select(resolution):
+    """SELECT que expõe um balde com os mesmos nomes de coluna das linhas brutas"""
+    means = ", ".join(
+        f"CASE WHEN {m}_count > 0 THEN {m}_sum / {m}_count END AS {m}" for m in ROLLUP_METRICS
+    )
+    return f"""
+    SELECT bucket AS timestamp, target_host, {means},
+        CASE
+            WHEN status_ok = count THEN 'OK'
+            WHEN status_unreachable > 0 THEN 'UNREACHABLE'
+            WHEN status_packet_loss > 0 THEN 'PACKET_LOSS'
+            WHEN status_isp_latency > 0 THEN 'ISP_LATENCY'
+            WHEN status_internal > 0 THEN 'INTERNAL_WIFI_ISSUE'
+            ELSE 'OTHER'
+        END AS status,
+        count AS samples, count - status_ok AS problem_samples, loss_events,
+        ping_ms_max, jitter_ms_max
+    FROM {table_for(resolution)}
+    """
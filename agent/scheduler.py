@@ -0,0 +1,96 @@
+import time
+
+# Configurações do agendador de coleta
+BASE_INTERVAL = 10      # Período normal entre ciclos (s)
+FAST_INTERVAL = 5       # Link degradado: amostra mais rápido para medir a falha com precisão
+SLOW_INTERVAL = 30      # Link estável por muito tempo: alivia a sondagem
+STABLE_CYCLES = 30      # Ciclos OK seguidos antes de cada passo de recuo
+BACKOFF_FACTOR = 1.5
+PROBE_BUDGET = 20_000   # Máximo de pacotes ICMP por hora (limita o modo rápido)
+
+class Scheduler:
+    """Executa `job` em ticks fixos do relógio monotônico (sem deriva).
+
+    O próximo tick é calculado a partir do tick anterior, não do fim do job, então
+    a duração do job não se acumula no período. Se o job passar do tick seguinte
+    (overrun), os ticks perdidos são pulados e registrados: nunca há dois jobs
+    sobrepostos nem uma rajada para "recuperar o atraso".
+
+    O intervalo se adapta ao status retornado pelo job: FAST_INTERVAL enquanto
+    houver problema, BASE_INTERVAL ao normalizar e recuo gradual até
+    SLOW_INTERVAL com o link estável. Nenhum intervalo fica abaixo do que o
+    orçamento de pacotes por hora permite.
+    """
+
+    def __init__(self, job, probes_per_cycle, base_interval=BASE_INTERVAL, fast_interval=FAST_INTERVAL,
+                 slow_interval=SLOW_INTERVAL, probe_budget=PROBE_BUDGET,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.job = job
+        self.probes_per_cycle = probes_per_cycle
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.probe_budget = probe_budget
+        self.clock = clock
+        self.sleep = sleep
+
+        self.interval = base_interval
+        self.stable_cycles = 0
+        self.stats = {"cycles": 0, "overruns": 0, "skipped_ticks": 0, "max_overrun_s": 0.0, "last_duration_s": 0.0}
+        self._stop = False
+
+    @property
+    def budget_interval(self):
+        """Menor intervalo que cabe no orçamento de pacotes por hora"""
+        return self.probes_per_cycle * 3600 / self.probe_budget if self.probe_budget else 0
+
+    def adapt(self, status):
+        """Escolhe o próximo intervalo a partir do status do ciclo ('OK' = link saudável)"""
+        if status is None:
+            pass  # Falha do próprio job: mantém o ritmo atual
+        elif status != "OK":
+            self.stable_cycles = 0
+            self.interval = self.fast_interval
+        else:
+            self.stable_cycles += 1
+            self.interval = max(self.interval, self.base_interval)
+            if self.stable_cycles >= STABLE_CYCLES:
+                self.stable_cycles = 0
+                self.interval = min(self.interval * BACKOFF_FACTOR, self.slow_interval)
+        self.interval = max(self.interval, self.budget_interval)
+        return self.interval
+
+    def run_once(self, tick):
+        """Executa um ciclo no tick dado; retorna o próximo tick"""
+        started = self.clock()
+        try:
+            status = self.job()
+        except Exception as e:
+            print(f"❌ [SCHED] Falha no ciclo: {e}")
+            status = None
+        finished = self.clock()
+        self.stats["cycles"] += 1
+        self.stats["last_duration_s"] = finished - started
+
+        next_tick = tick + self.adapt(status)
+        if finished > next_tick:
+            # Overrun: pula os ticks que já passaram em vez de empilhar execuções
+            late = finished - next_tick
+            missed = int(late // self.interval) + 1
+            next_tick += missed * self.interval
+            self.stats["overruns"] += 1
+            self.stats["skipped_ticks"] += missed
+            self.stats["max_overrun_s"] = max(self.stats["max_overrun_s"], late)
+            print(f"⏱️ [SCHED] Ciclo levou {finished - started:.1f}s (> {self.interval:.0f}s): {missed} tick(s) pulado(s).")
+        return next_tick
+
+    def run(self):
+        tick = self.clock()
+        while not self._stop:
+            tick = self.run_once(tick)
+            delay = tick - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+
+    def stop(self):
+        self._stop = True
@@ -1,130 +1,156 @@
+import os
 import time
-import statistics
-import speedtest
-import dns.resolver
-import subprocess
-import re
 import platform
-from ping3 import ping
+import re
+from datetime import datetime
 from database import SentinelDB
+from probes import ProbeEngine, GATEWAY_COUNT
+from backends import create_backend
+from dns_probe import DnsProbe
+from forensics import TracerouteWorker
+from uploader import Uploader
+from scheduler import Scheduler
+from stream_detector import StreamDetector, DETECTOR
+from live_ring import LiveRing, ring_path
+from throughput import ThroughputSampler, ActiveThroughputTest
+from telemetry import telemetry, MetricsServer, METRICS_PORT
 
 # Configurações
 TARGET_HOST = "8.8.8.8"
-DNS_TARGET = "google.com"
+TARGET_HOSTS = [TARGET_HOST]  # Adicione outros alvos (ex: "1.1.1.1") para monitorar em paralelo
 PING_COUNT = 15
 
-db = SentinelDB()
+# Frota: envia também para um servidor de ingestão (ex: "http://10.0.0.5:8765/ingest"); None = só local
+INGEST_URL = None
+INGEST_TOKEN = None
+AGENT_ID = re.sub(r"[^A-Za-z0-9_.-]", "-", platform.node())[:64] or "sentinel"
+SPOOL_DIR = "spool"
+
+# Backend das sondagens: "system" (rede real) ou "sim" (simulador determinístico, sem rede)
+BACKEND = os.environ.get("SENTINEL_BACKEND", "system")
+DB_PATH = os.environ.get("SENTINEL_DB", "sentinel_data.db")
+
+# Auto-instrumentação: endpoint Prometheus em localhost (None = desligado) e snapshot no banco
+METRICS_ENDPOINT_PORT = METRICS_PORT
+STATS_INTERVAL = 60  # Segundos entre snapshots na tabela agent_stats (None = não grava)
+STATE_SAVE_CYCLES = 30  # Ciclos entre gravações do estado do detector em fluxo
+LIVE_RING = True  # Publica cada amostra em <banco>-live (KPIs ao vivo do dashboard sem consultar o SQLite)
+
+db = SentinelDB(DB_PATH)
+backend = create_backend(BACKEND)
+probe_engine = ProbeEngine(ping_func=backend.ping)
+dns_probe = DnsProbe(backend)
+# Vazão: contadores das interfaces a cada ciclo; teste ativo só com o link ocioso (URLs em throughput.py)
+throughput = ThroughputSampler(counters=backend.interface_counters)
+active_test = ActiveThroughputTest(backend, db)
+# Detecção de anomalias no momento da coleta (o dashboard só lê a tabela anomalies)
+detector = StreamDetector()
+detector.load(db.conn)
+live = LiveRing(ring_path(DB_PATH)) if LIVE_RING else None
+cycles_since_save = STATE_SAVE_CYCLES - 1  # Primeiro ciclo já grava (o dashboard passa a ler os alertas do agente)
+tracer = TracerouteWorker(db, runner=telemetry.timed("traceroute", backend.traceroute))
+uploader = Uploader(INGEST_URL, AGENT_ID, SPOOL_DIR, token=INGEST_TOKEN) if INGEST_URL else None
+telemetry.register(lambda: {"db_queue_depth": db.queue_depth})
+next_stats = time.monotonic()
 
 def get_default_gateway():
-    """Descobre o IP do Roteador Local (Gateway) no Windows"""
-    try:
-        # Executa ipconfig e busca a linha do Gateway Padrão
-        result = subprocess.check_output("ipconfig", shell=True).decode('cp850', errors='ignore') # cp850 é comum no CMD pt-br
-        # Regex simples para pegar o IP
-        for line in result.split('\n'):
-            if "Gateway" in line or "Padrão" in line:
-                ip_search = re.search(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', line)
-                if ip_search:
-                    return ip_search.group(0)
-    except:
-        pass
-    return None
-
-def run_forensic_traceroute(target):
-    """Roda um tracert real para anexar como prova no relatório"""
-    print("🕵️ EXECUTANDO TRACEROUTE FORENSE (Isso pode levar 15s)...")
-    try:
-        # -d: Não resolve nomes (mais rápido)
-        # -h 10: Máximo 10 saltos (suficiente para ver se saiu da operadora)
-        # -w 100: Timeout rápido
-        cmd = ["tracert", "-d", "-h", "10", "-w", "100", target]
-        output = subprocess.check_output(cmd, shell=True).decode('cp850', errors='ignore')
-        return output
-    except Exception as e:
-        return f"Erro no traceroute: {e}"
-
-def get_network_health(host=TARGET_HOST, count=PING_COUNT):
-    """Coleta Ping Internet + Ping Gateway para Causa Raiz"""
-    latencies = []
-    lost = 0
-    
+    """Descobre o IP do Roteador Local (Gateway) - em cache até a rota mudar"""
+    return backend.default_gateway()
+
+def get_network_health(targets=None, count=PING_COUNT):
+    """Coleta Ping Internet (todos os alvos) + Ping Gateway em paralelo para Causa Raiz"""
+    targets = targets or TARGET_HOSTS
+
     # 1. Identificar Gateway
-    gateway_ip = get_default_gateway()
-    gateway_ping = 0
-    
-    # 2. Medir Latência Interna (Gateway)
-    if gateway_ip:
-        try:
-            g_res = ping(gateway_ip, unit='ms', timeout=0.5)
-            gateway_ping = round(g_res, 2) if g_res else 999
-        except:
-            gateway_ping = 999
-    
-    # 3. Medir Latência Externa (Internet)
-    print(f"📡 Medindo estabilidade externa & interna ({gateway_ip})...")
-    for _ in range(count):
-        try:
-            res = ping(host, unit='ms', timeout=1)
-            if res is None:
-                lost += 1
-            else:
-                latencies.append(res)
-        except:
-            lost += 1
-        time.sleep(0.1)
-
-    if not latencies:
-        return None
-
-    avg_ping = statistics.mean(latencies)
-    jitter = statistics.stdev(latencies) if len(latencies) > 1 else 0
-    packet_loss_pct = (lost / count) * 100
-
-    return {
-        "ping": round(avg_ping, 2),
-        "jitter": round(jitter, 2),
-        "packet_loss": round(packet_loss_pct, 2),
-        "gateway_ping": gateway_ping,
-        "gateway_ip": gateway_ip,
-        "host": host
-    }
+    with telemetry.timer("gateway"):
+        gateway_ip = get_default_gateway()
+
+    # 2 e 3. Latência Interna (Gateway) e Externa (Alvos) medidas ao mesmo tempo
+    print(f"📡 Medindo estabilidade externa ({', '.join(targets)}) & interna ({gateway_ip})...")
+    with telemetry.timer("ping"):
+        return probe_engine.run_cycle(targets, count, gateway_ip)
 
 def check_dns_speed():
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = ['8.8.8.8']
-    start = time.time()
-    try:
-        resolver.resolve(DNS_TARGET, 'A')
-        return round((time.time() - start) * 1000, 2)
-    except:
-        return 0
+    """Todos os resolvedores/tipos em paralelo; retorna a mediana em ms ou None se todos falharam"""
+    with telemetry.timer("dns"):
+        dns_time, results = dns_probe.run()
+    failures = sum(r['response_ms'] is None for r in results)
+    if failures:
+        telemetry.inc("dns_failures_total", failures)
+    db.save_dns(results)
+    return dns_time
+
+def check_throughput():
+    """(download, upload) em Mbps desde o ciclo anterior, pelos contadores do kernel; None no primeiro ciclo"""
+    with telemetry.timer("throughput"):
+        bandwidth = throughput.sample()
+    if active_test.observe(bandwidth):
+        print("🚀 [BANDA] Link ocioso: teste de banda ativo iniciado em segundo plano.")
+    return bandwidth
 
 def job():
-    health = get_network_health()
-    if not health:
-        print("❌ Rede Inacessível")
-        return
+    """Um ciclo de coleta; retorna o pior status entre os alvos (usado pelo agendador)"""
+    with telemetry.timer("cycle"):
+        results = get_network_health()
+        dns_time = check_dns_speed()
+        bandwidth = check_throughput()
 
-    dns_time = check_dns_speed()
-    
+        statuses = []
+        for health in results:
+            if health['ping'] is None:
+                print(f"❌ Rede Inacessível ({health['host']})")
+                telemetry.inc("unreachable_total")
+            with telemetry.timer("save"):
+                statuses.append(process_health(health, dns_time, bandwidth))
+    save_stats()
+    save_detector_state()
+    return next((s for s in statuses if s != "OK"), "OK")
+
+def save_detector_state(force=False):
+    global cycles_since_save
+    cycles_since_save += 1
+    if force or cycles_since_save >= STATE_SAVE_CYCLES:
+        cycles_since_save = 0
+        db.save_stream_state(detector.state_rows(datetime.now()))
+
+def save_stats():
+    """Snapshot da telemetria no banco a cada STATS_INTERVAL (vai pelo gravador em lote)"""
+    global next_stats
+    if STATS_INTERVAL and time.monotonic() >= next_stats:
+        next_stats = time.monotonic() + STATS_INTERVAL
+        db.save_stats(telemetry.snapshot())
+
+def fmt_ms(value):
+    # Sem resposta (alvo ou Gateway inacessível): "—", como nos KPIs do dashboard
+    return "—" if value is None else f"{value}ms"
+
+def process_health(health, dns_time, bandwidth=None):
     data = {
+        "timestamp": datetime.now(),
         "ping": health['ping'],
         "jitter": health['jitter'],
+        "rtp_jitter": health.get('rtp_jitter'),
+        "ping_sketch": health.get('ping_sketch'),
         "packet_loss": health['packet_loss'],
         "dns": dns_time,
         "gateway_ping": health['gateway_ping'],
-        "trace_log": "", # Vazio por padrão
         "host": health['host'],
-        "download": 0,
-        "upload": 0,
+        "download": bandwidth[0] if bandwidth else None,
+        "upload": bandwidth[1] if bandwidth else None,
         "status": "OK"
     }
 
     # --- LÓGICA DE CAUSA RAIZ (RCA) ---
     is_problem = False
     
+    # Regra 0: Alvo inacessível (nenhuma resposta). A linha é gravada mesmo assim (perda 100%,
+    # latência nula) para a queda contar como tempo fora no SLA em vez de virar lacuna
+    if health['ping'] is None:
+        data['status'] = "UNREACHABLE"
+        is_problem = True
+
     # Regra 1: Perda de Pacotes
-    if health['packet_loss'] > 2.0:
+    elif health['packet_loss'] > 2.0:
         data['status'] = "PACKET_LOSS"
         is_problem = True
     
@@ -139,21 +165,53 @@ def job():
             print("⚠️ DIAGNÓSTICO: Problema na Operadora!")
         is_problem = True
 
-    # Se detectou problema, roda a "Perícia" (Traceroute)
-    if is_problem:
-        trace = run_forensic_traceroute(TARGET_HOST)
-        data['trace_log'] = trace
-        print("🕵️ Evidência de Traceroute capturada.")
+    ticket = db.save_metric(data)
+    if live:
+        live.publish(data)
+    with telemetry.timer("detect"):
+        events = detector.update(health['host'], data)
+    for score, reason in events:
+        print(f"🧠 [DETECTOR] {health['host']}: {reason}")
+        db.save_anomaly(ticket, data['timestamp'], DETECTOR, round(score, 2), reason)
+        telemetry.inc("anomalies_total")
+    if uploader:
+        uploader.submit(data)  # Vai para o spool; o envio ao servidor é em segundo plano
 
-    db.save_metric(data)
-    print(f"✅ [{data['status']}] Ext: {data['ping']}ms | Int: {data['gateway_ping']}ms | Jitter: {data['jitter']}ms")
+    # Se detectou problema, agenda a "Perícia" (Traceroute) sem travar o ciclo de coleta
+    if is_problem and tracer.submit(health['host'], ticket):
+        print("🕵️ Traceroute forense agendado.")
+    print(f"✅ [{data['status']}] Ext: {fmt_ms(data['ping'])} | Int: {fmt_ms(data['gateway_ping'])} | "
+          f"Jitter: {fmt_ms(data['jitter'])}")
+    return data['status']
 
 if __name__ == "__main__":
     print("🛡️ SENTINEL V2 - MÓDULO DE CAUSA RAIZ ATIVO")
     print("🕵️ Monitorando Gateway e Rota Externa...")
+    # Ticks fixos (sem somar a duração do job) e ritmo adaptado ao estado do link
+    scheduler = Scheduler(job, probes_per_cycle=PING_COUNT * len(TARGET_HOSTS) + GATEWAY_COUNT)
+    telemetry.register(lambda: {f"scheduler_{name}": value for name, value in scheduler.stats.items()}
+                       | {"scheduler_interval_seconds": scheduler.interval})
+    metrics_server = None
+    if METRICS_ENDPOINT_PORT:
+        try:
+            metrics_server = MetricsServer(port=METRICS_ENDPOINT_PORT)
+            print(f"📈 [STATS] Métricas do agente em {metrics_server.url}")
+        except OSError as e:
+            print(f"⚠️ [STATS] Endpoint de métricas indisponível: {e}")
     try:
-        while True:
-            job()
-            time.sleep(10)
+        scheduler.run()
     except KeyboardInterrupt:
-        print("\n🛑 Parado.")
\ No newline at end of file
+        print("\n🛑 Parado.")
+    finally:
+        if metrics_server:
+            metrics_server.close()
+        save_detector_state(force=True)
+        probe_engine.close()
+        dns_probe.close()
+        if live:
+            live.close()
+        tracer.close(wait=False)
+        active_test.close()
+        if uploader:
+            uploader.close()
+        db.close() # Grava o lote pendente antes de sair
\ No newline at end of file
@@ -0,0 +1,291 @@
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import rollups
+import sla
+from backends import ProbeBackend
+from probes import RTP_JITTER_GAIN
+from sketch import DDSketch
+from database import SentinelDB, INSERT_METRIC
+from throughput import ACTIVE_MAX_BYTES, ACTIVE_MAX_SECONDS
+
+# Perfil da rede simulada
+SLOT_SECONDS = 300          # Episódios (queda, congestionamento, Wi-Fi ruim) duram múltiplos de 5 min
+OUTAGE_RATE = 0.004         # Fração dos slots com a Internet fora (Gateway responde, alvos não)
+ISP_RATE = 0.02             # Fração dos slots com congestionamento na operadora
+WIFI_RATE = 0.01            # Fração dos slots com a rede interna degradada
+PEAK_HOURS = range(19, 24)  # Horário nobre: latência e perda sobem
+BASE_LOSS = 0.0005          # Perda de fundo por pacote
+SIM_GATEWAY = "192.168.0.1"
+DNS_TIMEOUT_MS = 2000
+HISTORY_CHUNK = 20_000      # Ciclos gerados por vez em generate_history
+HISTORY_PACKETS = 15        # Pings por ciclo no histórico (RTTs de cada pacote vão para o sketch)
+SIM_DOWNLINK_MBPS = 300     # Plano contratado (banda máxima do teste ativo)
+SIM_UPLINK_MBPS = 50
+SIM_INTERFACE = "eth0"      # Contadores de 32 bits: dão a volta a cada ~4 GB (exercita o tratamento)
+COUNTER_WRAP = 2 ** 32
+
+def _seed(*parts):
+    """Semente estável (hash() do Python muda a cada processo)"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def slot_condition(seed, slot):
+    """Estado da rede num slot: 'outage', 'isp', 'wifi' ou 'ok' (mesmo resultado para a mesma semente)"""
+    draw = random.Random(_seed(seed, "slot", slot)).random()
+    if draw < OUTAGE_RATE:
+        return "outage"
+    if draw < OUTAGE_RATE + ISP_RATE:
+        return "isp"
+    if draw < OUTAGE_RATE + ISP_RATE + WIFI_RATE:
+        return "wifi"
+    return "ok"
+
+def diurnal_factor(hour):
+    return 1.6 if hour in PEAK_HOURS else 1.0 + 0.1 * (hour >= 8)
+
+def usage_mbps(hour):
+    """Tráfego de fundo típico da casa/escritório (Mbps de download): quase nada de madrugada"""
+    return 0.2 if hour < 7 else 15.0 if hour in PEAK_HOURS else 3.0
+
+def base_rtt(seed, host):
+    """RTT de referência do alvo (10-60 ms), fixo por host"""
+    return 10 + random.Random(_seed(seed, "rtt", host)).random() * 50
+
+class SimulatedBackend(ProbeBackend):
+    """Rede sintética determinística: latência, perda, quedas e traceroutes sem tocar na rede.
+
+    As condições dependem só de (semente, slot de tempo), e o ruído de cada pacote
+    de um gerador por host, então a mesma semente com o mesmo relógio repete a
+    mesma sequência. `realtime=True` espera o RTT simulado (o ciclo do agente
+    dura o mesmo que em produção); por padrão responde na hora.
+    """
+
+    def __init__(self, seed=0, clock=time.time, realtime=False, gateway=SIM_GATEWAY):
+        self.seed = seed
+        self.clock = clock
+        self.realtime = realtime
+        self.gateway = gateway
+        self._rngs = {}
+        self._lock = threading.Lock()
+        self._traffic = None  # [último instante, bytes recebidos, bytes enviados] (sem a volta de 32 bits)
+
+    def _rng(self, host):
+        with self._lock:
+            rng = self._rngs.get(host)
+            if rng is None:
+                rng = self._rngs[host] = random.Random(_seed(self.seed, "noise", host))
+            return rng
+
+    def condition(self, t=None):
+        t = self.clock() if t is None else t
+        return slot_condition(self.seed, int(t // SLOT_SECONDS))
+
+    def sample_rtt(self, host, t=None):
+        """RTT simulado em ms para um pacote (None = perdido)"""
+        t = self.clock() if t is None else t
+        state = self.condition(t)
+        rng = self._rng(host)
+        with self._lock:
+            noise, lost_draw = rng.gammavariate(2.0, 1.0), rng.random()
+
+        if host == self.gateway:
+            rtt, loss = 1.0 + noise * 0.5, BASE_LOSS
+            if state == "wifi":
+                rtt, loss = rtt + 60 + noise * 20, 0.01
+        else:
+            factor = diurnal_factor(datetime.fromtimestamp(t).hour)
+            rtt, loss = base_rtt(self.seed, host) * factor + noise * 2 * factor, BASE_LOSS * factor
+            if state == "outage":
+                loss = 1.0
+            elif state == "isp":
+                rtt, loss = rtt + 120 + noise * 30, 0.05
+            elif state == "wifi":
+                rtt = rtt + 70 + noise * 20
+        return None if lost_draw < loss else rtt
+
+    def ping(self, host, unit='ms', timeout=1):
+        rtt = self.sample_rtt(host)
+        if rtt is not None and rtt > timeout * 1000:
+            rtt = None
+        if self.realtime:
+            time.sleep((rtt if rtt is not None else timeout * 1000) / 1000)
+        if rtt is None:
+            return None
+        return rtt if unit == 'ms' else rtt / 1000
+
+    def resolve(self, name, server, rdtype='A', timeout=2):
+        t = self.clock()
+        if self.condition(t) == "outage":
+            raise TimeoutError(f"consulta {rdtype} {name} @{server} sem resposta")
+        rng = self._rng(f"dns:{server}")
+        with self._lock:
+            elapsed = 8 + rng.gammavariate(2.0, 4.0) * diurnal_factor(datetime.fromtimestamp(t).hour)
+        if elapsed > min(timeout * 1000, DNS_TIMEOUT_MS):
+            raise TimeoutError(f"consulta {rdtype} {name} @{server} excedeu {timeout}s")
+        return round(elapsed, 2)
+
+    def default_gateway(self):
+        return self.gateway
+
+    def _account(self, t, rx=0, tx=0):
+        """Soma o tráfego de fundo desde a última leitura (e o do teste ativo) aos contadores"""
+        rng = self._rng("traffic")
+        with self._lock:
+            if self._traffic is None:
+                # Começa perto da volta do contador, como uma interface ligada há dias
+                self._traffic = [t, COUNTER_WRAP - 10 ** 8, COUNTER_WRAP - 10 ** 7]
+            elapsed = max(t - self._traffic[0], 0.0)
+            usage = usage_mbps(datetime.fromtimestamp(t).hour) * rng.gammavariate(2.0, 0.5)
+            self._traffic[0] = max(t, self._traffic[0])
+            self._traffic[1] += usage * 1e6 / 8 * elapsed + rx
+            self._traffic[2] += usage * 0.2 * 1e6 / 8 * elapsed + tx
+            return self._traffic[1], self._traffic[2]
+
+    def interface_counters(self):
+        rx, tx = self._account(self.clock())
+        return {"lo": (0, 0), SIM_INTERFACE: (int(rx) % COUNTER_WRAP, int(tx) % COUNTER_WRAP)}
+
+    def _transfer(self, capacity, upload):
+        t = self.clock()
+        state = self.condition(t)
+        if state == "outage":
+            raise ConnectionError("sem resposta do servidor de teste (queda simulada)")
+        capacity *= 0.3 if state == "isp" else 0.8 if datetime.fromtimestamp(t).hour in PEAK_HOURS else 1.0
+        seconds = min(ACTIVE_MAX_SECONDS, ACTIVE_MAX_BYTES * 8 / (capacity * 1e6))
+        n_bytes = int(capacity * 1e6 / 8 * seconds)
+        if upload:
+            self._account(t, tx=n_bytes)
+        else:
+            self._account(t, rx=n_bytes)
+        if self.realtime:
+            time.sleep(seconds)
+        return n_bytes, seconds
+
+    def http_download(self, url):
+        return self._transfer(SIM_DOWNLINK_MBPS, upload=False)
+
+    def http_upload(self, url):
+        return self._transfer(SIM_UPLINK_MBPS, upload=True)
+
+    def route(self, target):
+        """Rota fixa por alvo: Gateway, rede da operadora e trânsito até o destino"""
+        rng = random.Random(_seed(self.seed, "route", target))
+        hops = [self.gateway, f"100.64.{rng.randint(0, 255)}.1"]
+        hops += [f"{rng.choice([177, 187, 200, 201])}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                 for _ in range(rng.randint(2, 5))]
+        return hops + [target]
+
+    def traceroute(self, target):
+        """Saída no formato do traceroute -n do Linux (lida por forensics.parse_traceroute)"""
+        t = self.clock()
+        state = self.condition(t)
+        hops = self.route(target)
+        lines = [f"traceroute to {target} ({target}), 10 hops max, 60 byte packets"]
+        for i, ip in enumerate(hops, start=1):
+            # Queda: a rota morre logo depois da rede da operadora
+            if state == "outage" and i > 2:
+                lines.append(f"{i:2d}  * * *")
+                continue
+            rtts = []
+            for _ in range(3):
+                rtt = self.sample_rtt(ip if ip == self.gateway else target, t)
+                rtts.append("*" if rtt is None else f"{rtt * i / len(hops):.3f} ms")
+            lines.append(f"{i:2d}  {ip}  " + "  ".join(rtts))
+        return "\n".join(lines) + "\n"
+
+def _history_chunk(seed, hosts, start, n, interval):
+    """Linhas sintéticas (vetorizado com numpy) com as mesmas regras de RCA do agente"""
+    rng = np.random.default_rng(_seed(seed, "history", start.isoformat()))
+    k = len(hosts)
+    offsets = np.arange(n, dtype=np.int64) * interval
+    local = np.datetime64(start, 's') + offsets.astype('timedelta64[s]')
+    slots = (start.timestamp() + offsets) // SLOT_SECONDS
+    unique_slots, inverse = np.unique(slots, return_inverse=True)
+    states = np.array([slot_condition(seed, int(s)) for s in unique_slots])[inverse][:, None]
+    hours = local.astype('datetime64[h]').astype(np.int64) % 24
+    factor = np.where(np.isin(hours, list(PEAK_HOURS)), 1.6, 1.0 + 0.1 * (hours >= 8))[:, None]
+
+    base = np.array([base_rtt(seed, h) for h in hosts])[None, :]
+    ping = base * factor + rng.gamma(2.0, 2.0, (n, k)) * factor
+    jitter = rng.gamma(2.0, 1.0, (n, k))
+    loss = np.round(rng.binomial(15, BASE_LOSS, (n, k)) / 15 * 100, 2)
+    gateway = np.repeat(1.0 + rng.gamma(2.0, 0.5, (n, 1)), k, axis=1)
+    dns = np.repeat(8 + rng.gamma(2.0, 4.0, (n, 1)) * factor, k, axis=1)
+
+    isp, wifi, outage = states == "isp", states == "wifi", states == "outage"
+    ping = np.where(isp, ping + 120 + rng.gamma(2.0, 15.0, (n, k)), ping)
+    jitter = np.where(isp, jitter * 8, jitter)
+    loss = np.where(isp, np.round(rng.binomial(15, 0.05, (n, k)) / 15 * 100, 2), loss)
+    ping = np.where(wifi, ping + 70 + rng.gamma(2.0, 10.0, (n, k)), ping)
+    gateway = np.where(wifi, gateway + 60 + rng.gamma(2.0, 10.0, (n, k)), gateway)
+    # Vazão passiva do link (mesma para todos os alvos)
+    usage = np.where(hours < 7, 0.2, np.where(np.isin(hours, list(PEAK_HOURS)), 15.0, 3.0))[:, None]
+    download = np.repeat(usage * rng.gamma(2.0, 0.5, (n, 1)), k, axis=1)
+    upload = download * 0.2
+    # RTT de cada pacote (média do ciclo, espalhado pelo jitter); os perdidos ficam no fim da série
+    packets = np.maximum(ping[..., None] + jitter[..., None] * rng.standard_normal((n, k, HISTORY_PACKETS)), 0.1)
+    received = HISTORY_PACKETS - np.round(loss / 100 * HISTORY_PACKETS).astype(int)
+    rtp_jitter = np.zeros((n, k))
+    for i in range(1, HISTORY_PACKETS):
+        step = np.abs(packets[..., i] - packets[..., i - 1])
+        rtp_jitter = np.where(i < received, rtp_jitter + (step - rtp_jitter) * RTP_JITTER_GAIN, rtp_jitter)
+
+    status = np.full((n, k), "OK", dtype=object)
+    high = ping > 100
+    status[high & (gateway > 50)] = "INTERNAL_WIFI_ISSUE"
+    status[high & (gateway <= 50)] = "ISP_LATENCY"
+    status[loss > 2.0] = "PACKET_LOSS"
+
+    # Queda: o agente grava a linha do alvo inacessível com perda total e sem latência/DNS
+    down = np.broadcast_to(outage, (n, k))
+    status[down] = "UNREACHABLE"
+    loss = np.where(down, 100.0, loss)
+    received = np.where(down, 0, received)
+    stamps = np.char.replace(np.datetime_as_string(local, unit='s'), "T", " ")
+    stamps = np.broadcast_to(stamps[:, None], (n, k))
+    host_col = np.broadcast_to(np.array(hosts, dtype=object)[None, :], (n, k))
+    columns = [stamps, np.round(ping, 2), np.round(jitter, 2), loss,
+               np.round(download, 2), np.round(upload, 2),
+               np.round(dns, 2), np.round(gateway, 2), host_col, status,
+               np.round(rtp_jitter, 2), down]
+    sketches = [DDSketch(rtts[:count]).to_bytes() if count else None
+                for rtts, count in zip(np.round(packets, 2).reshape(n * k, -1).tolist(), received.ravel().tolist())]
+    return [
+        (ts, None, None, l, dl, ul, None, g, None, h, s, None, None, None) if out else
+        (ts, p, j, l, dl, ul, d, g, None, h, s, None, rj, sk)
+        for (ts, p, j, l, dl, ul, d, g, h, s, rj, out), sk
+        in zip(zip(*(c.ravel().tolist() for c in columns)), sketches)
+    ]
+
+def generate_history(db_path, n_rows, hosts=("8.8.8.8",), interval=rollups.RAW_PERIOD, end=None,
+                     seed=0, chunk=HISTORY_CHUNK):
+    """Cria/estende um banco com ~n_rows linhas sintéticas terminando em `end` (padrão: agora).
+
+    As linhas são divididas entre os alvos (uma por alvo a cada `interval`);
+    slots de queda viram linhas UNREACHABLE (perda 100%), como no agente real. Agregados e SLA são
+    reconstruídos no final. Retorna o número de linhas gravadas.
+    """
+    hosts = list(hosts)
+    cycles = -(-n_rows // len(hosts))
+    end = (end or datetime.now()).replace(microsecond=0)
+    start = end - timedelta(seconds=cycles * interval)
+
+    db = SentinelDB(db_path, buffered=False)
+    written = 0
+    for first in range(0, cycles, chunk):
+        size = min(chunk, cycles - first)
+        rows = _history_chunk(seed, hosts, start + timedelta(seconds=first * interval), size, interval)
+        db.conn.executemany(INSERT_METRIC, rows)
+        written += len(rows)
+    rollups.rebuild(db.conn)
+    sla.rebuild(db.conn)
+    db.conn.commit()
+    db.close()
+    print(f"🧪 [SIM] {written:,} linhas sintéticas gravadas em {db_path} ({start:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M}).")
+    return written
@@ -0,0 +1,181 @@
+import math
+import struct
+import sys
+from array import array
+
+# Sketch de quantis (DDSketch): baldes logarítmicos com erro relativo garantido e soma exata entre sketches
+SKETCH_ALPHA = 0.01        # Erro relativo máximo de cada quantil (1%)
+SKETCH_MAX_BINS = 2048     # Acima disso os baldes mais baixos são colapsados (a cauda alta, que importa, fica exata)
+SKETCH_MIN_VALUE = 1e-3    # ms: abaixo disso a amostra conta como zero
+SKETCH_VERSION = 1         # Muda se o formato ou SKETCH_ALPHA mudar (sketches de versões diferentes não somam)
+PERCENTILES = (50, 95, 99)
+
+GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+INV_LOG_GAMMA = 1 / math.log(GAMMA)
+
+# Binário: versão, bytes por contador (1/2/4), nº de baldes, amostras zero, mín, máx, soma;
+# depois os índices dos baldes (int16) e os contadores, em little-endian
+HEADER = struct.Struct("<BBHIddd")
+COUNT_TYPES = {1: "B", 2: "H", 4: "I"}
+
+def bin_index(value):
+    return math.ceil(math.log(value) * INV_LOG_GAMMA)
+
+def bin_value(index):
+    """Representante do balde: a meio caminho (em erro relativo) entre as bordas"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+def _little_endian(arr):
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+class DDSketch:
+    """Distribuição de RTTs em baldes logarítmicos: quantil com erro relativo <= SKETCH_ALPHA.
+
+    Dois sketches se somam balde a balde (merge), então o sketch de um minuto,
+    hora ou dia é a soma exata dos sketches dos ciclos, sem guardar as amostras.
+    """
+
+    __slots__ = ("bins", "zeros", "min", "max", "sum")
+
+    def __init__(self, values=()):
+        self.bins = {}
+        self.zeros = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        for value in values:
+            self.add(value)
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.bins.values())
+
+    def add(self, value):
+        if value < SKETCH_MIN_VALUE:
+            self.zeros += 1
+        else:
+            index = bin_index(value)
+            self.bins[index] = self.bins.get(index, 0) + 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+
+    def merge(self, other):
+        bins = self.bins
+        for index, count in other.bins.items():
+            bins[index] = bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        return self
+
+    def merge_bytes(self, blob):
+        """merge(DDSketch.from_bytes(blob)) sem criar o objeto intermediário (caminho quente dos agregados)"""
+        if len(blob) < HEADER.size:
+            raise ValueError("sketch truncado")
+        version, width, n, zeros, low, high, total = HEADER.unpack_from(blob)
+        if version != SKETCH_VERSION or width not in COUNT_TYPES:
+            raise ValueError(f"sketch em formato desconhecido (versão {version})")
+        if len(blob) != HEADER.size + n * (2 + width):
+            raise ValueError("sketch truncado")
+        indexes = _little_endian(array("h", blob[HEADER.size:HEADER.size + 2 * n]))
+        counts = _little_endian(array(COUNT_TYPES[width], blob[HEADER.size + 2 * n:]))
+        bins = self.bins
+        for index, count in zip(indexes, counts):
+            bins[index] = bins.get(index, 0) + count
+        self.zeros += zeros
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        self.sum += total
+        return self
+
+    def _collapse(self):
+        """Limita o tamanho juntando os baldes mais baixos no primeiro que sobra"""
+        if len(self.bins) <= SKETCH_MAX_BINS:
+            return
+        indexes = sorted(self.bins)
+        cut = indexes[len(indexes) - SKETCH_MAX_BINS]
+        self.bins[cut] += sum(self.bins.pop(i) for i in indexes[:len(indexes) - SKETCH_MAX_BINS])
+
+    def quantile(self, q):
+        """Valor no quantil q (0-1); None se vazio"""
+        count = self.count
+        if count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(bin_value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """{"p50": ..., "p95": ...} (None se vazio)"""
+        return {f"p{p:g}": self.quantile(p / 100) for p in percentiles}
+
+    @property
+    def mean(self):
+        count = self.count
+        return self.sum / count if count else None
+
+    def to_bytes(self):
+        self._collapse()
+        indexes = sorted(self.bins)
+        counts = [self.bins[i] for i in indexes]
+        peak = max(counts, default=0)
+        width = 1 if peak < 2 ** 8 else 2 if peak < 2 ** 16 else 4
+        low, high = (self.min, self.max) if self.count else (0.0, 0.0)
+        return (HEADER.pack(SKETCH_VERSION, width, len(indexes), self.zeros, low, high, self.sum)
+                + _little_endian(array("h", indexes)).tobytes()
+                + _little_endian(array(COUNT_TYPES[width], counts)).tobytes())
+
+    @classmethod
+    def from_bytes(cls, blob):
+        return cls().merge_bytes(blob)
+
+def encode(values):
+    """Sketch binário das amostras válidas (None = perdida); None se não houver nenhuma"""
+    values = [v for v in values if v is not None]
+    return DDSketch(values).to_bytes() if values else None
+
+def merge_all(blobs):
+    """Soma uma sequência de sketches binários (None ignorado); None se não houver nenhum"""
+    merged = None
+    for blob in blobs:
+        if blob is not None:
+            merged = (merged or DDSketch()).merge_bytes(blob)
+    return merged
+
+class SketchAggregate:
+    """sketch_agg(coluna) no SQLite: soma dos sketches do grupo (usado pelos agregados 1m/1h/1d)"""
+
+    def __init__(self):
+        self.sketch = None
+
+    def step(self, blob):
+        if blob is not None:
+            self.sketch = (self.sketch or DDSketch()).merge_bytes(blob)
+
+    def finalize(self):
+        return self.sketch.to_bytes() if self.sketch is not None else None
+
+def merge_pair(a, b):
+    """sketch_merge(a, b) no SQLite: balde existente + novas linhas no upsert"""
+    if a is None or b is None:
+        return b if a is None else a
+    return DDSketch.from_bytes(a).merge_bytes(b).to_bytes()
+
+def register(conn):
+    """Funções de sketch numa conexão que grava os agregados"""
+    conn.create_aggregate("sketch_agg", 1, SketchAggregate)
+    conn.create_function("sketch_merge", 2, merge_pair, deterministic=True)
@@ -0,0 +1,162 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, time
+
+from rollups import RAW_PERIOD
+
+# Intervalo entre duas amostras maior que isso = agente parado (tempo não monitorado)
+MAX_GAP = 60
+REBUILD_CHUNK = 50_000  # Ids processados por vez ao reconstruir a partir do histórico
+REFUND_PENALTY = 10     # Multa contratual: N vezes o valor proporcional ao tempo fora
+
+SLA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sla_daily (
+    day TEXT,
+    target_host TEXT,
+    up_s REAL DEFAULT 0,
+    down_s REAL DEFAULT 0,
+    unmonitored_s REAL DEFAULT 0,
+    samples INTEGER DEFAULT 0,
+    down_samples INTEGER DEFAULT 0,
+    PRIMARY KEY (day, target_host)
+)
+"""
+
+# Última amostra vista por alvo: o próximo lote continua o intervalo a partir dela
+CURSOR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sla_cursor (
+    target_host TEXT PRIMARY KEY,
+    last_ts DATETIME,
+    last_id INTEGER
+)
+"""
+
+UPSERT_DAILY = """
+INSERT INTO sla_daily (day, target_host, up_s, down_s, unmonitored_s, samples, down_samples)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, target_host) DO UPDATE SET
+    up_s = up_s + excluded.up_s,
+    down_s = down_s + excluded.down_s,
+    unmonitored_s = unmonitored_s + excluded.unmonitored_s,
+    samples = samples + excluded.samples,
+    down_samples = down_samples + excluded.down_samples
+"""
+
+def is_down(status, packet_loss):
+    # Mesmo critério do dashboard: qualquer perda ou diagnóstico diferente de OK
+    return (packet_loss or 0) > 0 or status != 'OK'
+
+def split_by_day(start, end):
+    """Quebra o intervalo [start, end) nos dias que ele atravessa -> (dia, segundos)"""
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), time.min)
+        stop = min(end, midnight)
+        yield start.date().isoformat(), (stop - start).total_seconds()
+        start = stop
+
+def accumulate(rows, cursors):
+    """Converte amostras em intervalos e soma por (dia, alvo).
+
+    Cada amostra cobre o tempo desde a anterior do mesmo alvo (os pings que a
+    geraram aconteceram nesse trecho), limitado a MAX_GAP; o restante de um
+    buraco maior conta como não monitorado. `cursors` (alvo -> (timestamp, id))
+    é atualizado no lugar.
+    """
+    acc = defaultdict(lambda: [0.0, 0.0, 0.0, 0, 0])
+    for row_id, ts, host, packet_loss, status in rows:
+        ts = ts if isinstance(ts, datetime) else datetime.fromisoformat(ts)
+        last = cursors.get(host, (None, None))[0]
+        if last is None:
+            # Primeira amostra do alvo: vale um ciclo nominal
+            covered_from = ts - timedelta(seconds=RAW_PERIOD)
+        elif ts <= last:
+            covered_from = ts  # Fora de ordem: conta a amostra, sem tempo
+        else:
+            covered_from = max(last, ts - timedelta(seconds=MAX_GAP))
+            for day, seconds in split_by_day(last, covered_from):
+                acc[(day, host)][2] += seconds
+
+        down = is_down(status, packet_loss)
+        for day, seconds in split_by_day(covered_from, ts):
+            acc[(day, host)][1 if down else 0] += seconds
+        bucket = acc[(ts.date().isoformat(), host)]
+        bucket[3] += 1
+        bucket[4] += down
+        if last is None or ts > last:
+            cursors[host] = (ts, row_id)
+    return acc
+
+def ensure_schema(conn):
+    """Cria as tabelas do SLA; se forem novas num banco com histórico, reconstrói"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sla_daily'"
+    ).fetchone()
+    conn.execute(SLA_SCHEMA)
+    conn.execute(CURSOR_SCHEMA)
+    if not exists:
+        rebuild(conn)
+
+def apply_range(conn, first_id, last_id):
+    """Soma as linhas [first_id, last_id] recém-gravadas aos acumuladores diários"""
+    cursors = {
+        host: (datetime.fromisoformat(ts), row_id)
+        for host, ts, row_id in conn.execute("SELECT target_host, last_ts, last_id FROM sla_cursor")
+    }
+    rows = conn.execute(
+        "SELECT id, timestamp, target_host, packet_loss, status FROM metrics WHERE id BETWEEN ? AND ? ORDER BY id",
+        (first_id, last_id)
+    )
+    acc = accumulate(rows, cursors)
+    conn.executemany(UPSERT_DAILY, [(day, host, *values) for (day, host), values in acc.items()])
+    conn.executemany(
+        "INSERT OR REPLACE INTO sla_cursor (target_host, last_ts, last_id) VALUES (?, ?, ?)",
+        [(host, ts, row_id) for host, (ts, row_id) in cursors.items()]
+    )
+
+def rebuild(conn):
+    """Recalcula os acumuladores a partir das linhas brutas existentes"""
+    conn.execute("DELETE FROM sla_daily")
+    conn.execute("DELETE FROM sla_cursor")
+    first, last = conn.execute("SELECT MIN(id), MAX(id) FROM metrics").fetchone()
+    if first is None:
+        return
+    for start in range(first, last + 1, REBUILD_CHUNK):
+        apply_range(conn, start, min(start + REBUILD_CHUNK - 1, last))
+
+def _as_dict(up, down, unmonitored, samples, down_samples):
+    monitored = up + down
+    return {
+        "up_s": up,
+        "down_s": down,
+        "unmonitored_s": unmonitored,
+        "samples": int(samples),
+        "down_samples": int(down_samples),
+        "uptime_pct": 100 - (down / monitored * 100) if monitored else 100.0,
+    }
+
+def _select(first_day, last_day, hosts, by_day):
+    day = "day, " if by_day else ""
+    sql = f"""
+    SELECT {day}TOTAL(up_s), TOTAL(down_s), TOTAL(unmonitored_s), TOTAL(samples), TOTAL(down_samples)
+    FROM sla_daily WHERE day BETWEEN ? AND ?
+    """
+    params = [first_day.isoformat(), last_day.isoformat()]
+    if hosts:
+        hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+        sql += f" AND target_host IN ({', '.join('?' * len(hosts))})"
+        params.extend(hosts)
+    if by_day:
+        sql += " GROUP BY day ORDER BY day"
+    return sql, params
+
+def summary(conn, first_day, last_day, hosts=None):
+    """Totais de [first_day, last_day] somando só as linhas diárias (O(dias))"""
+    return _as_dict(*conn.execute(*_select(first_day, last_day, hosts, False)).fetchone())
+
+def daily(conn, first_day, last_day, hosts=None):
+    """Mesmos totais de summary, um dict por dia -> {'AAAA-MM-DD': {...}}"""
+    return {row[0]: _as_dict(*row[1:]) for row in conn.execute(*_select(first_day, last_day, hosts, True))}
+
+def refund(contract_value, down_s, month_days, penalty=REFUND_PENALTY):
+    """Reembolso estimado: (valor mensal / minutos do mês) * minutos fora * multa"""
+    minutes_in_month = month_days * 24 * 60
+    return (contract_value / minutes_in_month) * (down_s / 60) * penalty
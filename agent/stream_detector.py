@@ -0,0 +1,167 @@
+import json
+import math
+
+# Detector em fluxo (roda no agente a cada amostra gravada)
+DETECTOR = "stream"
+STREAM_METRICS = {
+    # métrica do agente -> (coluna no banco, rótulo, unidade, escala mínima)
+    "ping": ("ping_ms", "Ping", "ms", 2.0),
+    "jitter": ("jitter_ms", "Jitter", "ms", 1.0),
+    "packet_loss": ("packet_loss", "Perda", "%", 2.0),   # 1 pacote em 15 = 6,7%: z ~3, ainda não é pico
+    "dns": ("dns_response_ms", "DNS", "ms", 5.0),
+    "gateway_ping": ("gateway_ping_ms", "Gateway", "ms", 1.0),
+}
+WARMUP = 30            # Amostras por métrica antes de emitir alertas
+ETA = 0.01             # Passo da mediana/MAD em fluxo (fração da escala por amostra)
+MAD_TO_SIGMA = 1.4826  # MAD -> desvio padrão equivalente (distribuição normal)
+Z_CLIP = 3.0           # Huber: um único outlier não move EWMA/CUSUM além disso
+BIAS_LAMBDA = 0.002    # Média lenta de z (~500 amostras): latência é assimétrica, z não tem média 0
+SPIKE_Z = 8.0          # Pico isolado (latência tem cauda longa: 6 sigma ainda é comum)
+EWMA_LAMBDA = 0.05
+EWMA_L = 4.0           # Limite de controle do EWMA (em desvios da estatística EWMA)
+CUSUM_K = 1.0          # Folga do CUSUM (em sigmas): ignora desvios menores que isso
+CUSUM_H = 15.0         # Limiar do CUSUM: degradação gradual acumulada
+COOLDOWN = 90          # Amostras (~15 min) sem repetir o mesmo tipo de alerta para o mesmo alvo/métrica
+JOINT = "_joint"       # Chave do estado do alerta conjunto no estado do alvo (não é uma métrica)
+# Quantil 99,9% da qui-quadrado por graus de liberdade (score conjunto de todas as métricas)
+CHI2_999 = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47, 5: 20.52}
+
+EWMA_VARIANCE = EWMA_LAMBDA / (2 - EWMA_LAMBDA)  # Variância assintótica do EWMA de z ~ N(0, 1)
+EWMA_LIMIT = EWMA_L * math.sqrt(EWMA_VARIANCE)
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_state (
+    target_host TEXT PRIMARY KEY,
+    state TEXT,
+    updated_at DATETIME
+)
+"""
+
+def new_metric_state():
+    return {"n": 0, "median": None, "mad": None, "bias": 0.0, "ewma": 0.0, "cusum": 0.0, "cooldown": {}}
+
+def new_joint_state():
+    return {"cooldown": {}}
+
+class StreamDetector:
+    """Detecção de mudanças em fluxo, O(1) em memória e tempo por amostra.
+
+    Para cada (alvo, métrica) mantém mediana e MAD aproximadas em fluxo
+    (atualização por sinal, robusta a outliers) e, sobre o z robusto
+    (x - mediana) / (1.4826 * MAD), três testes só no sentido da piora:
+      - pico:  |z| acima de SPIKE_Z numa única amostra;
+      - EWMA:  média móvel exponencial de z fora do limite de controle
+               (degradação moderada e sustentada);
+      - CUSUM: soma acumulada de z - k (degradação gradual que nunca cruza 3 sigma).
+    O score conjunto soma z² das métricas que pioraram juntas e compara com a
+    qui-quadrado: várias métricas um pouco piores ao mesmo tempo viram um alerta.
+    """
+
+    def __init__(self, metrics=STREAM_METRICS):
+        self.metrics = metrics
+        self.hosts = {}
+
+    def _host(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = {m: new_metric_state() for m in self.metrics}
+            state[JOINT] = new_joint_state()
+        return state
+
+    @staticmethod
+    def _robust_z(state, value, floor):
+        """Atualiza mediana/MAD em fluxo e retorna o z robusto da amostra (antes da atualização)"""
+        if state["median"] is None:
+            state["median"], state["mad"] = value, floor
+            state["n"] = 1
+            return 0.0
+        scale = max(state["mad"] * MAD_TO_SIGMA, floor)
+        z = (value - state["median"]) / scale
+        # Mediana e MAD por aproximação estocástica: passo proporcional à escala, direção pelo sinal
+        step = ETA * scale
+        state["median"] += step if value > state["median"] else -step if value < state["median"] else 0.0
+        deviation = abs(value - state["median"])
+        state["mad"] += ETA * max(state["mad"], floor) * (1 if deviation > state["mad"] else -1)
+        state["mad"] = max(state["mad"], floor / MAD_TO_SIGMA / 4)
+        state["n"] += 1
+        return z
+
+    @staticmethod
+    def _tick(state):
+        for kind in list(state["cooldown"]):
+            state["cooldown"][kind] -= 1
+
+    def _fire(self, state, kind):
+        """True se o alerta pode sair (respeita o cooldown por tipo)"""
+        remaining = state["cooldown"].get(kind, 0)
+        if remaining > 0:
+            return False
+        state["cooldown"][kind] = COOLDOWN
+        return True
+
+    def update(self, host, data):
+        """Processa uma amostra (dict do agente); retorna [(score, motivo)] dos alertas disparados"""
+        host_state = self._host(host)
+        # Cooldown do alerta conjunto conta amostras do alvo, mesmo com alguma métrica sem medida
+        self._tick(host_state[JOINT])
+        events, joint = [], []
+        for metric, (_, label, unit, floor) in self.metrics.items():
+            value = data.get(metric)
+            if value is None:
+                continue  # Falha de medição (ex: DNS) não entra na estatística
+            state = host_state[metric]
+            self._tick(state)
+            median = state["median"]
+            z = self._robust_z(state, float(value), floor)
+            clipped = max(min(z, Z_CLIP), -Z_CLIP)
+            centered = clipped - state["bias"]
+            state["bias"] += BIAS_LAMBDA * centered
+            state["ewma"] = EWMA_LAMBDA * centered + (1 - EWMA_LAMBDA) * state["ewma"]
+            state["cusum"] = max(0.0, state["cusum"] + centered - CUSUM_K)
+            if state["n"] <= WARMUP:
+                continue
+
+            if z > SPIKE_Z and self._fire(state, "spike"):
+                events.append((z, f"Pico de {label} ({value:.1f}{unit} vs mediana {median:.1f}{unit})"))
+            if state["ewma"] > EWMA_LIMIT and self._fire(state, "ewma"):
+                events.append((state["ewma"] / EWMA_LIMIT * EWMA_L,
+                               f"{label} degradado de forma sustentada ({value:.1f}{unit} vs mediana {median:.1f}{unit})"))
+            if state["cusum"] > CUSUM_H:
+                if self._fire(state, "cusum"):
+                    events.append((state["cusum"],
+                                   f"Degradação gradual de {label} (CUSUM {state['cusum']:.1f}; mediana {median:.1f}{unit})"))
+                state["cusum"] = 0.0  # Recomeça a acumular a partir do novo patamar
+            if state["ewma"] > 0:
+                joint.append((label, state["ewma"]))
+
+        # MEWMA: as médias exponenciais de todas as métricas juntas (só as que pioraram)
+        if len(joint) >= 2:
+            score = sum(ewma ** 2 for _, ewma in joint) / EWMA_VARIANCE
+            threshold = CHI2_999.get(len(joint), CHI2_999[max(CHI2_999)])
+            if score > threshold and self._fire(host_state[JOINT], "joint"):
+                labels = ", ".join(label for label, _ in joint)
+                events.append((score, f"Desvio conjunto ({labels}): score {score:.1f} > {threshold:.1f}"))
+        return events
+
+    # --- PERSISTÊNCIA (estado sobrevive a reinícios do agente) ---
+
+    def state_rows(self, timestamp, hosts=None):
+        hosts = self.hosts if hosts is None else hosts
+        return [(host, json.dumps(self.hosts[host]), timestamp) for host in hosts if host in self.hosts]
+
+    def load(self, conn):
+        for host, raw in conn.execute("SELECT target_host, state FROM stream_state"):
+            try:
+                state = json.loads(raw)
+            except ValueError:
+                continue
+            # Métricas novas (não existiam quando o estado foi salvo) começam do zero
+            self.hosts[host] = {m: state.get(m, new_metric_state()) for m in self.metrics}
+            joint = state.get(JOINT)
+            if joint is None:
+                # Estado de versão anterior: o cooldown conjunto ficava na primeira métrica
+                joint = new_joint_state()
+                first = self.hosts[host][next(iter(self.metrics))]
+                if "joint" in first["cooldown"]:
+                    joint["cooldown"]["joint"] = first["cooldown"].pop("joint")
+            self.hosts[host][JOINT] = joint
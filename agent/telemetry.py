@@ -0,0 +1,205 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Auto-instrumentação do agente (formato de exposição do Prometheus)
+METRICS_HOST = "127.0.0.1"     # Só localhost: o endpoint não tem autenticação
+METRICS_PORT = 9108
+METRICS_PATH = "/metrics"
+PREFIX = "sentinel_"
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _labels(labels):
+    """Chave estável dos rótulos: tupla ordenada (nome, valor)"""
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+def process_usage():
+    """CPU acumulada (s) e memória residente (bytes) do próprio processo"""
+    cpu = time.process_time()
+    if PSUTIL_AVAILABLE:
+        return cpu, psutil.Process().memory_info().rss
+    try:
+        # Linux sem psutil: segunda coluna de statm = páginas residentes
+        with open("/proc/self/statm") as f:
+            return cpu, int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return cpu, None
+
+class Histogram:
+    """Contagem por faixa (buckets cumulativos na exposição), soma e total"""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Telemetry:
+    """Registro em memória de contadores, gauges e histogramas do agente.
+
+    Cada operação é um incremento sob um lock (microssegundos), então pode ficar
+    no caminho quente do ciclo de coleta. Gauges "vivos" (profundidade da fila,
+    estatísticas do agendador) são lidos por callbacks só na exposição.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.callbacks = []
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """Mede um estágio do ciclo (perf_counter) no histograma stage_seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def timed(self, stage, func):
+        """Versão de `timer` para funções executadas em outras threads (ex: traceroute)"""
+        def wrapper(*args, **kwargs):
+            with self.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def register(self, callback):
+        """callback() -> {nome: valor} lido a cada exposição/snapshot"""
+        self.callbacks.append(callback)
+
+    def _collect(self):
+        cpu, rss = process_usage()
+        live = {"process_cpu_seconds": cpu, "uptime_seconds": time.time() - self.started}
+        if rss is not None:
+            live["process_resident_memory_bytes"] = rss
+        for callback in self.callbacks:
+            try:
+                live.update(callback())
+            except Exception:
+                pass  # Um callback quebrado não derruba a exposição
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self.histograms.items()}
+        gauges.update({(name, ()): value for name, value in live.items()})
+        return counters, gauges, histograms
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (text/plain 0.0.4)"""
+        counters, gauges, histograms = self._collect()
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                for (series_name, key), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (series_name, key), (counts, total, count, buckets) in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, timestamp=None):
+        """Linhas (timestamp, nome, rótulos JSON, valor) para a tabela agent_stats.
+
+        Histogramas entram como _sum e _count cumulativos: a média de um estágio
+        num período é a diferença das somas dividida pela diferença das contagens.
+        """
+        timestamp = timestamp or datetime.now()
+        counters, gauges, histograms = self._collect()
+        rows = [(timestamp, name, json.dumps(dict(key)), value)
+                for (name, key), value in list(counters.items()) + list(gauges.items())]
+        for (name, key), (_, total, count, _) in histograms.items():
+            rows.append((timestamp, f"{name}_sum", json.dumps(dict(key)), total))
+            rows.append((timestamp, f"{name}_count", json.dumps(dict(key)), count))
+        return rows
+
+# Registro do processo: agente, banco e motor de sondagem registram aqui
+telemetry = Telemetry()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server_version = "SentinelMetrics/1.0"
+
+    def do_GET(self):
+        if self.path != METRICS_PATH:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.telemetry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes periódicos não poluem o console do agente
+
+class MetricsServer(ThreadingHTTPServer):
+    """Endpoint /metrics em segundo plano para o Prometheus (ou curl) ler"""
+    daemon_threads = True
+
+    def __init__(self, registry=telemetry, host=METRICS_HOST, port=METRICS_PORT):
+        super().__init__((host, port), MetricsHandler)
+        self.telemetry = registry
+        self._thread = threading.Thread(target=self.serve_forever, name="sentinel-metrics", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{METRICS_PATH}"
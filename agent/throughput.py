@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+from telemetry import telemetry
+
+# Vazão passiva: contadores de bytes das interfaces lidos a cada ciclo (custo ~zero, sem tráfego)
+PROC_NET_DEV = "/proc/net/dev"
+THROUGHPUT_INTERFACES = None  # None = todas, exceto loopback/virtuais; ou lista (ex: ["eth0", "wlan0"])
+IGNORED_PREFIXES = ("lo", "docker", "veth", "br-", "virbr", "vmnet", "vboxnet", "tun", "tap", "wg")
+MAX_RATE_MBPS = 100_000       # Acima disso a diferença é reinício do contador, não tráfego
+
+# Teste ativo: download/upload HTTP ocasional, só com o link ocioso (None = desligado)
+ACTIVE_DOWNLOAD_URL = None    # ex: "http://10.0.0.5:8080/download?bytes=50000000"
+ACTIVE_UPLOAD_URL = None      # ex: "http://10.0.0.5:8080/upload" (recebe POST e descarta)
+ACTIVE_INTERVAL = 6 * 3600    # Segundos mínimos entre dois testes
+ACTIVE_MAX_SECONDS = 10       # Cada sentido para depois disso (a taxa usa o que foi transferido)
+ACTIVE_MAX_BYTES = 100_000_000
+ACTIVE_TIMEOUT = 5            # Segundos para conectar/receber cada bloco
+IDLE_MBPS = 1.0               # Link "ocioso": tráfego abaixo disso nos dois sentidos...
+IDLE_CYCLES = 3               # ...por N ciclos seguidos
+TRANSFER_CHUNK = 64 * 1024
+
+def read_interface_counters(path=PROC_NET_DEV):
+    """{interface: (bytes recebidos, bytes enviados)} do kernel; psutil fora do Linux; {} sem fonte"""
+    if os.path.exists(path):
+        counters = {}
+        with open(path) as f:
+            for line in f.readlines()[2:]:  # Duas linhas de cabeçalho
+                name, _, fields = line.partition(":")
+                fields = fields.split()
+                if len(fields) >= 9:
+                    counters[name.strip()] = (int(fields[0]), int(fields[8]))
+        return counters
+    if PSUTIL_AVAILABLE:
+        return {name: (c.bytes_recv, c.bytes_sent) for name, c in psutil.net_io_counters(pernic=True).items()}
+    return {}
+
+def counter_delta(previous, current):
+    """Diferença de um contador que pode dar a volta (32 bits em kernels/drivers antigos, 64 nos demais).
+
+    Só é volta se o valor anterior estava na metade de cima da faixa; senão o
+    contador foi zerado (interface recriada) e a diferença é desconhecida (None).
+    """
+    if current >= previous:
+        return current - previous
+    width = 2 ** 32 if previous < 2 ** 32 else 2 ** 64
+    if previous < width // 2:
+        return None
+    return current + width - previous
+
+def http_download(url, max_bytes=ACTIVE_MAX_BYTES, max_seconds=ACTIVE_MAX_SECONDS, timeout=ACTIVE_TIMEOUT):
+    """Baixa até max_bytes (ou max_seconds) descartando o conteúdo; retorna (bytes, segundos)"""
+    received = 0
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        start = time.perf_counter()
+        while received < max_bytes and time.perf_counter() - start < max_seconds:
+            chunk = response.read(min(TRANSFER_CHUNK, max_bytes - received))
+            if not chunk:
+                break
+            received += len(chunk)
+        return received, time.perf_counter() - start
+
+def http_upload(url, max_bytes=ACTIVE_MAX_BYTES, max_seconds=ACTIVE_MAX_SECONDS, timeout=ACTIVE_TIMEOUT):
+    """Envia até max_bytes (ou max_seconds) num POST em blocos; retorna (bytes, segundos)"""
+    block = bytes(TRANSFER_CHUNK)
+    sent = 0
+    start = time.perf_counter()
+
+    def body():
+        nonlocal sent
+        while sent < max_bytes and time.perf_counter() - start < max_seconds:
+            size = min(TRANSFER_CHUNK, max_bytes - sent)
+            sent += size
+            yield block[:size]
+
+    request = urllib.request.Request(url, data=body(), method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return sent, time.perf_counter() - start
+
+def mbps(n_bytes, seconds):
+    return round(n_bytes * 8 / seconds / 1e6, 2) if seconds > 0 else None
+
+class ThroughputSampler:
+    """Taxa por interface a partir de duas leituras dos contadores (download/upload do ciclo).
+
+    A primeira chamada só guarda a referência (None). Contador que voltou
+    atrás é volta de 32/64 bits ou reinício da interface (counter_delta); no
+    reinício, ou se a "taxa" resultante for impossível, a interface fica fora
+    daquele ciclo.
+    """
+
+    def __init__(self, counters=read_interface_counters, interfaces=THROUGHPUT_INTERFACES, clock=time.monotonic):
+        self.counters = counters
+        self.interfaces = interfaces
+        self.clock = clock
+        self.previous = None
+        self.rates = {}
+
+    def _selected(self, counters):
+        if self.interfaces is not None:
+            return {name: value for name, value in counters.items() if name in self.interfaces}
+        return {name: value for name, value in counters.items() if not name.startswith(IGNORED_PREFIXES)}
+
+    def sample(self):
+        """(download Mbps, upload Mbps) somando as interfaces desde a última chamada; None na primeira"""
+        now, counters = self.clock(), self._selected(self.counters())
+        previous, self.previous = self.previous, (now, counters)
+        if previous is None or now <= previous[0]:
+            return None
+        elapsed = now - previous[0]
+        self.rates = {}
+        for name, (rx, tx) in counters.items():
+            if name not in previous[1]:
+                continue  # Interface nova: entra no próximo ciclo
+            old_rx, old_tx = previous[1][name]
+            deltas = (counter_delta(old_rx, rx), counter_delta(old_tx, tx))
+            rates = None if None in deltas else (mbps(deltas[0], elapsed), mbps(deltas[1], elapsed))
+            if rates is None or max(rates) > MAX_RATE_MBPS:
+                telemetry.inc("throughput_counter_resets_total")
+                continue
+            self.rates[name] = rates
+        if not self.rates:
+            return None
+        return (round(sum(r[0] for r in self.rates.values()), 2),
+                round(sum(r[1] for r in self.rates.values()), 2))
+
+class ActiveThroughputTest:
+    """Teste de banda ativo em segundo plano, só quando o link está ocioso há IDLE_CYCLES ciclos.
+
+    O ciclo de coleta só chama observe() com a vazão passiva; o teste roda numa
+    thread e grava o resultado em throughput_tests. Sem URL configurada não faz nada.
+    """
+
+    def __init__(self, backend, db, download_url=ACTIVE_DOWNLOAD_URL, upload_url=ACTIVE_UPLOAD_URL,
+                 interval=ACTIVE_INTERVAL, idle_mbps=IDLE_MBPS, idle_cycles=IDLE_CYCLES, clock=time.monotonic):
+        self.backend = backend
+        self.db = db
+        self.download_url = download_url
+        self.upload_url = upload_url
+        self.interval = interval
+        self.idle_mbps = idle_mbps
+        self.idle_cycles = idle_cycles
+        self.clock = clock
+        self.idle_streak = 0
+        self.next_run = clock()  # Primeiro teste assim que o link ficar ocioso
+        self.last_result = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def observe(self, passive):
+        """Chamado a cada ciclo com (download, upload) passivos; dispara o teste se for a hora. True = disparou"""
+        if not (self.download_url or self.upload_url) or self.running:
+            return False
+        idle = passive is not None and max(passive) < self.idle_mbps
+        self.idle_streak = self.idle_streak + 1 if idle else 0
+        if self.idle_streak < self.idle_cycles or self.clock() < self.next_run:
+            return False
+        self.idle_streak = 0
+        self.next_run = self.clock() + self.interval
+        self._thread = threading.Thread(target=self.run, name="sentinel-throughput", daemon=True)
+        self._thread.start()
+        return True
+
+    def _transfer(self, func, url):
+        if not url:
+            return None, None, None
+        try:
+            n_bytes, seconds = func(url)
+            return mbps(n_bytes, seconds), n_bytes, None
+        except Exception as e:
+            telemetry.inc("throughput_test_errors_total")
+            return None, None, f"{type(e).__name__}: {e}"
+
+    def run(self):
+        """Executa o teste (download e depois upload) e grava o resultado"""
+        timestamp = datetime.now()
+        with telemetry.timer("throughput_test"):
+            download, down_bytes, down_error = self._transfer(self.backend.http_download, self.download_url)
+            upload, up_bytes, up_error = self._transfer(self.backend.http_upload, self.upload_url)
+        error = "; ".join(e for e in (down_error, up_error) if e) or None
+        self.last_result = {"timestamp": timestamp, "download_mbps": download, "upload_mbps": upload,
+                            "download_bytes": down_bytes, "upload_bytes": up_bytes,
+                            "server": self.download_url or self.upload_url, "error": error}
+        self.db.save_throughput(self.last_result)
+        print(f"🚀 [BANDA] Teste ativo: ↓ {download} Mbps | ↑ {upload} Mbps" + (f" ({error})" if error else ""))
+        return self.last_result
+
+    def close(self, wait=False):
+        if wait and self._thread is not None:
+            self._thread.join()
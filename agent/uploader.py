@@ -0,0 +1,166 @@
+import base64
+import glob
+import gzip
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+# Envio das métricas do agente para o servidor de ingestão da frota
+UPLOAD_INTERVAL = 5.0              # Segundos entre envios
+UPLOAD_BATCH = 500                 # Linhas por requisição
+UPLOAD_TIMEOUT = 10                # Segundos por requisição
+SPOOL_MAX_BYTES = 100 * 1024 * 1024  # Servidor fora por muito tempo: descarta os segmentos mais antigos
+
+CURRENT_SEGMENT = "current.jsonl"
+SEQ_FILE = "seq"
+EPOCH_FILE = "epoch"  # Identifica este spool: apagado o spool, o seq recomeça em outra época
+UPLOAD_FIELDS = ["ping", "jitter", "rtp_jitter", "packet_loss", "download", "upload", "dns", "gateway_ping",
+                 "host", "status"]
+
+class Uploader:
+    """Spool em disco + envio em lote para o servidor de ingestão.
+
+    Toda métrica é anexada primeiro a um arquivo de spool (sobrevive a quedas do
+    agente e do servidor). A thread de envio fecha o segmento atual, manda os
+    segmentos em ordem e só os apaga depois da confirmação do servidor. Cada
+    linha leva um `seq` crescente: reenvios são descartados do lado do servidor.
+    O `seq` vale dentro da época do spool (enviada em cada lote): spool apagado ou
+    agente reinstalado recomeça em 1 numa época nova, sem colidir com o que o servidor já viu.
+    """
+
+    def __init__(self, url, agent_id, spool_dir="spool", token=None,
+                 interval=UPLOAD_INTERVAL, batch_size=UPLOAD_BATCH, timeout=UPLOAD_TIMEOUT):
+        self.url = url
+        self.agent_id = agent_id
+        self.spool_dir = spool_dir
+        self.token = token
+        self.interval = interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        os.makedirs(spool_dir, exist_ok=True)
+        self.epoch = self._recover_epoch()
+        self.seq = self._recover_seq()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._file = open(os.path.join(spool_dir, CURRENT_SEGMENT), "a", encoding="utf-8")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sentinel-uploader", daemon=True)
+        self._thread.start()
+
+    def _recover_epoch(self):
+        """Época gravada no spool; sem ela (spool novo ou apagado), uma nova"""
+        path = os.path.join(self.spool_dir, EPOCH_FILE)
+        try:
+            with open(path) as f:
+                epoch = f.read().strip()
+            if epoch:
+                return epoch
+        except OSError:
+            pass
+        epoch = uuid.uuid4().hex
+        with open(path, "w") as f:
+            f.write(epoch)
+        return epoch
+
+    def _recover_seq(self):
+        """Maior seq já usado: o gravado na última rotação ou o maior ainda no spool"""
+        seq = 0
+        try:
+            with open(os.path.join(self.spool_dir, SEQ_FILE)) as f:
+                seq = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            pass
+        for path in glob.glob(os.path.join(self.spool_dir, "*.jsonl")):
+            for record in self._read(path):
+                seq = max(seq, record['seq'])
+        return seq
+
+    @staticmethod
+    def _read(path):
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass  # Linha cortada por uma queda no meio da escrita
+        return records
+
+    def submit(self, data, timestamp=None):
+        """Anexa a métrica ao spool (não bloqueia na rede)"""
+        record = {field: data.get(field) for field in UPLOAD_FIELDS}
+        record['timestamp'] = (timestamp or data.get('timestamp') or datetime.now()).isoformat()
+        if data.get('ping_sketch') is not None:
+            record['ping_sketch'] = base64.b64encode(data['ping_sketch']).decode('ascii')
+        with self._lock:
+            self.seq += 1
+            record['seq'] = self.seq
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def _rotate(self):
+        """Fecha o segmento atual como <seq>.jsonl e começa um novo"""
+        with self._lock:
+            if self._file.tell() == 0:
+                return
+            self._file.close()
+            current = os.path.join(self.spool_dir, CURRENT_SEGMENT)
+            os.replace(current, os.path.join(self.spool_dir, f"{self.seq:012d}.jsonl"))
+            with open(os.path.join(self.spool_dir, SEQ_FILE), "w") as f:
+                f.write(str(self.seq))
+            self._file = open(current, "a", encoding="utf-8")
+
+    def _segments(self):
+        segments = sorted(p for p in glob.glob(os.path.join(self.spool_dir, "*.jsonl"))
+                          if os.path.basename(p) != CURRENT_SEGMENT)
+        # Limite de disco: os segmentos mais antigos saem primeiro
+        total = sum(os.path.getsize(p) for p in segments)
+        while segments and total > SPOOL_MAX_BYTES:
+            oldest = segments.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+            print(f"⚠️ [UPLOAD] Spool cheio: segmento {os.path.basename(oldest)} descartado.")
+        return segments
+
+    def _post(self, records):
+        body = gzip.compress(json.dumps({"agent_id": self.agent_id, "epoch": self.epoch, "metrics": records}).encode('utf-8'))
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        })
+        if self.token:
+            request.add_header("X-Sentinel-Token", self.token)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def flush(self):
+        """Envia tudo o que está no spool; True se o spool ficou vazio"""
+        with self._send_lock:
+            self._rotate()
+            for path in self._segments():
+                records = self._read(path)
+                try:
+                    for i in range(0, len(records), self.batch_size):
+                        self._post(records[i:i + self.batch_size])
+                except (urllib.error.URLError, OSError, ValueError) as e:
+                    # Servidor fora: o segmento fica no disco e é reenviado no próximo ciclo
+                    print(f"📴 [UPLOAD] Servidor indisponível ({e}); {len(records)} registro(s) no spool.")
+                    return False
+                os.remove(path)
+            return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self, flush=True):
+        self._stop.set()
+        self._thread.join()
+        if flush:
+            self.flush()
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,130 @@
+"""Benchmark: carregar um mês de histórico do SQLite (read_sql_query) vs do arquivo Parquet.
+
+Gera N dias sintéticos (1 amostra a cada 10s), exporta com o Archiver e compara
+tempo e memória do DataFrame resultante para as colunas usadas na análise.
+
+Também confere linhas atrasadas da frota (id maior que as de hoje, timestamp de ontem):
+read_period devolve o arquivo e todas as linhas vivas do período, sem perder as de hoje;
+num dia já exportado e podado, a linha atrasada não é apagada antes de ir para o arquivo.
+
+Uso: python benchmarks/bench_archive.py [dias]
+"""
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import SentinelDB, INSERT_METRIC
+from archive import Archiver, read_archive, read_period
+from sketch import DDSketch
+
+COLUMNS = ["timestamp", "target_host", "ping_ms", "jitter_ms", "packet_loss", "status"]
+
+def build(path, days):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = SentinelDB(path, buffered=False)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    rows = []
+    for i in range(days * 8640):
+        bad = random.random() < 0.01
+        rows.append((start + timedelta(seconds=10 * i), 300.0 if bad else random.gauss(20, 2),
+                     abs(random.gauss(2, 0.5)), 6.67 if bad else 0.0, 0, 0, random.gauss(25, 3), 1.5,
+                     None, "8.8.8.8", "ISP_LATENCY" if bad else "OK", None, None, None))
+    db.conn.executemany(INSERT_METRIC, rows)
+    db.conn.commit()
+    db.close()
+    return start
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+def sample(timestamp, host):
+    sketch = DDSketch()
+    sketch.add(20.0)
+    return {"timestamp": timestamp, "ping": 20.0, "jitter": 1.0, "rtp_jitter": 0.5, "packet_loss": 0.0,
+            "host": host, "agent_id": host.split("/")[0], "ping_sketch": sketch.to_bytes(), "status": "OK"}
+
+def check_late_rows(tmp):
+    """Ontem (a/x), hoje (b/x) e uma linha atrasada de ontem que chega depois da de hoje"""
+    os.makedirs(os.path.join(tmp, "late"))
+    path = os.path.join(tmp, "late", "late.db")  # Pasta própria: o arquivo fica ao lado do banco
+    now = datetime.now().replace(microsecond=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = SentinelDB(path, buffered=False)
+        db.save_metric(sample(now - timedelta(days=1), "a/x"))
+        db.save_metric(sample(now - timedelta(minutes=1), "b/x"))
+        db.save_metric(sample(now - timedelta(days=1, minutes=5), "a/x"))
+        db.close()
+        archiver = Archiver(path)
+        archiver.run()
+        archiver.close()
+    ids = sorted(read_period(path, now - timedelta(days=2), now)['id'])
+    return check(f"read_period com linha atrasada: ids {ids}", ids == [1, 2, 3])
+
+def check_late_export(tmp):
+    """Dia antigo exportado e podado; chega uma linha atrasada dele: poda antes de exportar não a apaga"""
+    os.makedirs(os.path.join(tmp, "prune"))
+    path = os.path.join(tmp, "prune", "prune.db")
+    day = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=10)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = SentinelDB(path, buffered=False)
+        for i in range(5):
+            db.save_metric(sample(day + timedelta(minutes=i), "a/x"))
+        archiver = Archiver(path)
+        archiver.run(prune=True, keep_days=3)
+        db.save_metric(sample(day + timedelta(minutes=30), "a/x"))
+        kept = archiver.prune(keep_days=3) == 0
+        exported, removed = archiver.run(prune=True, keep_days=3)
+        archiver.close()
+        db.close()
+    archived = read_archive(archiver.archive_dir)
+    failures = check(f"linha atrasada mantida pela poda e reexportada ({exported} nova, {removed} podada)",
+                     kept and (exported, removed) == (1, 1) and sorted(archived['id']) == [1, 2, 3, 4, 5, 6])
+    failures += check("arquivo guarda agent_id, rtp_jitter_ms e ping_sketch",
+                      (archived['agent_id'] == "a").all() and (archived['rtp_jitter_ms'] == 0.5).all()
+                      and all(DDSketch.from_bytes(b).count == 1 for b in archived['ping_sketch']))
+    return failures
+
+def report(label, elapsed, df):
+    mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"{label:<22} {elapsed * 1000:8.1f} ms | {len(df):,} linhas | {mb:7.1f} MB em memória")
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = build(path, days)
+        end = start + timedelta(days=days) - timedelta(microseconds=1)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            archiver = Archiver(path)
+            archiver.run()
+            archiver.close()
+        parquet_mb = sum(os.path.getsize(os.path.join(archiver.archive_dir, f))
+                         for f in os.listdir(archiver.archive_dir)) / 1024 / 1024
+        print(f"banco: {os.path.getsize(path) / 1024 / 1024:.1f} MB | parquet: {parquet_mb:.1f} MB ({days} dias)")
+
+        conn = sqlite3.connect(path)
+        t = time.perf_counter()
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNS)} FROM metrics WHERE timestamp BETWEEN ? AND ?",
+            conn, params=(start, end), parse_dates=["timestamp"]
+        )
+        report("sqlite read_sql_query", time.perf_counter() - t, df)
+        conn.close()
+
+        t = time.perf_counter()
+        df = read_archive(archiver.archive_dir, start, end, columns=COLUMNS)
+        report("parquet (mmap)", time.perf_counter() - t, df)
+
+        failures = check_late_rows(tmp) + check_late_export(tmp)
+    sys.exit(1 if failures else 0)
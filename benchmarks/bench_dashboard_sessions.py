@@ -0,0 +1,121 @@
+"""Carga do dashboard com N sessões simultâneas (navegadores abertos) lendo o mesmo banco.
+
+Cada sessão é uma thread que "reexecuta o app" a cada REFRESH segundos enquanto um
+gravador acrescenta uma amostra por ciclo do agente (a versão dos dados muda):
+- por sessão: cada rerun recarrega, detecta, agrega e monta as figuras (comportamento antigo);
+- compartilhado: SharedViews.view(), um cálculo por versão dos dados para todas as sessões.
+Nos dois modos cada sessão ainda serializa as figuras (o que st.plotly_chart faz por sessão).
+
+Mostra CPU do processo, cálculos feitos e latência p50/p95 de um rerun por N sessões,
+e confere que a visão compartilhada é igual à calculada só para uma sessão.
+
+Uso: python benchmarks/bench_dashboard_sessions.py [dias de histórico] [segundos por rodada] [sessões...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import plotly.io as pio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'dashboard')))
+from views import SharedViews
+from database import SentinelDB
+from simulator import SimulatedBackend, generate_history
+
+HOURS = 24
+LABEL = "Últimas 24 horas"
+REFRESH = 0.5     # Segundos entre reruns de uma sessão (o app usa 5 s; encurtado para caber na rodada)
+AGENT_CYCLE = 1.0  # Segundos entre amostras gravadas (o agente usa 10 s)
+
+class PerSessionViews(SharedViews):
+    """Sem cache: cada chamada recalcula tudo (só o NetworkBrain é serializado, como a instância única do app)"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self._brain_lock = threading.Lock()
+
+    def shared(self, key, version, compute):
+        with self._lock:
+            self.builds += 1
+        if key == ("anomalies",):
+            with self._brain_lock:
+                return compute()
+        return compute()
+
+def serialize(view):
+    """O que o Streamlit envia ao navegador de cada sessão: o JSON de cada figura"""
+    return sum(len(pio.to_json(fig.to_dict(), validate=False))
+               for fig in view.get('figures', {}).values() if fig is not None)
+
+def writer(path, stop):
+    backend = SimulatedBackend(seed=11)
+    db = SentinelDB(path)
+    while not stop.wait(AGENT_CYCLE):
+        db.save_metric({"timestamp": datetime.now(), "ping": backend.sample_rtt("8.8.8.8"), "jitter": 1.0,
+                        "packet_loss": 0.0, "host": "8.8.8.8", "status": "OK", "dns": 20.0, "gateway_ping": 1.2})
+    db.close()
+
+def run(views, sessions, seconds):
+    stop = threading.Event()
+    latencies = [[] for _ in range(sessions)]
+
+    def session(i):
+        while not stop.is_set():
+            started = time.perf_counter()
+            serialize(views.view(HOURS, label=LABEL))
+            latencies[i].append(time.perf_counter() - started)
+            stop.wait(REFRESH)
+
+    views.view(HOURS, label=LABEL)  # Primeira carga da janela fora da medição
+    views.builds = 0
+    agent = threading.Thread(target=writer, args=(views.db_path, stop))
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    cpu, wall = time.process_time(), time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.start()
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        agent.join()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    flat = np.array([x for per in latencies for x in per]) * 1000
+    return {"reruns": len(flat), "builds": views.builds, "cpu_pct": cpu / wall * 100,
+            "p50": np.percentile(flat, 50), "p95": np.percentile(flat, 95)}
+
+def check_same(path):
+    """Com os dados parados, a visão compartilhada == a calculada por uma sessão sozinha"""
+    shared, alone = SharedViews(path).view(HOURS, label=LABEL), PerSessionViews(path).view(HOURS, label=LABEL)
+    ok = (shared['df'].equals(alone['df']) and shared['month'] == alone['month']
+          and shared['latency'] == alone['latency'] and shared['events'].equals(alone['events'])
+          and all((shared['figures'][k] is None and alone['figures'][k] is None)
+                  or shared['figures'][k].to_json() == alone['figures'][k].to_json() for k in shared['figures']))
+    print(f"{'✅' if ok else '❌'} visão compartilhada == visão de uma sessão")
+    return ok
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    counts = [int(n) for n in sys.argv[3:]] or [1, 4, 16]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_history(path, days * 8640, hosts=["8.8.8.8"], seed=9)
+        ok = check_same(path)
+        print(f"{days} dias de histórico, janela de {HOURS} h, rerun a cada {REFRESH} s, "
+              f"amostra nova a cada {AGENT_CYCLE} s, {seconds:.0f} s por rodada")
+        for n in counts:
+            for mode, cls in (("por sessão", PerSessionViews), ("compartilhado", SharedViews)):
+                r = run(cls(path), n, seconds)
+                print(f"{n:3d} sessões {mode:>13}: {r['reruns']:5d} reruns, {r['builds']:5d} cálculos, "
+                      f"CPU {r['cpu_pct']:5.1f}% | rerun p50 {r['p50']:7.1f} ms p95 {r['p95']:7.1f} ms")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,106 @@
+"""Benchmark: gravação linha-a-linha (caminho antigo) vs gravador em lote com WAL.
+
+Mede registros/s do gravador e as travadas de um leitor concorrente
+(simulando o Dashboard) enquanto a escrita acontece. Por fim confere que um
+lote não se perde quando outra conexão segura o banco além do busy_timeout
+(ex: NetworkBrain reconstruindo as faixas sazonais).
+
+Uso: python benchmarks/bench_db_writer.py [n_registros]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import SentinelDB, INSERT_METRIC
+
+SAMPLE = {
+    "ping": 18.4, "jitter": 2.1, "packet_loss": 0.0, "dns": 22.0, "gateway_ping": 1.2,
+    "trace_log": "", "host": "8.8.8.8", "download": 0, "upload": 0, "status": "OK"
+}
+
+def legacy_writer(db_path, n):
+    """Reproduz o SentinelDB original: journal padrão (rollback) e commit por linha"""
+    conn = sqlite3.connect(db_path)
+    params = (datetime.now(), 18.4, 2.1, 0.0, 0, 0, 22.0, 1.2, "", "8.8.8.8", "OK", None, None, None)
+    for _ in range(n):
+        conn.execute(INSERT_METRIC, params)
+        conn.commit()
+    conn.close()
+
+def buffered_writer(db_path, n):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = SentinelDB(db_path, buffered=True)
+        for _ in range(n):
+            db.save_metric(SAMPLE)
+        db.close()
+
+def reader(db_path, stop, stalls):
+    conn = sqlite3.connect(db_path, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn.execute("SELECT * FROM metrics ORDER BY id DESC LIMIT 100").fetchall()
+        except sqlite3.OperationalError:
+            pass
+        stalls.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    conn.close()
+
+def run(name, writer, n, journal_mode):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = SentinelDB(db_path, buffered=False)
+            db.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            db.close()
+
+        stop = threading.Event()
+        stalls = []
+        t_reader = threading.Thread(target=reader, args=(db_path, stop, stalls))
+        t_reader.start()
+
+        start = time.perf_counter()
+        writer(db_path, n)
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        t_reader.join()
+
+    median = statistics.median(stalls) if stalls else 0
+    print(f"{name:<10} {n / elapsed:>12,.0f} reg/s | leitor: {len(stalls):>6} consultas, "
+          f"mediana {median:7.2f} ms, máx {max(stalls, default=0):7.2f} ms")
+
+def check_locked(hold=7.0, n=200):
+    """Outra conexão segura BEGIN IMMEDIATE por `hold` s (> busy_timeout de 5 s) enquanto o agente grava"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "locked.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = SentinelDB(db_path, buffered=True)
+            locker = sqlite3.connect(db_path, isolation_level=None)
+            locker.execute("BEGIN IMMEDIATE")
+            tickets = [db.save_metric(SAMPLE) for _ in range(n)]
+            time.sleep(hold)
+            locker.execute("COMMIT")
+            locker.close()
+            db.flush()
+            stored = db.conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+            db.close()
+    failed = sum(t.exception() is not None for t in tickets)
+    ok = stored == n and failed == 0
+    print(f"{'✅' if ok else '❌'} banco travado por {hold:.0f}s: {stored} de {n} registros gravados, "
+          f"{failed} ticket(s) com erro")
+    return ok
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    run("legado", legacy_writer, n, "DELETE")
+    run("lote+WAL", buffered_writer, n, "WAL")
+    sys.exit(0 if check_locked() else 1)
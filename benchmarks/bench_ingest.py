@@ -0,0 +1,154 @@
+"""Benchmark / teste em loopback do servidor de ingestão da frota.
+
+1. N agentes simultâneos (threads com Uploader) enviam M registros cada: mede registros/s.
+2. Spool: agentes gravam com o servidor fora do ar, o servidor volta e o spool é
+   reenviado; confere que nada se perdeu e que reenvios não duplicam linhas.
+3. Reenvio do mesmo lote (resposta perdida): deduplicado pelo seq.
+4. Gravação que falha: o lote não é confirmado e o detector em fluxo não avança;
+   o reenvio conta cada amostra uma vez só.
+5. Spool apagado (agente reinstalado): o seq recomeça em 1 numa época nova e nada é descartado.
+
+Uso: python benchmarks/bench_ingest.py [agentes] [registros_por_agente]
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from ingest_server import IngestServer, qualified_host
+from uploader import Uploader
+
+def sample(i, start):
+    bad = random.random() < 0.02
+    return {
+        "timestamp": start + timedelta(seconds=10 * i),
+        "ping": 300.0 if bad else random.gauss(20, 2), "jitter": abs(random.gauss(2, 0.5)),
+        "packet_loss": 6.67 if bad else 0.0, "dns": 22.0, "gateway_ping": 1.5,
+        "download": 0, "upload": 0, "host": "8.8.8.8", "status": "ISP_LATENCY" if bad else "OK",
+    }
+
+def make_agents(tmp, n, url):
+    return [Uploader(url, f"site-{a:03d}", os.path.join(tmp, f"spool-{a:03d}"), interval=3600)
+            for a in range(n)]
+
+def fill(agents, rows):
+    start = datetime.now() - timedelta(seconds=10 * rows)
+    for agent in agents:
+        for i in range(rows):
+            agent.submit(sample(i, start))
+
+def flush_all(agents):
+    results = [None] * len(agents)
+    def run(i):
+        results[i] = agents[i].flush()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(agents))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return all(results)
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    total, agents = conn.execute("SELECT COUNT(*), COUNT(DISTINCT agent_id) FROM metrics").fetchone()
+    conn.close()
+    return total, agents
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+if __name__ == "__main__":
+    n_agents = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 360
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "fleet.db")
+        port = free_port()
+
+        # 1. Vazão com N agentes enviando ao mesmo tempo
+        with quiet:
+            server = IngestServer(db_path, port=port).start()
+            agents = make_agents(tmp, n_agents, server.url)
+            fill(agents, rows)
+            start = time.perf_counter()
+            ok = flush_all(agents)
+            elapsed = time.perf_counter() - start
+        total, distinct = count_rows(db_path)
+        print(f"{'✅' if ok and total == n_agents * rows else '❌'} {n_agents} agentes x {rows} registros: "
+              f"{total:,} linhas de {distinct} agentes em {elapsed:.2f} s ({total / elapsed:,.0f} registros/s)")
+
+        # 2. Servidor fora: tudo vai para o spool
+        with quiet:
+            server.close()
+            fill(agents, rows)
+            offline_ok = flush_all(agents)
+
+        # Servidor volta na mesma porta: o spool é reenviado
+        with quiet:
+            server = IngestServer(db_path, port=port).start()
+            replay_ok = flush_all(agents)
+        total, _ = count_rows(db_path)
+        expected = 2 * n_agents * rows
+        print(f"{'✅' if not offline_ok and replay_ok and total == expected else '❌'} spool reenviado após a queda: "
+              f"{total:,} de {expected:,} linhas")
+
+        # 3. Reenvio do mesmo lote (resposta perdida): deduplicado pelo seq
+        agent = agents[0]
+        records = [dict(sample(i, datetime.now()), seq=i + 1) for i in range(10)]
+        for r in records:
+            r['timestamp'] = r['timestamp'].isoformat()
+        result = agent._post(records)
+        total_after, _ = count_rows(db_path)
+        print(f"{'✅' if result['accepted'] == 0 and total_after == total else '❌'} reenvio duplicado: "
+              f"{result['accepted']} aceitas, {result['duplicates']} descartadas")
+
+        # 4. Banco falha durante o lote: sem confirmação e sem avançar o detector
+        def locked(data):
+            ticket = Future()
+            ticket.set_exception(sqlite3.OperationalError("database is locked"))
+            return ticket
+        batch = [dict(sample(i, datetime.now()), seq=i + 1, timestamp=datetime.now().isoformat()) for i in range(20)]
+        save_metric, server.db.save_metric = server.db.save_metric, locked
+        try:
+            server.ingest("site-fail", batch)
+            failed = False
+        except sqlite3.OperationalError:
+            failed = True
+        server.db.save_metric = save_metric
+        state = server.detector.hosts.get(qualified_host("site-fail", "8.8.8.8"), {})
+        after_failure = state.get("ping", {}).get("n", 0)
+        with quiet:
+            result = server.ingest("site-fail", batch)
+        after_retry = server.detector.hosts[qualified_host("site-fail", "8.8.8.8")]["ping"]["n"]
+        print(f"{'✅' if failed and after_failure == 0 and result['accepted'] == 20 and after_retry == 20 else '❌'} "
+              f"gravação falhou: detector com {after_failure} amostras; após o reenvio, {after_retry} de 20")
+
+        # 5. Spool do agente apagado: seq volta a 1, mas numa época nova
+        spool = agents[1].spool_dir
+        with quiet:
+            agents[1].close(flush=False)
+            shutil.rmtree(spool)
+            agents[1] = Uploader(server.url, agents[1].agent_id, spool, interval=3600)
+            fill(agents[1:2], 10)
+            wiped_ok = agents[1].flush()
+        total_wiped, _ = count_rows(db_path)
+        print(f"{'✅' if wiped_ok and agents[1].seq == 10 and total_wiped == total_after + 10 + 20 else '❌'} "
+              f"spool apagado: {total_wiped - total_after - 20} de 10 linhas aceitas com seq recomeçado")
+
+        with quiet:
+            for agent in agents:
+                agent.close(flush=False)
+            server.close()
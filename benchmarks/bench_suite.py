@@ -0,0 +1,151 @@
+"""Benchmark ponta a ponta com a rede simulada (agent/simulator.py): nenhum ICMP/DNS real.
+
+Para cada tamanho de histórico mede:
+  - insert:   registros/s do gravador em lote (SentinelDB.save_metric)
+  - job:      latência do ciclo do agente (sentinel.job com SENTINEL_BACKEND=sim)
+  - anomaly:  NetworkBrain.detect_anomalies (primeira execução e incremental)
+  - loader:   DeltaLoader.refresh do dashboard (janela de 3h e de 30 dias)
+  - pdf:      generate_pdf de 30 dias (primeira geração e cache)
+
+O histórico é dividido entre alvos suficientes para caber na retenção de
+dados brutos (30 dias a cada 10s por alvo), como numa frota. insert e job
+gravam no mesmo banco de N linhas (depois das leituras, que assim não veem as
+linhas novas): o custo de índices, agregados e SLA cresce com a tabela.
+
+Uso: python benchmarks/bench_suite.py [linhas ...] [--json arquivo]
+     (padrão: 10000 1000000; 10000000 leva alguns minutos só para gerar)
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'agent'))
+sys.path.append(os.path.join(ROOT, 'dashboard'))
+import rollups
+from database import SentinelDB
+from simulator import generate_history, SimulatedBackend
+from core_ai.anomaly import NetworkBrain
+from data_loader import DeltaLoader
+from report_engine import generate_pdf
+
+DEFAULT_SIZES = [10_000, 1_000_000]
+ROWS_PER_HOST = rollups.RAW_RETENTION_DAYS * 86400 // rollups.RAW_PERIOD
+INSERT_ROWS = 20_000
+JOB_CYCLES = 20
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def bench_insert(path, host, n=INSERT_ROWS):
+    """Amostras novas de um alvo que já tem histórico no banco"""
+    backend = SimulatedBackend(seed=1)
+    start = datetime.now()
+    rows = [{"timestamp": start + timedelta(seconds=i), "ping": backend.sample_rtt(host), "jitter": 1.0,
+             "packet_loss": 0.0, "dns": 20.0, "gateway_ping": 1.0, "host": host,
+             "download": 0, "upload": 0, "status": "OK"} for i in range(n)]
+
+    def run():
+        db = SentinelDB(path)
+        for row in rows:
+            db.save_metric(row)
+        db.close()
+    elapsed, _ = timed(run)
+    return {"rows_per_s": n / elapsed}
+
+def bench_job(path, cycles=JOB_CYCLES):
+    """Ciclos do agente contra o simulador num banco com histórico; cadência do ProbeEngine zerada (mede só o custo do código)"""
+    os.environ["SENTINEL_BACKEND"] = "sim"
+    os.environ["SENTINEL_DB"] = path
+    with contextlib.redirect_stdout(io.StringIO()):
+        sentinel = importlib.import_module("sentinel")
+    sentinel.probe_engine.interval = 0
+    durations = []
+    try:
+        for _ in range(cycles):
+            elapsed, _ = timed(sentinel.job)
+            durations.append(elapsed)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sentinel.probe_engine.close()
+            sentinel.dns_probe.close()
+            sentinel.tracer.close(wait=True)
+            sentinel.active_test.close(wait=True)
+            if sentinel.live:
+                sentinel.live.close()
+            sentinel.db.close()
+        del sys.modules["sentinel"]
+    durations.sort()
+    return {"p50_ms": durations[len(durations) // 2] * 1000, "max_ms": durations[-1] * 1000}
+
+def bench_anomaly(path):
+    brain = NetworkBrain(path)
+    first, _ = timed(brain.detect_anomalies)
+    incremental, _ = timed(brain.detect_anomalies)
+    return {"first_ms": first * 1000, "incremental_ms": incremental * 1000}
+
+def bench_loader(path):
+    result = {}
+    for label, hours in (("3h", 3), ("30d", 24 * 30)):
+        loader = DeltaLoader(path, hours)
+        cold, df = timed(loader.refresh)
+        warm, _ = timed(loader.refresh)
+        result[f"{label}_cold_ms"] = cold * 1000
+        result[f"{label}_warm_ms"] = warm * 1000
+        result[f"{label}_rows"] = len(df)
+    return result
+
+def bench_pdf(path):
+    end = datetime.now()
+    start = end - timedelta(days=30)
+    first, _ = timed(generate_pdf, path, start, end)
+    cached, _ = timed(generate_pdf, path, start, end)
+    return {"first_ms": first * 1000, "cached_ms": cached * 1000}
+
+def run_size(n_rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        hosts = [f"10.0.{i // 256}.{i % 256}" for i in range(-(-n_rows // ROWS_PER_HOST))]
+        generated, written = timed(generate_history, path, n_rows, hosts=hosts)
+        result = {"rows": written, "hosts": len(hosts), "generate_s": generated}
+        result["anomaly"] = bench_anomaly(path)
+        result["loader"] = bench_loader(path)
+        result["pdf"] = bench_pdf(path)
+        # Escritas por último, no banco de N linhas
+        result["insert"] = bench_insert(path, hosts[0])
+        result["job"] = bench_job(path)
+        return result
+
+def show(result):
+    print(f"\n== {result['rows']:,} linhas ({result['hosts']} alvo(s), gerado em {result['generate_s']:.1f}s)")
+    for section in ("insert", "job", "anomaly", "loader", "pdf"):
+        values = " | ".join(
+            f"{key} {value:,.0f}" if isinstance(value, int) else f"{key} {value:,.1f}"
+            for key, value in result[section].items()
+        )
+        print(f"{section:<8} {values}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do Sentinel com a rede simulada")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--json", help="grava os resultados neste arquivo (para comparar entre versões)")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.append(run_size(size))
+        show(results[-1])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
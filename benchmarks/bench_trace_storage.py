@@ -0,0 +1,107 @@
+"""Benchmark: trace_log inline em metrics vs tabela traces comprimida e deduplicada.
+
+Monta um banco no formato antigo (texto do tracert em cada linha com problema),
+aplica só a migração de traces + VACUUM numa cópia e compara tamanho do arquivo
+e tempo de um SELECT * completo em metrics.
+
+Uso: python benchmarks/bench_trace_storage.py [n_registros] [fração_com_trace]
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import _migration_2_trace_store
+
+LEGACY_SCHEMA = """
+CREATE TABLE metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp DATETIME, ping_ms REAL, jitter_ms REAL,
+    packet_loss REAL, download_mbps REAL, upload_mbps REAL, dns_response_ms REAL,
+    gateway_ping_ms REAL, trace_log TEXT, target_host TEXT, status TEXT
+)
+"""
+HOPS_SCHEMA = """
+CREATE TABLE trace_hops (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, metric_id INTEGER, hop INTEGER, ip TEXT,
+    rtt1_ms REAL, rtt2_ms REAL, rtt3_ms REAL, loss_pct REAL
+)
+"""
+
+# Poucas rotas distintas, como durante um incidente real
+ROUTES = [
+    ["192.168.0.1", "10.10.0.1", "187.16.1.1", "187.16.9.2", None, "72.14.220.1", "8.8.8.8"],
+    ["192.168.0.1", "10.10.0.1", "187.16.1.1", None, None, None, None],
+    ["192.168.0.1", None, None, None, None, None, None],
+]
+
+def fake_tracert(route):
+    lines = ["", "Rastreando a rota para 8.8.8.8 com no máximo 10 saltos", ""]
+    for hop, ip in enumerate(route, start=1):
+        if ip is None:
+            lines.append(f"{hop:>3}     *        *        *     Esgotado o tempo limite do pedido.")
+        else:
+            rtts = "  ".join(f"{random.randint(1, 80):>4} ms" for _ in range(3))
+            lines.append(f"{hop:>3}  {rtts}  {ip}")
+    lines += ["", "Rastreamento concluído."]
+    return "\n".join(lines)
+
+def build_legacy(path, n, trace_ratio):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    start = datetime.now() - timedelta(seconds=10 * n)
+    rows = []
+    for i in range(n):
+        trace = fake_tracert(random.choice(ROUTES)) if random.random() < trace_ratio else ""
+        status = "PACKET_LOSS" if trace else "OK"
+        rows.append((start + timedelta(seconds=10 * i), random.gauss(20, 2), 1.5, 0.0, 0, 0,
+                     22.0, 1.2, trace, "8.8.8.8", status))
+    conn.executemany("INSERT INTO metrics (timestamp, ping_ms, jitter_ms, packet_loss, download_mbps, "
+                     "upload_mbps, dns_response_ms, gateway_ping_ms, trace_log, target_host, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def measure(path, label):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    count = sum(1 for _ in conn.execute("SELECT * FROM metrics"))
+    select_all = time.perf_counter() - start
+    # Varredura feita pelo próprio SQLite (lê todas as páginas da tabela, sem custo do Python)
+    start = time.perf_counter()
+    conn.execute("SELECT SUM(ping_ms) FROM metrics").fetchone()
+    sql_scan = time.perf_counter() - start
+    conn.close()
+    size = os.path.getsize(path) / 1024 / 1024
+    print(f"{label:<10} {size:8.2f} MB | SELECT * em {count:,} linhas: {select_all * 1000:8.1f} ms"
+          f" | varredura SQL: {sql_scan * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "legacy.db")
+        migrated = os.path.join(tmp, "migrated.db")
+        build_legacy(legacy, n, ratio)
+        shutil.copy(legacy, migrated)
+
+        conn = sqlite3.connect(migrated)
+        conn.execute(HOPS_SCHEMA)
+        conn.execute("CREATE INDEX idx_trace_hops_metric ON trace_hops(metric_id)")
+        start = time.perf_counter()
+        with conn, contextlib.redirect_stdout(io.StringIO()):
+            _migration_2_trace_store(conn)
+        conn.execute("VACUUM")
+        migration_time = time.perf_counter() - start
+        traces = conn.execute("SELECT COUNT(*) FROM traces").fetchone()[0]
+        conn.close()
+
+        measure(legacy, "antes")
+        measure(migrated, "depois")
+        print(f"migração: {migration_time:.1f} s | traces únicos armazenados: {traces}")
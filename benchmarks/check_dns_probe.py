@@ -0,0 +1,107 @@
+"""Confere a sondagem DNS contra resolvedores falsos em loopback (agent/dns_stub.py).
+
+- Resolvedor rápido e resolvedor lento: as consultas rodam em paralelo (o ciclo
+  dura o tempo do mais lento, não a soma).
+- Os sockets são reaproveitados entre ciclos.
+- Resolvedor que não responde e NXDOMAIN viram falha (None), nunca 0 ms.
+- Todos os resolvedores fora: o ciclo retorna None.
+- Migração 4 (falhas gravadas como 0 ms viram NULL): os agregados 1m/1h/1d ficam
+  iguais aos reconstruídos dos brutos já corrigidos.
+
+Uso: python benchmarks/check_dns_probe.py [ciclos]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from backends import SystemBackend
+from dns_probe import DnsProbe
+from dns_stub import StubDnsServer
+import rollups
+from database import SentinelDB
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+def buckets(conn, res):
+    stats = ", ".join(f"dns_response_ms_{s}" for s in ("count", "min", "max", "sum", "sumsq"))
+    return conn.execute(f"SELECT bucket, {stats} FROM {rollups.table_for(res)} ORDER BY bucket").fetchall()
+
+def check_migration():
+    """Banco de uma versão antiga: brutos e baldes com falhas de DNS como 0 ms"""
+    start = datetime.now().replace(second=0, microsecond=0) - timedelta(hours=1)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        path = os.path.join(tmp, "old.db")
+        db = SentinelDB(path, buffered=False)
+        for i in range(360):
+            # Uma falha a cada 3 ciclos e um minuto inteiro só de falhas
+            failed = i % 3 == 0 or 120 <= i < 126
+            db.save_metric({"timestamp": start + timedelta(seconds=10 * i), "ping": 9.0, "jitter": 1.0,
+                            "packet_loss": 0.0, "dns": None if failed else 10.0 + i % 7,
+                            "host": "8.8.8.8", "status": "OK"})
+        db.conn.execute("UPDATE metrics SET dns_response_ms = 0 WHERE dns_response_ms IS NULL")
+        rollups.rebuild(db.conn)
+        db.conn.execute("PRAGMA user_version = 3")
+        db.conn.commit()
+        db.close()
+
+        db = SentinelDB(path, buffered=False)
+        migrated = {res: buckets(db.conn, res) for res in rollups.RESOLUTIONS}
+        rollups.rebuild(db.conn)
+        rebuilt = {res: buckets(db.conn, res) for res in rollups.RESOLUTIONS}
+        zeros = db.conn.execute("SELECT COUNT(*) FROM metrics WHERE dns_response_ms = 0").fetchone()[0]
+        db.close()
+    same = all(len(migrated[res]) == len(rebuilt[res]) and all(
+        a[:4] == b[:4] and abs(a[4] - b[4]) < 1e-6 and abs(a[5] - b[5]) < 1e-6
+        for a, b in zip(migrated[res], rebuilt[res])) for res in rollups.RESOLUTIONS)
+    return check(f"migração 4: {zeros} zeros nos brutos, agregados iguais à reconstrução", zeros == 0 and same)
+
+if __name__ == "__main__":
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    fast = StubDnsServer().start()
+    slow = StubDnsServer(delay=0.05).start()
+    dead = StubDnsServer(drop=1.0).start()
+    nx = StubDnsServer(nxdomain=["google.com"]).start()
+    failures = 0
+    try:
+        backend = SystemBackend()
+        probe = DnsProbe(backend, resolvers=[fast.address, slow.address], types=["A", "AAAA"], timeout=0.5)
+        durations = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            dns_ms, results = probe.run()
+            durations.append(time.perf_counter() - start)
+        per_cycle = sorted(durations)[len(durations) // 2] * 1000
+        print(f"ciclo (4 consultas, uma delas com 50 ms de atraso): mediana {per_cycle:.1f} ms | dns {dns_ms} ms")
+        failures += check("consultas em paralelo (ciclo < 2x o resolvedor lento)", per_cycle < 100)
+        failures += check("todas as consultas respondidas", all(r['response_ms'] for r in results))
+        sockets = {id(s.sock) for s in backend.dns_sockets.values()}
+        failures += check(f"sockets reaproveitados ({len(sockets)} sockets para {cycles * 4} consultas)",
+                          len(sockets) == 4)
+        probe.close()
+
+        probe = DnsProbe(backend, resolvers=[fast.address, dead.address, nx.address], types=["A"], timeout=0.2)
+        dns_ms, results = probe.run()
+        by_server = {r['server']: r for r in results}
+        failures += check(f"resolvedor mudo = falha ({by_server[dead.address]['error']})",
+                          by_server[dead.address]['response_ms'] is None)
+        failures += check(f"NXDOMAIN = falha ({by_server[nx.address]['error']})",
+                          by_server[nx.address]['response_ms'] is None)
+        failures += check(f"mediana só das respostas válidas ({dns_ms} ms)", dns_ms is not None and dns_ms > 0)
+        probe.close()
+
+        probe = DnsProbe(backend, resolvers=[dead.address], types=["A"], timeout=0.2)
+        dns_ms, _ = probe.run()
+        failures += check("todos fora = None (NULL no banco)", dns_ms is None)
+        probe.close()
+    finally:
+        for server in (fast, slow, dead, nx):
+            server.close()
+    failures += check_migration()
+    sys.exit(1 if failures else 0)
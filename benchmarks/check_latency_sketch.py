@@ -0,0 +1,134 @@
+"""Confere os sketches de latência (agent/sketch.py) e os percentis pelos agregados.
+
+- Precisão: p50/p95/p99/p99,9 do sketch contra o valor exato (numpy) numa cauda longa.
+- Soma: o sketch de todas as amostras tem os mesmos baldes da soma dos sketches das partes.
+- Tamanho de um ciclo (15 RTTs) e de um dia inteiro, contra guardar os RTTs brutos.
+- Jitter RFC 3550 converge para a variação entre pacotes e ignora os perdidos.
+- Banco: percentis de uma faixa qualquer pelos baldes 1m/1h/1d == soma dos sketches das
+  linhas brutas; baldes mantidos lote a lote == reconstrução do zero.
+
+Uso: python benchmarks/check_latency_sketch.py [dias de histórico]
+"""
+import base64
+import contextlib
+import io
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+import rollups
+from database import SentinelDB
+from ingest_server import parse_row
+from probes import interarrival_jitter
+from simulator import SimulatedBackend, generate_history
+from sketch import DDSketch, SKETCH_ALPHA, encode, merge_all
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+def same(a, b):
+    """Mesmos baldes, zeros, mín e máx; a soma pode diferir no arredondamento da ordem das somas"""
+    if a is None or b is None:
+        return a is b
+    a, b = (DDSketch.from_bytes(x) if isinstance(x, bytes) else x for x in (a, b))
+    return (a.bins, a.zeros, a.min, a.max) == (b.bins, b.zeros, b.min, b.max) and math.isclose(a.sum, b.sum)
+
+def check_accuracy():
+    rng = np.random.default_rng(7)
+    values = np.concatenate([rng.lognormal(3.0, 0.3, 990_000), rng.lognormal(5.5, 0.5, 10_000)])
+    sketch = DDSketch(values.tolist())
+    failures = 0
+    for q in (0.5, 0.95, 0.99, 0.999):
+        exact = float(np.quantile(values, q, method="lower"))
+        error = abs(sketch.quantile(q) - exact) / exact
+        failures += check(f"p{q * 100:g}: exato {exact:.2f} ms, sketch {sketch.quantile(q):.2f} ms "
+                          f"(erro {error:.2%})", error <= SKETCH_ALPHA)
+
+    parts = np.array_split(values, 1000)
+    merged = merge_all(encode(p.tolist()) for p in parts)
+    failures += check("soma de 1000 sketches == sketch de todas as amostras", same(merged, DDSketch(values.tolist())))
+    cycle = encode(values[:15].tolist())
+    print(f"tamanho: 1 ciclo (15 RTTs) {len(cycle)} bytes (brutos: {15 * 8}) | "
+          f"1 dia (8640 ciclos) {len(encode(values[:15 * 8640].tolist()))} bytes "
+          f"(brutos: {15 * 8640 * 8:,})")
+    return failures
+
+def check_rtp_jitter():
+    jitter, last = interarrival_jitter([10.0, 20.0] * 200)
+    failures = check(f"RFC 3550 em 10/20/10/... ms converge para 10 ({jitter:.2f})", abs(jitter - 10) < 0.01)
+    with_loss, _ = interarrival_jitter([10.0, None, 20.0, 20.0])
+    failures += check(f"pacote perdido é pulado ({with_loss:.3f})", abs(with_loss - 10 / 16 * 15 / 16) < 1e-9)
+    resumed, _ = interarrival_jitter([30.0], jitter, last)
+    failures += check("estado continua entre ciclos", abs(resumed - (jitter + (10 - jitter) / 16)) < 1e-9)
+    return failures
+
+def write_live(path, n):
+    backend = SimulatedBackend(seed=5)
+    writer = SentinelDB(path)
+    now = datetime.now()
+    for i in range(n):
+        rtts = [backend.sample_rtt("8.8.8.8") for _ in range(15)]
+        writer.save_metric({"timestamp": now + timedelta(seconds=10 * i), "ping": 20.0, "jitter": 1.0,
+                            "packet_loss": 0.0, "host": "8.8.8.8", "status": "OK", "ping_sketch": encode(rtts)})
+    writer.close()
+
+def check_database(days):
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sketch.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_history(path, days * 8640, hosts=["8.8.8.8"], seed=4)
+        db = SentinelDB(path, buffered=False)
+        end = datetime.now() - timedelta(hours=1, minutes=23, seconds=7)
+        start = end - timedelta(days=days - 2, hours=5, minutes=41)
+        started = time.perf_counter()
+        result = db.latency_percentiles(start, end)
+        elapsed = (time.perf_counter() - started) * 1000
+        # Os baldes parciais das pontas entram inteiros
+        first = rollups.bucket_floor(start, "1m")
+        last = rollups.bucket_floor(end, "1m") + timedelta(minutes=1)
+        raw = merge_all(blob for (blob,) in db.conn.execute(
+            "SELECT ping_sketch FROM metrics WHERE timestamp >= ? AND timestamp < ?",
+            (first.strftime('%Y-%m-%d %H:%M:%S'), last.strftime('%Y-%m-%d %H:%M:%S'))
+        ))
+        pieces = rollups.cover(start, end)
+        print(f"{days - 2} dias: {len(pieces)} faixas de baldes, {result['samples']:,} pings, {elapsed:.1f} ms | "
+              f"p50 {result['p50']:.1f} p95 {result['p95']:.1f} p99 {result['p99']:.1f}")
+        failures += check("percentis pelos agregados == soma das linhas brutas",
+                          result == {"samples": raw.count, **raw.percentiles()})
+
+        # Lote a lote (gravador do agente) contra reconstrução
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_live(path, 500)
+        tables = [rollups.table_for(res) for res in rollups.RESOLUTIONS]
+        snapshot = [db.conn.execute(f"SELECT bucket, target_host, ping_sketch FROM {t} ORDER BY 1, 2").fetchall()
+                    for t in tables]
+        rollups.rebuild(db.conn)
+        rebuilt = [db.conn.execute(f"SELECT bucket, target_host, ping_sketch FROM {t} ORDER BY 1, 2").fetchall()
+                   for t in tables]
+        db.conn.rollback()
+        failures += check("baldes lote a lote == reconstrução", all(
+            a[:2] == b[:2] and same(a[2], b[2]) for x, y in zip(snapshot, rebuilt) for a, b in zip(x, y)
+        ) and list(map(len, snapshot)) == list(map(len, rebuilt)))
+        db.close()
+
+    blob = encode([20.0, 21.5, 19.8])
+    row = {"seq": 1, "timestamp": datetime.now().isoformat(), "host": "8.8.8.8", "ping": 20.4,
+           "ping_sketch": base64.b64encode(blob).decode('ascii')}
+    parsed = parse_row("agente", row)
+    failures += check("frota: sketch chega intacto ao servidor", parsed and parsed[1]['ping_sketch'] == blob)
+    failures += check("frota: sketch corrompido é rejeitado",
+                      parse_row("agente", {**row, "ping_sketch": base64.b64encode(blob[:-3]).decode()}) is None)
+    return failures
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    failures = check_accuracy() + check_rtp_jitter() + check_database(days)
+    sys.exit(1 if failures else 0)
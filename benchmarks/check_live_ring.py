@@ -0,0 +1,86 @@
+"""Confere o anel de amostras ao vivo (agent/live_ring.py) com escritor e leitor em processos separados.
+
+- O escritor publica o mais rápido possível; o leitor lê as 2 últimas amostras
+  em laço e confere que nenhuma leitura veio rasgada (cada campo carrega a seq).
+- Compara o custo de uma leitura do anel com o caminho antigo dos KPIs (consulta no
+  SQLite + DataFrame).
+- Agente reiniciado com o mesmo arquivo continua a sequência.
+
+Uso: python benchmarks/check_live_ring.py [amostras]
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from live_ring import LiveRing, LiveRingReader, RING_CAPACITY
+
+READS = 5_000
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+def sample(i):
+    value = float(i)
+    return {"timestamp": datetime.now(), "ping": value, "jitter": value, "packet_loss": value,
+            "dns": value, "gateway_ping": value, "host": f"host-{i % 7}", "status": f"S{i}"}
+
+def writer(path, n):
+    ring = LiveRing(path)
+    for i in range(1, n + 1):
+        ring.publish(sample(i))
+    ring.close()
+
+def consistent(row):
+    values = {row['ping_ms'], row['jitter_ms'], row['packet_loss'], row['dns_response_ms'], row['gateway_ping_ms']}
+    return values == {float(row['seq'])} and row['status'] == f"S{row['seq']}" \
+        and row['target_host'] == f"host-{row['seq'] % 7}"
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ring-live")
+        LiveRing(path).close()
+        reader = LiveRingReader(path)
+        proc = multiprocessing.Process(target=writer, args=(path, n))
+        proc.start()
+        reads = torn = 0
+        while proc.is_alive():
+            for row in reader.latest(2):
+                reads += 1
+                torn += not consistent(row)
+        proc.join()
+        failures += check(f"{reads:,} leituras concorrentes com {n:,} publicações, {torn} rasgadas", torn == 0 and reads)
+        failures += check(f"última sequência visível ({reader.seq:,})", reader.seq == n)
+
+        start = time.perf_counter()
+        for _ in range(READS):
+            reader.latest(2)
+        ring_us = (time.perf_counter() - start) / READS * 1e6
+
+        conn = sqlite3.connect(os.path.join(tmp, "kpi.db"))
+        conn.execute("CREATE TABLE metrics (id INTEGER PRIMARY KEY, timestamp DATETIME, ping_ms REAL, status TEXT)")
+        conn.executemany("INSERT INTO metrics (timestamp, ping_ms, status) VALUES (?, ?, 'OK')",
+                         ((datetime.now().isoformat(), float(i)) for i in range(RING_CAPACITY * 10)))
+        conn.commit()
+        start = time.perf_counter()
+        for _ in range(READS):
+            pd.read_sql_query("SELECT * FROM metrics ORDER BY id DESC LIMIT 2", conn)
+        sqlite_us = (time.perf_counter() - start) / READS * 1e6
+        conn.close()
+        print(f"2 últimas amostras: anel {ring_us:.1f} µs | SQLite + DataFrame {sqlite_us:.1f} µs")
+
+        ring = LiveRing(path)
+        ring.publish(sample(n + 1))
+        ring.close()
+        failures += check("reinício do agente continua a sequência", reader.latest(1)[0]['seq'] == n + 1)
+        reader.close()
+    sys.exit(1 if failures else 0)
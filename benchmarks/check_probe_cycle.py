@@ -0,0 +1,79 @@
+"""Confere o limite de duração do ciclo do ProbeEngine (agent/probes.py).
+
+Com os envios em cadência fixa e todos os alvos em paralelo, um ciclo dura
+~ (count - 1) * interval + timeout, mesmo com todos os pacotes perdidos, e não
+N alvos x count pacotes x timeout como no laço sequencial antigo.
+
+- Timeouts simulados: backend que segura cada ping pelo timeout inteiro e perde tudo.
+- Alvo lento misturado com alvos rápidos: o ciclo é limitado pelo mais lento.
+- Loopback (127.0.0.1) com ping3 real, se houver permissão para ICMP.
+
+Uso: python benchmarks/check_probe_cycle.py [alvos]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from probes import ProbeEngine, GATEWAY_TIMEOUT, PROBE_INTERVAL, PROBE_TIMEOUT
+
+PING_COUNT = 15  # Mesmo valor de sentinel.PING_COUNT (importar o agente abriria o banco)
+MARGIN = 0.5     # s de folga para agendamento de threads
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+def lost(host, unit='ms', timeout=PROBE_TIMEOUT):
+    """Nenhuma resposta: o ping bloqueia até o timeout, como o ping3 real"""
+    time.sleep(timeout)
+    return None
+
+def slow_one(host, unit='ms', timeout=PROBE_TIMEOUT):
+    if host == "10.0.0.99":
+        return lost(host, unit, timeout)
+    time.sleep(0.02)
+    return 20.0
+
+def timed_cycle(engine, targets, gateway_ip="192.168.0.1"):
+    start = time.perf_counter()
+    health = engine.run_cycle(targets, PING_COUNT, gateway_ip)
+    return time.perf_counter() - start, health
+
+def check_simulated(n_targets):
+    bound = (PING_COUNT - 1) * PROBE_INTERVAL + PROBE_TIMEOUT
+    sequential = n_targets * PING_COUNT * PROBE_TIMEOUT
+    targets = [f"10.0.0.{i + 1}" for i in range(n_targets)]
+    engine = ProbeEngine(ping_func=lost)
+    elapsed, health = timed_cycle(engine, targets)
+    failures = check(f"{n_targets} alvos, tudo perdido: ciclo {elapsed:.2f} s (limite ~{bound:.1f} s; "
+                     f"sequencial seria {sequential:.0f} s)", bound - 0.1 <= elapsed <= bound + MARGIN)
+    failures += check("alvos inacessíveis reportados com perda de 100%",
+                      all(h['ping'] is None and h['packet_loss'] == 100 for h in health))
+
+    mixed = targets[:-1] + ["10.0.0.99"]
+    engine = ProbeEngine(ping_func=slow_one)
+    elapsed, health = timed_cycle(engine, mixed)
+    failures += check(f"um alvo lento entre {n_targets}: ciclo {elapsed:.2f} s (limitado pelo mais lento)",
+                      elapsed <= bound + MARGIN)
+    failures += check("alvos rápidos medidos normalmente", all(h['ping'] == 20.0 for h in health[:-1]))
+    engine.close()
+    return failures
+
+def check_loopback(n_targets):
+    engine = ProbeEngine()
+    try:
+        elapsed, health = timed_cycle(engine, ["127.0.0.1"] * n_targets, "127.0.0.1")
+    finally:
+        engine.close()
+    if all(h['ping'] is None for h in health):
+        print("⚠️ ICMP indisponível (sem permissão para socket raw?): loopback pulado")
+        return 0
+    bound = (PING_COUNT - 1) * PROBE_INTERVAL + max(max(h['ping'] for h in health) / 1000, GATEWAY_TIMEOUT)
+    return check(f"loopback, {n_targets} séries + Gateway: ciclo {elapsed:.2f} s "
+                 f"(cadência {(PING_COUNT - 1) * PROBE_INTERVAL:.1f} s)", elapsed <= bound + MARGIN)
+
+if __name__ == "__main__":
+    n_targets = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failures = check_simulated(n_targets) + check_loopback(n_targets)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,55 @@
+"""Confere via EXPLAIN QUERY PLAN que as consultas usadas pelo Dashboard, IA e
+Relatórios não fazem varredura completa da tabela metrics.
+
+Uso: python benchmarks/check_query_plans.py [caminho_do_banco]
+Sem argumento, cria um banco temporário com o esquema atual.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import SentinelDB, PROBLEM_STATUSES
+
+RAW_COLUMNS = [
+    "id", "timestamp", "target_host", "ping_ms", "jitter_ms", "packet_loss",
+    "dns_response_ms", "gateway_ping_ms", "status"
+]
+
+def consumer_queries():
+    now = datetime.now()
+    return {
+        # Dashboard (DeltaLoader): carga inicial da janela e busca incremental
+        "dashboard_janela": dict(start=now - timedelta(hours=3), columns=RAW_COLUMNS),
+        "dashboard_delta": dict(after_id=1000, columns=RAW_COLUMNS),
+        "dashboard_alvo": dict(start=now - timedelta(hours=3), end=now, hosts=["8.8.8.8"], columns=RAW_COLUMNS),
+        # NetworkBrain: linhas novas desde o último id processado
+        "ia_incremental": dict(after_id=1000, columns=RAW_COLUMNS, order="asc"),
+        # Relatório: evidências críticas
+        "relatorio_evidencias": dict(statuses=PROBLEM_STATUSES, columns=["timestamp", "ping_ms", "status"], limit=15),
+        "relatorio_periodo": dict(start=now - timedelta(days=30), end=now, statuses=PROBLEM_STATUSES),
+    }
+
+def check(db):
+    failures = 0
+    for name, kwargs in consumer_queries().items():
+        plan = db.explain(**kwargs)
+        # "SCAN metrics" sem índice = leitura da tabela inteira
+        full_scan = any(step.startswith("SCAN metrics") and "INDEX" not in step for step in plan)
+        failures += full_scan
+        print(f"{'❌' if full_scan else '✅'} {name:<22} {' | '.join(plan)}")
+    return failures
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(io.StringIO()):
+        if len(sys.argv) > 1:
+            db = SentinelDB(sys.argv[1], readonly=True)
+        else:
+            tmp = tempfile.TemporaryDirectory()
+            db = SentinelDB(os.path.join(tmp.name, "plans.db"), buffered=False)
+    failures = check(db)
+    db.close()
+    sys.exit(1 if failures else 0)
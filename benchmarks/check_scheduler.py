@@ -0,0 +1,104 @@
+"""Confere o agendador do agente (agent/scheduler.py) com relógio simulado (roda em milissegundos).
+
+- Sem deriva: com um job de duração variável, o ciclo i começa exatamente em i * intervalo
+  (o laço antigo, sleep(intervalo) depois do job, acumula a duração dos jobs).
+- Overrun: um job mais longo que o intervalo pula os ticks perdidos, sem sobrepor nem
+  disparar uma rajada de ciclos atrasados, e volta para a grade de ticks.
+- Intervalo adaptativo: rápido com o link degradado, base ao normalizar, recuo gradual
+  até o lento com o link estável; nunca abaixo do orçamento de pacotes por hora.
+
+Uso: python benchmarks/check_scheduler.py
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from scheduler import Scheduler, BASE_INTERVAL, FAST_INTERVAL, SLOW_INTERVAL, STABLE_CYCLES, BACKOFF_FACTOR
+
+PROBES_PER_CYCLE = 20  # 15 pings ao alvo + 5 ao Gateway
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+def run(durations, statuses=None, probes_per_cycle=PROBES_PER_CYCLE):
+    """Roda Scheduler.run() com um ciclo por duração; retorna (inícios relativos, intervalos escolhidos, scheduler)"""
+    clock = FakeClock()
+    starts, intervals = [], []
+    statuses = list(statuses or ["OK"] * len(durations))
+
+    def job():
+        i = len(starts)
+        starts.append(clock() - 1000.0)
+        clock.t += durations[i]
+        if i == len(durations) - 1:
+            scheduler.stop()
+        return statuses[i]
+
+    scheduler = Scheduler(job, probes_per_cycle, clock=clock, sleep=clock.sleep)
+    adapt = scheduler.adapt
+    scheduler.adapt = lambda status: intervals.append(adapt(status)) or intervals[-1]
+    scheduler.run()
+    return starts, intervals, scheduler
+
+def check_drift():
+    rng = random.Random(4)
+    durations = [rng.uniform(1.5, 4.0) for _ in range(STABLE_CYCLES - 1)]  # Sem recuo: intervalo fixo
+    starts, _, scheduler = run(durations)
+    expected = [i * BASE_INTERVAL for i in range(len(durations))]
+    drift = max(abs(a - b) for a, b in zip(starts, expected))
+    naive = sum(durations[:-1])  # Atraso acumulado de sleep(intervalo) depois de cada job
+    return check(f"{len(durations)} ciclos sem deriva (erro máx {drift:.2e} s; o laço antigo atrasaria "
+                 f"{naive:.1f} s)", drift < 1e-9 and scheduler.stats["overruns"] == 0)
+
+def check_overrun():
+    durations = [2.0, 2.0, 25.0, 2.0, 2.0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        starts, _, scheduler = run(durations)
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    on_grid = all(abs(s / BASE_INTERVAL - round(s / BASE_INTERVAL)) < 1e-9 for s in starts)
+    failures = check(f"overrun de 25 s: início dos ciclos {starts}", starts == [0.0, 10.0, 20.0, 50.0, 60.0])
+    failures += check(f"sem sobreposição nem rajada (menor distância {min(gaps):.0f} s), de volta à grade",
+                      min(gaps) >= BASE_INTERVAL and on_grid)
+    failures += check(f"overrun registrado ({scheduler.stats['overruns']} overrun, "
+                      f"{scheduler.stats['skipped_ticks']} tick(s) pulado(s))",
+                      scheduler.stats["overruns"] == 1 and scheduler.stats["skipped_ticks"] == 2)
+    return failures
+
+def check_adaptive():
+    stable = STABLE_CYCLES * 4
+    statuses = ["OK"] * stable + ["ISP_LATENCY"] * 3 + ["OK"] * 2
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, intervals, _ = run([1.0] * len(statuses), statuses)
+    backoff = sorted(set(intervals[:stable]))
+    expected = [BASE_INTERVAL]
+    while expected[-1] < SLOW_INTERVAL:
+        expected.append(min(expected[-1] * BACKOFF_FACTOR, SLOW_INTERVAL))
+    failures = check(f"link estável: recuo {backoff} até {SLOW_INTERVAL} s", backoff == expected)
+    failures += check(f"link degradado: {intervals[stable:stable + 3]} (rápido = {FAST_INTERVAL} s)",
+                      intervals[stable:stable + 3] == [FAST_INTERVAL] * 3)
+    failures += check(f"normalizou: {intervals[-2:]} (base = {BASE_INTERVAL} s)", intervals[-2:] == [BASE_INTERVAL] * 2)
+
+    # Orçamento: 100 pacotes/ciclo em 20 mil/h permitem no máximo um ciclo a cada 18 s
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, intervals, scheduler = run([1.0] * 3, ["PACKET_LOSS"] * 3, probes_per_cycle=100)
+    failures += check(f"orçamento de pacotes: modo rápido limitado a {intervals[0]:.0f} s",
+                      intervals == [scheduler.budget_interval] * 3 and scheduler.budget_interval == 18)
+    return failures
+
+if __name__ == "__main__":
+    failures = check_drift() + check_overrun() + check_adaptive()
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,112 @@
+"""Confere que uma queda total do alvo conta como tempo fora no SLA (e não como lacuna).
+
+Cenário: 30 ciclos OK, 10 minutos com o alvo inacessível (nenhuma resposta aos pings),
+30 ciclos OK, passando pelo mesmo caminho do agente (probes.summarize ->
+sentinel.job -> gravador em lote -> sla_daily), com relógio simulado.
+Antes, o ciclo inacessível não gravava linha: a queda virava "não monitorado" e o
+mês fechava com 100% de uptime e nenhum reembolso.
+
+As linhas UNREACHABLE entram na evidência do relatório (mesma contagem de problemas
+dos agregados, que têm coluna própria para elas) e o console mostra "—" sem latência.
+
+Também confere o simulador: os slots de queda do histórico viram linhas UNREACHABLE.
+
+Uso: python benchmarks/check_sla_outage.py
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'dashboard')))
+from probes import summarize
+from database import SentinelDB
+from rollups import RAW_PERIOD
+from simulator import generate_history
+from report_engine import problem_rows
+
+HOST = "8.8.8.8"
+PINGS = 15
+OUTAGE_CYCLES = 60  # 10 minutos a cada RAW_PERIOD (10 s)
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+class FakeDatetime(datetime):
+    """datetime.now() controlado pelo teste (o agente carimba a amostra com a hora do ciclo)"""
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+def check_agent(tmp):
+    os.environ["SENTINEL_DB"] = os.path.join(tmp, "outage.db")
+    os.environ["SENTINEL_BACKEND"] = "sim"
+    console = io.StringIO()
+    with contextlib.redirect_stdout(console):
+        import sentinel
+        sentinel.datetime = FakeDatetime
+        # Recente: linhas mais antigas que a retenção seriam purgadas pelo gravador
+        start = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+        # Sondagens substituídas pelo resultado do ciclo; o resto de job() é o do agente
+        sentinel.check_dns_speed = lambda: 20.0
+        sentinel.check_throughput = lambda: None
+        statuses = []
+        for cycle in range(30 + OUTAGE_CYCLES + 30):
+            FakeDatetime.current = start + timedelta(seconds=RAW_PERIOD * cycle)
+            down = 30 <= cycle < 30 + OUTAGE_CYCLES
+            samples = [None] * PINGS if down else [20.0] * PINGS
+            health = summarize(HOST, samples, PINGS, 1.0, "192.168.0.1")
+            sentinel.get_network_health = lambda: [health]
+            statuses.append(sentinel.job())
+        sentinel.db.flush()
+    end = FakeDatetime.current
+    result = sentinel.db.sla_summary(start.date(), end.date())
+    rows = sentinel.db.conn.execute(
+        "SELECT COUNT(*), MAX(packet_loss), COUNT(ping_ms) FROM metrics WHERE status = 'UNREACHABLE'"
+    ).fetchone()
+    print(f"SLA: up {result['up_s']:.0f} s, down {result['down_s']:.0f} s, "
+          f"não monitorado {result['unmonitored_s']:.0f} s, uptime {result['uptime_pct']:.1f}%")
+
+    failures = check(f"ciclos inacessíveis gravados ({rows[0]} linhas, perda {rows[1]}%, {rows[2]} com ping)",
+                     rows == (OUTAGE_CYCLES, 100.0, 0) and statuses.count("UNREACHABLE") == OUTAGE_CYCLES)
+    failures += check("queda de 10 min conta como fora do ar",
+                      result['down_s'] == OUTAGE_CYCLES * RAW_PERIOD and result['unmonitored_s'] == 0)
+    failures += check("uptime abaixo de 100%", result['uptime_pct'] == 50.0)
+
+    summary = sentinel.db.summarize(start, end)
+    evidence = [row[-1] for row in problem_rows(sentinel.db, start, end)]
+    buckets = sentinel.db.conn.execute("SELECT SUM(status_unreachable), SUM(status_other) FROM metrics_1d").fetchone()
+    failures += check(f"evidência do relatório: {evidence.count('UNREACHABLE')} linhas UNREACHABLE de "
+                      f"{summary['problem_samples']} problemas nos agregados",
+                      evidence.count('UNREACHABLE') == OUTAGE_CYCLES and len(evidence) == summary['problem_samples'])
+    failures += check(f"agregados: {buckets[0]} em status_unreachable, {buckets[1]} em status_other",
+                      buckets == (OUTAGE_CYCLES, 0))
+    failures += check("console sem 'Nonems' nos ciclos inacessíveis",
+                      "Nonems" not in console.getvalue() and "[UNREACHABLE] Ext: —" in console.getvalue())
+    sentinel.tracer.close()
+    sentinel.db.close()
+    return failures
+
+def check_simulator(tmp):
+    path = os.path.join(tmp, "history.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_history(path, 30 * 8640, seed=1)
+    db = SentinelDB(path, buffered=False)
+    unreachable = db.conn.execute("SELECT COUNT(*) FROM metrics WHERE status = 'UNREACHABLE'").fetchone()[0]
+    today = datetime.now().date()
+    result = db.sla_summary(today - timedelta(days=31), today)
+    db.close()
+    print(f"simulador: {unreachable} ciclos inacessíveis em 30 dias, uptime {result['uptime_pct']:.2f}%")
+    return check("quedas do histórico somam tempo fora no SLA",
+                 unreachable > 0 and result['down_samples'] >= unreachable and result['down_s'] > 0)
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check_agent(tmp) + check_simulator(tmp)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,116 @@
+"""Confere a vazão passiva (agent/throughput.py) e o teste ativo contra um servidor HTTP em loopback.
+
+- Contadores que dão a volta (32 e 64 bits) viram taxa correta; reinício da interface é descartado.
+- Leitura real de /proc/net/dev: custo por ciclo.
+- Teste ativo contra agent/http_stub.py com taxa limitada: a banda medida bate com o limite.
+- O teste só dispara com o link ocioso por IDLE_CYCLES ciclos e respeita o intervalo.
+- Simulador: um dia de contadores de 32 bits sem taxa negativa ou impossível.
+
+Uso: python benchmarks/check_throughput.py [Mbps do stub]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from backends import SystemBackend
+from database import SentinelDB
+from http_stub import StubHttpServer
+from simulator import SimulatedBackend
+from throughput import (ThroughputSampler, ActiveThroughputTest, counter_delta, read_interface_counters,
+                        IDLE_CYCLES, MAX_RATE_MBPS)
+
+def check(label, ok):
+    print(f"{'✅' if ok else '❌'} {label}")
+    return not ok
+
+class FakeClock:
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+def check_counters():
+    failures = check("volta de 32 bits", counter_delta(2 ** 32 - 100, 50) == 150)
+    failures += check("contador zerado = desconhecido", counter_delta(1_250_000, 100) is None)
+    failures += check("volta de 64 bits", counter_delta(2 ** 64 - 10, 5) == 15)
+
+    clock = FakeClock()
+    values = iter([
+        {"lo": (0, 0), "eth0": (2 ** 32 - 1_250_000, 0)},
+        {"lo": (10 ** 9, 10 ** 9), "eth0": (1_250_000, 125_000)},       # 2,5 MB em 1 s com volta = 20 Mbps
+        {"lo": (0, 0), "eth0": (100, 0), "wlan0": (0, 0)},              # Reinício: eth0 descartada, wlan0 nova
+    ])
+    sampler = ThroughputSampler(counters=lambda: next(values), clock=clock)
+    first = sampler.sample()
+    clock.t = 1.0
+    second = sampler.sample()
+    clock.t = 2.0
+    third = sampler.sample()
+    failures += check(f"primeira leitura só guarda referência ({first})", first is None)
+    failures += check(f"taxa com volta e loopback ignorada ({second} Mbps)", second == (20.0, 1.0))
+    failures += check(f"reinício da interface descartado ({third})", third is None)
+    return failures
+
+def check_proc():
+    counters = read_interface_counters()
+    if not counters:
+        print("⚠️ sem /proc/net/dev nem psutil: leitura real pulada")
+        return 0
+    start = time.perf_counter()
+    for _ in range(1000):
+        read_interface_counters()
+    cost = (time.perf_counter() - start) / 1000 * 1e6
+    print(f"/proc/net/dev: {len(counters)} interface(s), {cost:.0f} µs por leitura")
+    return check("leitura passiva abaixo de 1 ms por ciclo", cost < 1000)
+
+def check_active(rate):
+    failures = 0
+    server = StubHttpServer(rate_mbps=rate).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = SentinelDB(os.path.join(tmp, "tp.db"), buffered=False)
+            download_url = server.url(f"/download?bytes={int(rate * 1e6 / 8 * 2)}")  # ~2 s no limite do stub
+            test = ActiveThroughputTest(SystemBackend(), db, download_url=download_url,
+                                        upload_url=server.url("/upload"), interval=3600)
+            busy = [test.observe((rate, rate / 5)) for _ in range(IDLE_CYCLES + 2)]
+            failures += check("link ocupado: nenhum teste", not any(busy) and server.requests == 0)
+            idle = [test.observe((0.1, 0.05)) for _ in range(IDLE_CYCLES)]
+            failures += check(f"link ocioso por {IDLE_CYCLES} ciclos: teste disparado", idle[-1] and not any(idle[:-1]))
+            test.close(wait=True)
+            result = test.last_result
+            for direction in ("download", "upload"):
+                measured = result[f"{direction}_mbps"]
+                failures += check(f"{direction} medido {measured} Mbps (limite do stub {rate} Mbps)",
+                                  measured is not None and abs(measured - rate) / rate < 0.2)
+            again = [test.observe((0.1, 0.05)) for _ in range(IDLE_CYCLES * 2)]
+            failures += check("intervalo mínimo respeitado", not any(again))
+            stored = db.conn.execute("SELECT COUNT(*), MAX(download_mbps) FROM throughput_tests").fetchone()
+            failures += check(f"resultado gravado em throughput_tests ({stored})", stored[0] == 1)
+            db.close()
+    finally:
+        server.close()
+    return failures
+
+def check_simulator():
+    clock = FakeClock(time.time())
+    backend = SimulatedBackend(seed=3, clock=clock)
+    sampler = ThroughputSampler(counters=backend.interface_counters, clock=clock)
+    rates = []
+    for _ in range(8640):
+        clock.t += 10
+        sample = sampler.sample()
+        if sample is not None:
+            rates.append(sample)
+    bad = [r for r in rates if min(r) < 0 or max(r) > MAX_RATE_MBPS]
+    download = sorted(r[0] for r in rates)
+    print(f"simulador: {len(rates)} amostras, download mediana {download[len(download) // 2]} Mbps, "
+          f"máx {download[-1]} Mbps")
+    return check(f"um dia de contadores de 32 bits sem taxa inválida ({len(bad)})", not bad and len(rates) == 8639)
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 80.0
+    failures = check_counters() + check_proc() + check_active(rate) + check_simulator()
+    sys.exit(1 if failures else 0)
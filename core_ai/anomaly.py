@@ -1,54 +1,265 @@
 import pandas as pd
+import numpy as np
 import sqlite3
 import os
+import sys
+from datetime import datetime, timedelta
+from core_ai.seasonal import SeasonalBaseline, SEASONAL_METRICS, hour_of_week
+
+# Módulos do agente (agregados 1m/1h/1d)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import SentinelDB
+import archive
+
+# Parâmetros do detector
+Z_THRESHOLD = 3        # Anomalia = foge 3x do padrão normal (Z-Score > 3)
+MIN_SAMPLES = 50       # Precisa de dados para aprender
+RECENT_MINUTES = 10    # Alertas exibidos = últimos 10 minutos de amostras (o intervalo do agente varia)
+BOOTSTRAP_ROWS = 2000  # Histórico usado para aprender o padrão na primeira execução
+DETECTOR = "zscore"
+
+METRICS = ["ping_ms", "jitter_ms"]
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS brain_state (
+    metric TEXT PRIMARY KEY,
+    n INTEGER,
+    mean REAL,
+    m2 REAL,
+    last_id INTEGER
+)
+"""
+
+ANOMALIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomalies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    metric_id INTEGER,
+    timestamp DATETIME,
+    detector TEXT,
+    score REAL,
+    reason TEXT
+)
+"""
+
+def merge_stats(n, mean, m2, values):
+    """Soma um lote de valores às estatísticas correntes (Welford/Chan, vetorizado)"""
+    values = values[~np.isnan(values)]
+    k = len(values)
+    if k == 0:
+        return n, mean, m2
+    b_mean = values.mean()
+    b_m2 = ((values - b_mean) ** 2).sum()
+    total = n + k
+    delta = b_mean - mean
+    mean = mean + delta * k / total
+    m2 = m2 + b_m2 + delta ** 2 * n * k / total
+    return total, mean, m2
+
+def std_of(n, m2):
+    return np.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+
+def describe(ping, ping_mean, ping_seasonal, jitter, ping_hit, jitter_hit):
+    """Texto do alerta de uma linha (mesmo formato no detector incremental e no backfill)"""
+    reasons = []
+    if ping_hit:
+        label = " p/ este horário" if ping_seasonal else ""
+        reasons.append(f"Ping Anormal ({ping:.1f}ms vs Média {ping_mean:.1f}ms{label})")
+    if jitter_hit:
+        reasons.append(f"Instabilidade Crítica ({jitter:.1f}ms)")
+    return ", ".join(reasons)
 
 class NetworkBrain:
-    def __init__(self, db_path):
+    def __init__(self, db_path, archive_dir=None):
         self.db_path = db_path
+        # Arquivo Parquet (dias exportados por agent/archive.py) para históricos longos
+        self.archive_dir = archive_dir
+        self.conn = None
+        self.db = None
+        self.seasonal = None
 
-    def load_history(self):
-        if not os.path.exists(self.db_path):
+    def _connect(self):
+        if self.conn is None:
+            if not os.path.exists(self.db_path):
+                return None
+            # Conexão persistente; transações controladas manualmente
+            self.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA busy_timeout=5000")
+            self.conn.execute(STATE_SCHEMA)
+            self.conn.execute(ANOMALIES_SCHEMA)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_metric ON anomalies(metric_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_detector_time ON anomalies(detector, timestamp)")
+            self.seasonal = SeasonalBaseline(self.conn)
+            # Leituras de metrics passam pela API de consulta do SentinelDB
+            self.db = SentinelDB(self.db_path, readonly=True)
+        return self.conn
+
+    def load_history(self, start=None, end=None):
+        conn = self._connect()
+        if conn is None:
             return pd.DataFrame()
-        
-        conn = sqlite3.connect(self.db_path)
-        # Carrega muito mais dados para "aprender" o padrão (últimos 2000 registros)
-        df = pd.read_sql_query("SELECT * FROM metrics ORDER BY id DESC LIMIT 2000", conn)
-        conn.close()
-        return df
 
-    def detect_anomalies(self):
-        df = self.load_history()
-        if df.empty or len(df) < 50:
-            return [] # Precisa de dados para aprender
-
-        # IA Estatística: Calcula a Média e o Desvio Padrão
-        ping_mean = df['ping_ms'].mean()
-        ping_std = df['ping_ms'].std()
-        
-        jitter_mean = df['jitter_ms'].mean()
-        jitter_std = df['jitter_ms'].std()
-
-        # Definição de "Anomalia": Algo que foge 3x do padrão normal (Z-Score > 3)
+        if start is None:
+            # Carrega muito mais dados para "aprender" o padrão (últimos 2000 registros)
+            return pd.DataFrame.from_records(list(self.db.query(limit=BOOTSTRAP_ROWS)), columns=self.db.columns)
+
+        if self.archive_dir and archive.ARROW_AVAILABLE:
+            # Com arquivo: linhas brutas completas (Parquet + banco vivo), só as colunas analisadas
+            return archive.read_period(
+                self.db_path, start, end, columns=["id", "timestamp", "target_host", *SEASONAL_METRICS, "status"],
+                archive_dir=self.archive_dir
+            )
+
+        # Períodos longos vêm dos agregados na resolução que cabe em BOOTSTRAP_ROWS pontos
+        _, columns, rows = self.db.query_range(start, end or datetime.now(), max_points=BOOTSTRAP_ROWS)
+        return pd.DataFrame.from_records(list(rows), columns=columns)
+
+    def load_state(self, conn):
+        state = {m: (0, 0.0, 0.0) for m in METRICS}
+        last_id = 0
+        for metric, n, mean, m2, lid in conn.execute("SELECT metric, n, mean, m2, last_id FROM brain_state"):
+            if metric in state:
+                state[metric] = (n, mean, m2)
+                last_id = lid
+        return state, last_id
+
+    def save_state(self, conn, state, last_id):
+        conn.executemany(
+            "INSERT OR REPLACE INTO brain_state (metric, n, mean, m2, last_id) VALUES (?, ?, ?, ?, ?)",
+            [(m, int(n), float(mean), float(m2), int(last_id)) for m, (n, mean, m2) in state.items()]
+        )
+
+    def baseline_for(self, rows, metric, state):
+        """Média e desvio esperados por linha: faixa sazonal (hora da semana) ou padrão global"""
+        n, mean, m2 = state[metric]
+        s_mean, s_std, seasonal = self.seasonal.lookup(rows['target_host'], metric, rows['how'])
+        return np.where(seasonal, s_mean, mean), np.where(seasonal, s_std, std_of(n, m2)), seasonal
+
+    def score(self, rows, state):
+        """Compara cada linha nova com o padrão aprendido até o lote anterior"""
+        if min(state["ping_ms"][0], state["jitter_ms"][0]) < MIN_SAMPLES:
+            return []
+
+        # O padrão "normal" depende do horário: congestionamento das 20h não é anomalia às 20h.
         # Isso se adapta: se sua rede é sempre instável, a IA "acostuma" e só avisa se piorar muito.
-        ping_threshold = ping_mean + (3 * ping_std)
-        jitter_threshold = jitter_mean + (3 * jitter_std)
-
-        # Analisa apenas os últimos 10 minutos de dados
-        recent = df.head(60) 
-        anomalies = []
-
-        for index, row in recent.iterrows():
-            reasons = []
-            if row['ping_ms'] > ping_threshold:
-                reasons.append(f"Ping Anormal ({row['ping_ms']:.1f}ms vs Média {ping_mean:.1f}ms)")
-            
-            if row['jitter_ms'] > jitter_threshold:
-                reasons.append(f"Instabilidade Crítica ({row['jitter_ms']:.1f}ms)")
-
-            if reasons:
-                anomalies.append({
-                    "timestamp": row['timestamp'],
-                    "reason": ", ".join(reasons)
-                })
-
-        return anomalies
\ No newline at end of file
+        ping_mean, ping_std, ping_seasonal = self.baseline_for(rows, "ping_ms", state)
+        jitter_mean, jitter_std, _ = self.baseline_for(rows, "jitter_ms", state)
+
+        ping = rows['ping_ms'].to_numpy(dtype=float)
+        jitter = rows['jitter_ms'].to_numpy(dtype=float)
+        ping_hit = ping > ping_mean + (Z_THRESHOLD * ping_std)
+        jitter_hit = jitter > jitter_mean + (Z_THRESHOLD * jitter_std)
+        flagged = np.flatnonzero(ping_hit | jitter_hit)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.fmax((ping - ping_mean) / ping_std, (jitter - jitter_mean) / jitter_std)
+
+        events = []
+        for i in flagged:
+            events.append((
+                int(rows['id'].iat[i]), rows['timestamp'].iat[i], DETECTOR,
+                float(z[i]) if np.isfinite(z[i]) else None,
+                describe(ping[i], ping_mean[i], ping_seasonal[i], jitter[i], ping_hit[i], jitter_hit[i])
+            ))
+        return events
+
+    def learn(self, conn, state, last_id):
+        """Processa apenas as linhas com id > last_id: pontua e atualiza o padrão"""
+        columns = ["id", "timestamp", "target_host", *SEASONAL_METRICS]
+        if last_id == 0:
+            # Primeira execução: aprende com o histórico recente, pontua só a janela final
+            history = pd.DataFrame.from_records(
+                list(self.db.query(columns=columns, limit=BOOTSTRAP_ROWS)), columns=columns
+            ).iloc[::-1]
+            # Janela final por tempo, não por nº de linhas: o agendador adapta o intervalo entre amostras
+            stamps = pd.to_datetime(history['timestamp'], format='ISO8601')
+            recent = (stamps >= stamps.max() - pd.Timedelta(minutes=RECENT_MINUTES)).to_numpy()
+            baseline, rows = history[~recent], history[recent]
+            for m in METRICS:
+                state[m] = merge_stats(*state[m], baseline[m].to_numpy(dtype=float))
+            # Faixas sazonais: uma passada em todo o histórico anterior à janela
+            self.seasonal.rebuild(int(baseline['id'].iat[-1]) if not baseline.empty else 0)
+            self._merge_archive_seasonal()
+        else:
+            rows = pd.DataFrame.from_records(
+                list(self.db.query(columns=columns, after_id=last_id, order="asc")), columns=columns
+            )
+            if not rows.empty:
+                # Outra sessão pode ter atualizado as faixas desde a última leitura
+                self.seasonal.load()
+        if rows.empty:
+            return state, last_id, []
+
+        parsed = pd.to_datetime(rows['timestamp'], format='ISO8601')
+        rows = rows.assign(how=hour_of_week(parsed).to_numpy())
+
+        events = self.score(rows, state)
+        for m in METRICS:
+            state[m] = merge_stats(*state[m], rows[m].to_numpy(dtype=float))
+        self.seasonal.update(rows.assign(timestamp=parsed.to_numpy()))
+        return state, int(rows['id'].iat[-1]), events
+
+    def rebuild_seasonal(self):
+        """Recalcula o padrão sazonal com todo o histórico (ex: após importar meses de dados)"""
+        conn = self._connect()
+        if conn is None:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _, last_id = self.load_state(conn)
+            self.seasonal.rebuild(last_id)
+            self._merge_archive_seasonal()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _merge_archive_seasonal(self):
+        """Soma às faixas sazonais os dias arquivados que já saíram do banco vivo"""
+        if not (self.archive_dir and archive.ARROW_AVAILABLE):
+            return
+        columns = ["id", "timestamp", "target_host", *SEASONAL_METRICS]
+        # Um dia por vez: a memória fica limitada ao tamanho de uma partição
+        for day in archive.archived_days(self.archive_dir):
+            start, end = archive.day_bounds(day)
+            rows = archive.read_archive(self.archive_dir, start, end, columns=columns)
+            # Linhas do dia ainda no banco vivo já entraram na reconstrução (pelo dia, não por um
+            # corte de id: linhas atrasadas da frota têm id maior que as de dias mais recentes)
+            live = [row[0] for row in self.conn.execute(
+                "SELECT id FROM metrics WHERE timestamp BETWEEN ? AND ?", (start, end)
+            )]
+            rows = rows[~rows['id'].isin(live)]
+            self.seasonal.update(rows.astype({"target_host": str}))
+
+    def detect_anomalies(self):
+        conn = self._connect()
+        if conn is None:
+            return []
+
+        # Transação exclusiva: várias sessões do dashboard não processam o mesmo lote duas vezes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state, last_id = self.load_state(conn)
+            state, new_last_id, events = self.learn(conn, state, last_id)
+            if new_last_id != last_id:
+                conn.executemany(
+                    "INSERT INTO anomalies (metric_id, timestamp, detector, score, reason) VALUES (?, ?, ?, ?, ?)",
+                    events
+                )
+                self.save_state(conn, state, new_last_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        # Analisa apenas os últimos RECENT_MINUTES, contados da última amostra processada
+        latest = conn.execute(
+            "SELECT timestamp FROM metrics WHERE id <= ? ORDER BY id DESC LIMIT 1", (new_last_id,)
+        ).fetchone()
+        if latest is None:
+            return []
+        since = pd.Timestamp(latest[0]).to_pydatetime() - timedelta(minutes=RECENT_MINUTES)
+        rows = conn.execute(
+            "SELECT timestamp, reason FROM anomalies WHERE detector = ? AND timestamp >= ? ORDER BY metric_id DESC",
+            (DETECTOR, since)
+        ).fetchall()
+        return [{"timestamp": ts, "reason": reason} for ts, reason in rows]
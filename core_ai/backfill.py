@@ -0,0 +1,290 @@
+"""Repontua todo o histórico (banco vivo + arquivo Parquet) com os parâmetros atuais do detector.
+
+O detector incremental (NetworkBrain) só olha para as linhas novas: mudar Z_THRESHOLD
+ou MIN_SAMPLES não tem efeito no passado. Aqui o histórico é dividido em blocos
+(dia ou semana) e cada linha é comparada com o padrão aprendido com TODAS as linhas
+anteriores, exatamente como no detector incremental linha a linha:
+
+  1. Resumo (paralelo): cada bloco vira (n, média, M2) global e por faixa sazonal.
+  2. Prefixo (sequencial, barato): o estado no início de cada bloco é a combinação
+     (Chan) dos resumos de todos os blocos anteriores.
+  3. Pontuação (paralelo): cada bloco parte do seu prefixo e estende as estatísticas
+     linha a linha com somas acumuladas vetorizadas.
+
+Os alertas vão para anomalies com detector='backfill'; cada bloco é gravado numa
+transação junto com o seu registro em backfill_progress, então uma execução
+interrompida continua de onde parou. Mudou algum parâmetro: começa do zero.
+
+Uso: python core_ai/backfill.py [--db sentinel_data.db] [--chunk day|week] [--workers N] [--restart]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+import archive
+from core_ai.anomaly import Z_THRESHOLD, MIN_SAMPLES, METRICS, ANOMALIES_SCHEMA, describe
+from core_ai.seasonal import SEASONAL_MIN_SAMPLES, hour_of_week
+
+DETECTOR = "backfill"
+CHUNKS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+COLUMNS = ["id", "timestamp", "target_host", *METRICS]
+STAT_COLUMNS = ["n", "mean", "m2"]
+
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backfill_progress (
+    chunk_start DATETIME PRIMARY KEY,
+    chunk_end DATETIME,
+    params TEXT,
+    complete INTEGER,
+    rows INTEGER,
+    anomalies INTEGER,
+    finished_at DATETIME
+)
+"""
+
+def current_params(chunk):
+    # Qualquer mudança aqui invalida o progresso salvo
+    return json.dumps({"z": Z_THRESHOLD, "min_samples": MIN_SAMPLES,
+                       "seasonal_min_samples": SEASONAL_MIN_SAMPLES, "metrics": METRICS, "chunk": chunk})
+
+def combine(a, b):
+    """Combinação de Chan de dois conjuntos de estatísticas (n, média, M2), alinhados pelo índice"""
+    index = a.index.union(b.index)
+    a = a.reindex(index, fill_value=0.0)
+    b = b.reindex(index, fill_value=0.0)
+    n = a['n'] + b['n']
+    safe = n.where(n > 0, 1)
+    delta = b['mean'] - a['mean']
+    return pd.DataFrame({
+        "n": n,
+        "mean": a['mean'] + delta * b['n'] / safe,
+        "m2": a['m2'] + b['m2'] + delta ** 2 * a['n'] * b['n'] / safe,
+    })
+
+def empty_stats(names):
+    index = pd.MultiIndex.from_tuples([], names=names) if len(names) > 1 else pd.Index([], name=names[0])
+    return pd.DataFrame(columns=STAT_COLUMNS, index=index, dtype=float)
+
+def load_chunk(db_path, archive_dir, start, end):
+    """Linhas do bloco [start, end) em ordem de id (arquivo + banco vivo)"""
+    rows = archive.read_period(db_path, start, end - timedelta(microseconds=1), columns=COLUMNS,
+                               archive_dir=archive_dir)
+    if rows.empty:
+        return rows
+    rows = rows.astype({"target_host": str}).sort_values('id', kind='stable').reset_index(drop=True)
+    rows['timestamp'] = pd.to_datetime(rows['timestamp'], format='ISO8601')
+    return rows.assign(how=hour_of_week(rows['timestamp']).to_numpy())
+
+def summarize(rows):
+    """Estatísticas do bloco: global por métrica e por (alvo, métrica, hora da semana)"""
+    global_stats, seasonal = [], []
+    for metric in METRICS:
+        grouped = rows.groupby(['target_host', 'how'])[metric]
+        agg = pd.DataFrame({"n": grouped.count(), "mean": grouped.mean(), "m2": grouped.var(ddof=0) * grouped.count()})
+        agg = agg[agg['n'] > 0].fillna(0.0)
+        seasonal.append(agg.assign(metric=metric).set_index('metric', append=True))
+        values = rows[metric].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            global_stats.append((metric, len(values), values.mean(), ((values - values.mean()) ** 2).sum()))
+    global_stats = pd.DataFrame(global_stats, columns=["metric", *STAT_COLUMNS]).set_index('metric')
+    return global_stats, pd.concat(seasonal).reorder_levels(['target_host', 'metric', 'how'])
+
+def expanding(values, n0, mean0, m20, groups=None):
+    """(n, média, desvio) de tudo ANTES de cada linha: prefixo + somas acumuladas exclusivas.
+
+    As somas são deslocadas pela média do prefixo (estabilidade numérica); com
+    `groups`, os acumulados são por grupo (faixas sazonais).
+    """
+    valid = ~np.isnan(values)
+    shifted = np.where(valid, values - mean0, 0.0)
+    frame = pd.DataFrame({"k": valid.astype(float), "s1": shifted, "s2": shifted ** 2})
+    cumulative = frame.groupby(groups).cumsum() if groups is not None else frame.cumsum()
+    before = cumulative.to_numpy() - frame.to_numpy()
+    n = n0 + before[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = mean0 + before[:, 1] / n
+        m2 = m20 + before[:, 2] - before[:, 1] ** 2 / n
+        std = np.where(n > 1, np.sqrt(np.maximum(m2, 0.0) / (n - 1)), 0.0)
+    return n, np.where(n > 0, mean, mean0), std
+
+def summarize_chunk(task):
+    db_path, archive_dir, start, end = task
+    rows = load_chunk(db_path, archive_dir, start, end)
+    if rows.empty:
+        return start, None
+    return start, summarize(rows)
+
+def score_chunk(task):
+    """Pontua um bloco a partir do estado no seu início; retorna (início, linhas, eventos)"""
+    db_path, archive_dir, start, end, prefix_global, prefix_seasonal = task
+    rows = load_chunk(db_path, archive_dir, start, end)
+    if rows.empty:
+        return start, 0, []
+
+    keys = pd.MultiIndex.from_arrays([rows['target_host'], rows['how']])
+    groups = [rows['target_host'].to_numpy(), rows['how'].to_numpy()]
+    baseline, ready = {}, np.ones(len(rows), dtype=bool)
+    for metric in METRICS:
+        values = rows[metric].to_numpy(dtype=float)
+        n0, mean0, m20 = prefix_global.loc[metric] if metric in prefix_global.index else (0, 0.0, 0.0)
+        n, mean, std = expanding(values, n0, mean0, m20)
+        ready &= n >= MIN_SAMPLES
+
+        # Faixa sazonal (alvo, hora da semana): prefixo da faixa + linhas anteriores do bloco na mesma faixa
+        band = prefix_seasonal.xs(metric, level='metric') if metric in prefix_seasonal.index.get_level_values('metric') \
+            else empty_stats(['target_host', 'how'])
+        band = band.reindex(keys, fill_value=0.0)
+        s_n, s_mean, s_std = expanding(values, band['n'].to_numpy(), band['mean'].to_numpy(),
+                                       band['m2'].to_numpy(), groups=groups)
+        seasonal = s_n >= SEASONAL_MIN_SAMPLES
+        baseline[metric] = (values, np.where(seasonal, s_mean, mean), np.where(seasonal, s_std, std), seasonal)
+
+    ping, ping_mean, ping_std, ping_seasonal = baseline["ping_ms"]
+    jitter, jitter_mean, jitter_std, _ = baseline["jitter_ms"]
+    ping_hit = ready & (ping > ping_mean + Z_THRESHOLD * ping_std)
+    jitter_hit = ready & (jitter > jitter_mean + Z_THRESHOLD * jitter_std)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.fmax((ping - ping_mean) / ping_std, (jitter - jitter_mean) / jitter_std)
+
+    flagged = np.flatnonzero(ping_hit | jitter_hit)
+    ids = rows['id'].to_numpy()[flagged]
+    timestamps = rows['timestamp'].iloc[flagged]
+    events = [
+        (int(row_id), str(ts), DETECTOR, float(z[i]) if np.isfinite(z[i]) else None,
+         describe(ping[i], ping_mean[i], ping_seasonal[i], jitter[i], ping_hit[i], jitter_hit[i]))
+        for i, row_id, ts in zip(flagged, ids, timestamps)
+    ]
+    return start, len(rows), events
+
+class Backfill:
+    def __init__(self, db_path, archive_dir=None, chunk="day", workers=None):
+        self.db_path = db_path
+        self.archive_dir = archive_dir or archive.default_archive_dir(db_path)
+        self.chunk = chunk
+        self.workers = workers or os.cpu_count()
+        self.params = current_params(chunk)
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute(ANOMALIES_SCHEMA)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_detector_time ON anomalies(detector, timestamp)")
+        self.conn.execute(PROGRESS_SCHEMA)
+
+    def chunks(self):
+        """Blocos [início, fim) cobrindo do primeiro ao último registro (banco vivo e arquivo)"""
+        first, last = self.conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM metrics").fetchone()
+        bounds = [pd.Timestamp(t).to_pydatetime() for t in (first, last) if t is not None]
+        if archive.ARROW_AVAILABLE:
+            days = list(archive.archived_days(self.archive_dir))
+            if days:
+                bounds += [datetime.combine(days[0], datetime.min.time()),
+                           datetime.combine(days[-1], datetime.max.time())]
+        if not bounds:
+            return [], None
+        step = CHUNKS[self.chunk]
+        start = datetime.combine(min(bounds).date(), datetime.min.time())
+        if self.chunk == "week":
+            start -= timedelta(days=start.weekday())
+        chunks = []
+        while start <= max(bounds):
+            chunks.append((start, start + step))
+            start += step
+        return chunks, max(bounds)
+
+    def reset(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM anomalies WHERE detector = ?", (DETECTOR,))
+        self.conn.execute("DELETE FROM backfill_progress")
+        self.conn.execute("COMMIT")
+
+    def done(self):
+        """Blocos já gravados e fechados com os parâmetros atuais; outros parâmetros = recomeça"""
+        stored = self.conn.execute("SELECT chunk_start, params, complete FROM backfill_progress").fetchall()
+        if any(params != self.params for _, params, _ in stored):
+            print("🧠 [BACKFILL] Parâmetros do detector mudaram: repontuando todo o histórico.")
+            self.reset()
+            return set()
+        return {pd.Timestamp(start).to_pydatetime() for start, _, complete in stored if complete}
+
+    def save(self, start, end, complete, n_rows, events):
+        """Alertas do bloco + progresso na mesma transação (retomada segura)"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM anomalies WHERE detector = ? AND timestamp >= ? AND timestamp < ?",
+                              (DETECTOR, str(start), str(end)))
+            self.conn.executemany(
+                "INSERT INTO anomalies (metric_id, timestamp, detector, score, reason) VALUES (?, ?, ?, ?, ?)",
+                events
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO backfill_progress VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(start), str(end), self.params, int(complete), n_rows, len(events), datetime.now())
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def run(self, restart=False):
+        if restart:
+            self.reset()
+        chunks, last = self.chunks()
+        done = self.done()
+        pending = [(s, e) for s, e in chunks if s not in done]
+        if not pending:
+            print("🧠 [BACKFILL] Nada a fazer: histórico já pontuado com os parâmetros atuais.")
+            return 0, 0
+        total_rows = total_events = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # 1. Resumos de todos os blocos (o prefixo de um bloco pendente depende dos já feitos)
+            summaries = dict(pool.map(summarize_chunk, [(self.db_path, self.archive_dir, s, e) for s, e in chunks]))
+
+            # 2. Estado no início de cada bloco e 3. pontuação, enviada assim que o prefixo fica pronto
+            prefix_global, prefix_seasonal = empty_stats(['metric']), empty_stats(['target_host', 'metric', 'how'])
+            futures = []
+            for start, end in chunks:
+                if start not in done:
+                    futures.append((end, pool.submit(score_chunk, (self.db_path, self.archive_dir, start, end,
+                                                                   prefix_global, prefix_seasonal))))
+                if summaries[start] is not None:
+                    prefix_global = combine(prefix_global, summaries[start][0])
+                    prefix_seasonal = combine(prefix_seasonal, summaries[start][1])
+
+            for end, future in futures:
+                start, n_rows, events = future.result()
+                # O último bloco ainda recebe linhas: fica pendente para a próxima execução
+                self.save(start, end, end <= last, n_rows, events)
+                total_rows += n_rows
+                total_events += len(events)
+        print(f"🧠 [BACKFILL] {len(pending)} bloco(s), {total_rows:,} linhas, {total_events:,} alerta(s).")
+        return total_rows, total_events
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repontua o histórico inteiro com os parâmetros atuais do detector")
+    parser.add_argument("--db", default="sentinel_data.db")
+    parser.add_argument("--archive", default=None, help="pasta do arquivo Parquet (padrão: archive/ ao lado do banco)")
+    parser.add_argument("--chunk", choices=list(CHUNKS), default="day")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--restart", action="store_true", help="descarta o progresso e os alertas já gravados")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    backfill = Backfill(args.db, args.archive, args.chunk, args.workers)
+    try:
+        backfill.run(restart=args.restart)
+    finally:
+        backfill.close()
+    print(f"✅ [BACKFILL] Concluído em {time.perf_counter() - started:.1f}s.")
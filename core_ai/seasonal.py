@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Padrão sazonal: 168 faixas (hora da semana) por alvo e por métrica
+SEASONAL_METRICS = ["ping_ms", "jitter_ms", "packet_loss", "dns_response_ms", "gateway_ping_ms"]
+HOURS_PER_WEEK = 168
+SEASONAL_MIN_SAMPLES = 30  # Abaixo disso a faixa ainda não é confiável e usa-se o padrão global
+
+SEASONAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasonal_baseline (
+    target_host TEXT,
+    metric TEXT,
+    how INTEGER,
+    n INTEGER,
+    mean REAL,
+    m2 REAL,
+    PRIMARY KEY (target_host, metric, how)
+)
+"""
+
+# Mesma convenção do strftime('%w') do SQLite: domingo = 0
+HOW_SQL = "CAST(strftime('%w', timestamp) AS INTEGER) * 24 + CAST(strftime('%H', timestamp) AS INTEGER)"
+
+def hour_of_week(timestamps):
+    """Converte timestamps (Series datetime) no índice 0..167 da hora da semana"""
+    return ((timestamps.dt.dayofweek + 1) % 7) * 24 + timestamps.dt.hour
+
+BUCKET_KEY = ["target_host", "metric", "how"]
+STAT_COLUMNS = ["n", "mean", "m2"]
+
+def empty_buckets():
+    index = pd.MultiIndex.from_arrays([[], [], []], names=BUCKET_KEY)
+    return pd.DataFrame(columns=STAT_COLUMNS, index=index, dtype=float)
+
+class SeasonalBaseline:
+    """Índice pré-calculado (alvo, métrica, hora da semana) -> (n, média, M2).
+
+    Mantido em memória como DataFrame indexado pela chave, para que lote e
+    pontuação sejam junções vetorizadas, e persistido na tabela
+    seasonal_baseline a cada lote processado.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute(SEASONAL_SCHEMA)
+        self.buckets = empty_buckets()
+        self.load()
+
+    def load(self):
+        frame = pd.read_sql_query("SELECT target_host, metric, how, n, mean, m2 FROM seasonal_baseline", self.conn)
+        self._set(frame)
+
+    def _set(self, frame):
+        frame = frame.astype({"target_host": str, "metric": str, "how": "int64", "n": float})
+        self.buckets = frame.set_index(BUCKET_KEY)[STAT_COLUMNS] if not frame.empty else empty_buckets()
+
+    def lookup(self, hosts, metric, hows):
+        """Média e desvio da faixa de cada linha, e se a faixa já tem amostras suficientes"""
+        keys = pd.MultiIndex.from_arrays(
+            [np.asarray(hosts, dtype=str), np.full(len(hosts), metric), np.asarray(hows, dtype="int64")],
+            names=BUCKET_KEY
+        )
+        band = self.buckets.reindex(keys)
+        n = band['n'].fillna(0.0).to_numpy()
+        ready = n >= SEASONAL_MIN_SAMPLES
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(band['m2'].to_numpy() / (n - 1))
+        return band['mean'].to_numpy(), std, ready
+
+    def update(self, rows):
+        """Incorpora um lote de linhas novas (precisa de 'timestamp' datetime e 'target_host')"""
+        metrics = [m for m in SEASONAL_METRICS if m in rows.columns]
+        if rows.empty or not metrics:
+            return
+        frame = rows.assign(how=hour_of_week(rows['timestamp']).astype("int64"))
+        grouped = frame.groupby(['target_host', 'how'])[metrics]
+        count, mean, var = grouped.count().astype(float), grouped.mean(), grouped.var(ddof=0)
+        batch = pd.concat({m: pd.DataFrame({"n": count[m], "mean": mean[m], "m2": var[m] * count[m]})
+                           for m in metrics}, names=['metric'])
+        batch = batch[batch['n'] > 0].reorder_levels(BUCKET_KEY)
+        if batch.empty:
+            return
+
+        # Combinação de Chan: junta o lote ao acumulado de cada faixa (junção pela chave)
+        old = self.buckets.reindex(batch.index, fill_value=0.0)
+        total = old['n'] + batch['n']
+        delta = batch['mean'] - old['mean']
+        merged = pd.DataFrame({
+            "n": total,
+            "mean": old['mean'] + delta * batch['n'] / total,
+            "m2": old['m2'] + batch['m2'] + delta ** 2 * old['n'] * batch['n'] / total,
+        })
+        self.buckets = pd.concat([self.buckets.drop(merged.index, errors='ignore'), merged])
+        self.save(merged)
+
+    def save(self, buckets):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO seasonal_baseline (target_host, metric, how, n, mean, m2) VALUES (?, ?, ?, ?, ?, ?)",
+            [(host, metric, int(how), int(n), float(mean), float(m2))
+             for (host, metric, how), n, mean, m2 in buckets.itertuples(name=None)]
+        )
+
+    def rebuild(self, up_to_id=None):
+        """Reconstrói todas as faixas a partir do histórico inteiro em uma única passada SQL"""
+        selects = ", ".join(
+            f"COUNT({m}) AS {m}_n, AVG({m}) AS {m}_mean, SUM({m} * {m}) AS {m}_sumsq" for m in SEASONAL_METRICS
+        )
+        where = "WHERE id <= ?" if up_to_id is not None else ""
+        params = (up_to_id,) if up_to_id is not None else ()
+        frame = pd.read_sql_query(
+            f"SELECT target_host, {HOW_SQL} AS how, {selects} FROM metrics {where} GROUP BY target_host, how",
+            self.conn, params=params
+        ).dropna(subset=['how'])
+
+        # Uma linha por (alvo, hora da semana) com as três somas de cada métrica -> uma linha por faixa
+        buckets = pd.concat([
+            frame[['target_host', 'how', f"{m}_n", f"{m}_mean", f"{m}_sumsq"]]
+            .set_axis(['target_host', 'how', 'n', 'mean', 'sumsq'], axis=1).assign(metric=m)
+            for m in SEASONAL_METRICS
+        ])
+        buckets = buckets[buckets['n'] > 0]
+        # M2 = Σx² - n·média² (limitado a zero contra erro de arredondamento)
+        buckets = buckets.assign(m2=(buckets['sumsq'] - buckets['n'] * buckets['mean'] ** 2).clip(lower=0.0))
+        self._set(buckets)
+
+        self.conn.execute("DELETE FROM seasonal_baseline")
+        self.save(self.buckets)
@@ -1,20 +1,15 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import time
+import calendar
+import datetime
 import os
 import sys
 
 # Adiciona o caminho para importar a IA (ajuste se necessário)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-# Tenta importar a IA, se falhar, define como None para não quebrar o app
-try:
-    from core_ai.anomaly import NetworkBrain
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
+from views import SharedViews, AI_AVAILABLE
+from live_ring import LiveRingReader, ring_path
+import sla
 
 from report_engine import generate_pdf
 
@@ -71,127 +66,132 @@ st.markdown("""
 
 # --- FUNÇÕES AUXILIARES ---
 
-def load_data():
-    # Caminho relativo para encontrar o DB
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agent', 'sentinel_data.db')
+# Janelas de análise (horas). Até 24h os gráficos usam linhas brutas; acima, os agregados 1m/1h
+PERIODS = {
+    "Últimas 3 horas": 3,
+    "Últimas 24 horas": 24,
+    "Últimos 7 dias": 24 * 7,
+    "Últimos 30 dias": 24 * 30,
+}
+LIVE_REFRESH = 1  # Segundos entre atualizações dos KPIs (lidos do anel do agente, sem SQLite)
+DATA_REFRESH = 5  # Segundos entre atualizações dos painéis lidos do banco (fragmentos, sem recarregar a página)
+
+# Dados, alertas e gráficos calculados uma vez por versão do banco e servidos a todas as sessões
+@st.cache_resource
+def get_views(db_path):
+    return SharedViews(db_path)
+
+def load_data(hours=3, host=None, label=""):
+    # Caminho relativo para encontrar o DB; SENTINEL_DB aponta para outro banco (ex: o da frota)
+    db_path = os.environ.get("SENTINEL_DB") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'agent', 'sentinel_data.db'
+    )
     
     if not os.path.exists(db_path):
         st.error(f"🔌 Erro: Banco de dados não encontrado em {db_path}.")
-        return pd.DataFrame(), db_path
+        return {"df": pd.DataFrame(), "hosts": []}, db_path
 
     try:
-        conn = sqlite3.connect(db_path)
-        # Carrega mais dados para os gráficos de histórico
-        df = pd.read_sql_query("SELECT * FROM metrics ORDER BY id DESC LIMIT 1000", conn)
-        conn.close()
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        return df, db_path
+        # Só a primeira sessão depois de uma amostra nova consulta o banco; as outras recebem o resultado pronto
+        return get_views(db_path).view(hours, host, label), db_path
     except Exception as e:
         st.error(f"Erro BD: {e}")
-        return pd.DataFrame(), db_path
-
-# Função para estilizar gráficos Plotly
-def style_plotly(fig):
-    fig.update_layout(
-        template="plotly_dark",
-        plot_bgcolor='rgba(0,0,0,0)',    # Fundo transparente
-        paper_bgcolor='rgba(0,0,0,0)',   # Fundo transparente
-        margin=dict(l=20, r=20, t=40, b=20),
-        hovermode="x unified", # Tooltip moderno
-        xaxis=dict(showgrid=False, zeroline=False), # Remove grades feias
-        yaxis=dict(showgrid=True, gridcolor='#2B2F42', zeroline=False), # Grade sutil apenas horizontal
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    return fig
+        return {"df": pd.DataFrame(), "hosts": []}, db_path
+
+# Leitor do anel <banco>-live publicado pelo agente: um por banco, compartilhado entre sessões
+@st.cache_resource
+def get_live(db_path):
+    return LiveRingReader(ring_path(db_path))
+
+# KPIs em fragmento: reexecuta sozinho a cada LIVE_REFRESH, sem refazer consultas nem gráficos
+@st.fragment(run_every=LIVE_REFRESH)
+def render_kpis(db_path, fallback, host=None):
+    # Anel do agente (últimas amostras, sem tocar no banco); sem anel ou atrasado, as linhas já carregadas.
+    # Em "Todos", a variação compara com a amostra anterior do mesmo alvo da mais recente
+    live = get_live(db_path)
+    newest = live.latest(1, host)
+    rows = live.latest(2, newest[0]['target_host']) if newest else []
+    if not rows or rows[0]['timestamp'] < fallback[0]['timestamp']:
+        rows = fallback
+    latest = rows[0]
 
-# --- CARREGAMENTO DE DADOS ---
-df, db_path_for_ai = load_data()
-
-# --- SIDEBAR ---
-with st.sidebar:
-    st.title("🛡️ Sentinel")
-    st.markdown("---")
-    
-    # --- SEÇÃO 1: AUDITORIA ---
-    st.subheader("🖨️ Auditoria")
-    st.caption("Gere documentação legal da performance de rede.")
-    
-    if not df.empty:
-        if st.button("📄 Gerar Dossiê PDF", type="primary", use_container_width=True):
-            with st.spinner("Compilando evidências..."):
-                pdf_file = generate_pdf(df) # Usa sua engine atual
-                time.sleep(1) # Simula processamento
-            
-            with open(pdf_file, "rb") as f:
-                st.download_button(
-                    label="⬇️ Baixar Relatório Final",
-                    data=f,
-                    file_name=f"Sentinel_Auditoria_{int(time.time())}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-            st.success("Dossiê gerado!")
-    else:
-        st.warning("Aguardando dados para gerar relatórios.")
-
-    # --- SEÇÃO 2: CALCULADORA SLA (NOVO) ---
-    st.markdown("---")
-    st.subheader("💰 Calculadora Financeira")
-    st.caption("Auditoria de contrato e cálculo de multas.")
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
 
-    # Inputs de Contrato
-    contract_value = st.number_input("Valor Mensal (R$)", value=500.0, step=50.0, format="%.2f")
-    sla_target = st.slider("Meta de SLA (%)", 90.0, 99.9, 99.0, step=0.1)
+    # Alvo inacessível no último ciclo: a linha existe (perda 100%), mas sem latência
+    unreachable = pd.isna(latest['ping_ms'])
 
-    if not df.empty:
-        # Lógica de Cálculo (Baseado na janela de dados carregada - aprox. últimas horas)
-        # Cada registro ~ 10 segundos
-        total_minutes = len(df) * (10 / 60)
+    with kpi1:
+        if unreachable:
+            st.metric("📡 Ping (Latência)", "—")
+        else:
+            previous = rows[1]['ping_ms'] if len(rows) > 1 else None
+            delta_ping = 0 if pd.isna(previous) else latest['ping_ms'] - previous
+            st.metric("📡 Ping (Latência)", f"{latest['ping_ms']:.1f} ms", 
+                      delta=f"{delta_ping:.1f} ms", delta_color="inverse")
         
-        # Define o que é "Downtime" (Perda > 0 ou Status != OK)
-        downtime_count = len(df[(df['packet_loss'] > 0) | (df['status'] != 'OK')])
-        downtime_minutes = downtime_count * (10 / 60)
+    with kpi2:
+        st.metric("⚡ Jitter (Instabilidade)", "—" if unreachable else f"{latest['jitter_ms']:.1f} ms")
         
-        # Uptime Real
-        real_uptime = 100 - ((downtime_minutes / total_minutes) * 100) if total_minutes > 0 else 100
+    with kpi3:
+        loss = latest['packet_loss']
+        loss_color = "metric-error" if loss > 0 else "metric-success"
+        st.markdown(f"""
+            <div data-testid="stMetricValue" class="css-1xarl3l e1i5pmia1">
+                <div class="css-1wivap2 e1i5pmia3">📦 Perda</div>
+                <div class="css-1xarl3l e1i5pmia1 {loss_color}" style="font-size: 32px; font-weight: 600;">
+                {loss}%
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+    with kpi4:
+        status = latest['status']
+        icon = "🟢" if status == 'OK' else "🔴"
+        st.metric("Status SLA", f"{icon} {status}")
+
+# Painéis lidos do banco em fragmentos: reexecutam sozinhos a cada DATA_REFRESH e o script
+# principal termina (sem sleep + rerun no fim), então o fragmento de KPIs roda a cada LIVE_REFRESH
+@st.fragment(run_every=DATA_REFRESH)
+def render_sla(period, host, contract_value, sla_target):
+    view, _ = load_data(PERIODS[period], host, period)
+    if not view['df'].empty:
+        # SLA do mês corrente pelos acumuladores diários do agente (intervalos reais entre amostras)
+        today = datetime.date.today()
+        month = view['month']
+        downtime_minutes = month['down_s'] / 60
+        real_uptime = month['uptime_pct']
         
         st.divider()
-        st.write(f"**Uptime (Janela):** {real_uptime:.2f}%")
+        st.write(f"**Uptime (Mês):** {real_uptime:.2f}%")
+        st.caption(f"Fora do ar: {downtime_minutes:.1f} min · Sem monitoramento: {month['unmonitored_s'] / 60:.1f} min")
         
         if real_uptime < sla_target:
             st.error("❌ SLA Violado")
             # Multa Estimada: (Valor Mensal / Minutos no Mes) * Minutos Offline * 10 (Penalidade)
-            minutes_in_month = 30 * 24 * 60
-            refund = (contract_value / minutes_in_month) * downtime_minutes * 10
+            month_days = calendar.monthrange(today.year, today.month)[1]
+            refund = sla.refund(contract_value, month['down_s'], month_days)
             st.metric("Reembolso Estimado", f"R$ {refund:.2f}")
         else:
             st.success("✅ SLA Cumprido")
             st.caption("Nenhum desconto aplicável no período atual.")
-            
-    st.markdown("---")
-    st.info("**Status do Agente:**\n\nMonitoramento ativo em background.")
-
 
-# ---CORPO PRINCIPAL ---
-
-# Cabeçalho com Logo e Título
-col_header1, col_header2 = st.columns([1, 5])
-with col_header1:
-    st.markdown("# 🛡️")
-with col_header2:
-    st.title("Network Sentinel Enterprise")
-    st.caption("Plataforma de Observabilidade e Auditoria de SLA em Tempo Real")
-
-st.markdown("---")
-
-if not df.empty:
-    latest = df.iloc[0]
+@st.fragment(run_every=DATA_REFRESH)
+def render_panels(period, host, hosts):
+    view, db_path = load_data(PERIODS[period], host, period)
+    if view['hosts'] != hosts:
+        # Primeira amostra ou alvo novo na frota: refaz a página (seletor de alvo, auditoria)
+        st.rerun()
+    if view['df'].empty:
+        st.info("📡 Aguardando primeira conexão do Agente Sentinela...")
+        st.progress(10)
+        return
+    figures = view['figures']
 
     # --- SEÇÃO 1: INTELIGÊNCIA ARTIFICIAL ---
-    if AI_AVAILABLE:
-        brain = NetworkBrain(db_path_for_ai)
-        anomalies = brain.detect_anomalies()
-
+    # Agente com detector em fluxo: os alertas já estão gravados, o dashboard só lê
+    # Sem ele, o NetworkBrain roda uma vez por amostra nova para todas as sessões
+    anomalies, stream_detection = view['anomalies'], view['stream_detection']
+    if stream_detection or AI_AVAILABLE:
         if anomalies:
             with st.status("🧠 Análise de IA: Anomalias Detectadas", expanded=True, state="error"):
                 st.write(f"O motor neural identificou **{len(anomalies)} comportamentos** fora do padrão histórico.")
@@ -199,7 +199,10 @@ if not df.empty:
                     ts_obj = pd.to_datetime(a['timestamp'])
                     fmt_time = ts_obj.strftime('%H:%M:%S')
                     st.error(f"**[{fmt_time}]** {a['reason']}", icon="⚠️")
-                st.caption("ℹ️ Estes alertas baseiam-se no desvio padrão (Z-Score) da sua conexão.")
+                if stream_detection:
+                    st.caption("ℹ️ Alertas do agente: mediana/MAD, EWMA e CUSUM sobre ping, jitter, perda, DNS e Gateway.")
+                else:
+                    st.caption("ℹ️ Estes alertas baseiam-se no desvio padrão (Z-Score) da sua conexão.")
         else:
             with st.status("🧠 Análise de IA: Comportamento Padrão", expanded=False, state="complete"):
                 st.write("Nenhuma anomalia estatística detectada nos últimos ciclos.")
@@ -210,32 +213,7 @@ if not df.empty:
     st.markdown("###")
 
     # --- SEÇÃO 2: KPIs PRINCIPAIS (CARDS VISUAIS) ---
-    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-
-    with kpi1:
-        delta_ping = latest['ping_ms'] - df.iloc[1]['ping_ms'] if len(df) > 1 else 0
-        st.metric("📡 Ping (Latência)", f"{latest['ping_ms']:.1f} ms", 
-                  delta=f"{delta_ping:.1f} ms", delta_color="inverse")
-        
-    with kpi2:
-        st.metric("⚡ Jitter (Instabilidade)", f"{latest['jitter_ms']:.1f} ms")
-        
-    with kpi3:
-        loss = latest['packet_loss']
-        loss_color = "metric-error" if loss > 0 else "metric-success"
-        st.markdown(f"""
-            <div data-testid="stMetricValue" class="css-1xarl3l e1i5pmia1">
-                <div class="css-1wivap2 e1i5pmia3">📦 Perda</div>
-                <div class="css-1xarl3l e1i5pmia1 {loss_color}" style="font-size: 32px; font-weight: 600;">
-                {loss}%
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-    with kpi4:
-        status = latest['status']
-        icon = "🟢" if status == 'OK' else "🔴"
-        st.metric("Status SLA", f"{icon} {status}")
+    render_kpis(db_path, view['latest'], host)
 
     st.markdown("---")
 
@@ -244,92 +222,58 @@ if not df.empty:
     # Gráfico 1: Latência e Jitter
     st.subheader("📉 Auditoria de Estabilidade")
     
-    fig_main = go.Figure()
-    
-    # Ping
-    fig_main.add_trace(go.Scatter(
-        x=df['timestamp'], y=df['ping_ms'],
-        mode='lines', name='Ping (ms)',
-        line=dict(color='#00CC96', width=2, shape='spline'),
-        fill='tozeroy', fillcolor='rgba(0, 204, 150, 0.1)'
-    ))
-
-    # Jitter
-    fig_main.add_trace(go.Scatter(
-        x=df['timestamp'], y=df['jitter_ms'],
-        mode='lines', name='Jitter (ms)',
-        line=dict(color='#EF553B', width=2, shape='spline'),
-        fill='tozeroy', fillcolor='rgba(239, 85, 59, 0.2)'
-    ))
-
-    fig_main = style_plotly(fig_main)
-    fig_main.update_layout(height=350, title_text="Latência vs Instabilidade (Últimos registros)")
-    st.plotly_chart(fig_main, use_container_width=True)
+    st.plotly_chart(figures['stability'], use_container_width=True)
+    latency = view['latency']
+    if latency and latency['samples']:
+        st.caption(f"📊 RTT por pacote no período ({latency['samples']:,} pings): mediana {latency['p50']:.1f} ms · "
+                   f"p95 {latency['p95']:.1f} ms · p99 {latency['p99']:.1f} ms")
 
     # --- GRÁFICO DE CAUSA RAIZ (INTERNO vs EXTERNO) ---
     st.subheader("🕵️ Diagnóstico de Causa Raiz (Interno vs Operadora)")
     
     # Verifica se a coluna nova existe no DF antes de plotar
-    if 'gateway_ping_ms' in df.columns:
-        fig_rca = go.Figure()
-
-        # Linha do Gateway (Rede Local) - Laranja Pontilhado
-        fig_rca.add_trace(go.Scatter(
-            x=df['timestamp'], y=df['gateway_ping_ms'],
-            mode='lines', name='Rede Local (Gateway)',
-            line=dict(color='#FFA15A', width=2, dash='dot') 
-        ))
-
-        # Linha da Internet (Google) - Verde Sólido
-        fig_rca.add_trace(go.Scatter(
-            x=df['timestamp'], y=df['ping_ms'],
-            mode='lines', name='Internet (Operadora)',
-            line=dict(color='#00CC96', width=2) 
-        ))
-
-        fig_rca = style_plotly(fig_rca)
-        fig_rca.update_layout(
-            height=350, 
-            title_text="Comparativo: A lentidão está no Wi-Fi/Switch ou na Fibra?",
-            yaxis_title="Latência (ms)"
-        )
-        st.plotly_chart(fig_rca, use_container_width=True)
+    if figures['rca'] is not None:
+        st.plotly_chart(figures['rca'], use_container_width=True)
         
         # --- VISUALIZADOR DE TRACEROUTE (EVIDÊNCIA FORENSE) ---
-        if 'trace_log' in df.columns:
-            trace_events = df[df['trace_log'] != ""]
-            trace_events = trace_events.dropna(subset=['trace_log'])
-            
-            if not trace_events.empty:
-                st.subheader("🔍 Evidências Forenses (Traceroute)")
-                last_trace = trace_events.iloc[0]
-                with st.expander(f"⚠️ Ver Rota da Falha ({last_trace['timestamp'].strftime('%H:%M:%S')})", expanded=True):
-                    st.code(last_trace['trace_log'], language="text")
-                    st.caption("Este log prova exatamente em qual salto (hop) a conexão foi interrompida ou degradada.")
+        # O texto do trace não vem na janela: lido à parte, uma vez por amostra nova
+        last_trace = view['last_trace']
+        if last_trace and last_trace[1]:
+            trace_time = pd.to_datetime(last_trace[0], format='ISO8601')
+            st.subheader("🔍 Evidências Forenses (Traceroute)")
+            with st.expander(f"⚠️ Ver Rota da Falha ({trace_time.strftime('%H:%M:%S')})", expanded=True):
+                st.code(last_trace[1], language="text")
+                st.caption("Este log prova exatamente em qual salto (hop) a conexão foi interrompida ou degradada.")
     else:
         st.warning("⚠️ Atualize o banco de dados rodando o novo Agente Sentinel V2 para ver o gráfico de Causa Raiz.")
 
+    # --- VAZÃO DO LINK (contadores das interfaces + teste ativo ocasional) ---
+    if figures['bandwidth'] is not None:
+        st.subheader("📶 Vazão do Link")
+        st.plotly_chart(figures['bandwidth'], use_container_width=True)
+        last_test = view['last_test']
+        if last_test:
+            test_time = pd.to_datetime(last_test['timestamp'], format='ISO8601').strftime('%d/%m %H:%M')
+            if last_test['error'] and last_test['download_mbps'] is None and last_test['upload_mbps'] is None:
+                st.caption(f"🚀 Último teste de banda ({test_time}) falhou: {last_test['error']}")
+            else:
+                st.caption(f"🚀 Último teste de banda ({test_time}): ↓ {last_test['download_mbps']} Mbps · "
+                           f"↑ {last_test['upload_mbps']} Mbps")
+
     # --- SEÇÃO 4: GRID INFERIOR (DNS e TABELA) ---
     col_dns, col_events = st.columns([3, 2])
 
     with col_dns:
         st.subheader("🌐 Performance DNS")
-        fig_dns = px.area(df, x='timestamp', y='dns_response_ms', 
-                          line_shape='spline', color_discrete_sequence=['#636EFA'])
-        fig_dns = style_plotly(fig_dns)
-        fig_dns.update_layout(height=300, title_text="Tempo de Resolução (ms)", showlegend=False)
-        st.plotly_chart(fig_dns, use_container_width=True)
+        st.plotly_chart(figures['dns'], use_container_width=True)
 
     with col_events:
         st.subheader("⚠️ Log de Eventos Críticos")
-        critical_df = df[(df['packet_loss'] > 0) | (df['status'] != 'OK')]
+        events = view['events']
         
-        if not critical_df.empty:
-            display_df = critical_df[['timestamp', 'packet_loss', 'jitter_ms', 'status']].copy()
-            display_df['timestamp'] = display_df['timestamp'].dt.strftime('%H:%M:%S')
-            
+        if not events.empty:
             st.dataframe(
-                display_df.head(10),
+                events,
                 hide_index=True,
                 use_container_width=True,
                 height=250,
@@ -343,12 +287,108 @@ if not df.empty:
         else:
             st.container(border=True).success("✅ Nenhum evento crítico de infraestrutura registrado no período recente.")
 
-else:
-    st.info("📡 Aguardando primeira conexão do Agente Sentinela...")
-    st.progress(10)
-    time.sleep(2)
-    st.rerun()
+    # --- SEÇÃO 5: SAÚDE DO PRÓPRIO AGENTE (telemetria gravada em agent_stats) ---
+    health, stages = view['health'], view['stages']
+    if health:
+        with st.expander("🩺 Saúde do Agente", expanded=False):
+            h1, h2, h3, h4 = st.columns(4)
+            h1.metric("CPU", f"{health.get('cpu_pct', 0):.1f}%")
+            h2.metric("Memória", f"{health['memory_mb']:.0f} MB")
+            h3.metric("Fila do Banco", f"{health['queue_depth'] or 0:.0f}")
+            h4.metric("Timeouts ICMP", f"{health.get('timeout_pct', 0):.1f}%")
+            st.caption(f"Intervalo atual: {health['interval_s'] or 0:.0f}s · Ciclos atrasados (overrun): {health['overruns'] or 0:.0f}")
+
+            col_stages, col_cycle = st.columns([2, 3])
+            with col_stages:
+                if not stages.empty:
+                    st.dataframe(
+                        stages.sort_values("mean_ms", ascending=False),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            "stage": "Estágio",
+                            "mean_ms": st.column_config.NumberColumn("Média", format="%.1f ms"),
+                            "count": "Execuções",
+                        }
+                    )
+            with col_cycle:
+                if figures['cycle'] is not None:
+                    st.plotly_chart(figures['cycle'], use_container_width=True)
+
+# --- CARREGAMENTO DE DADOS ---
+with st.sidebar:
+    st.title("🛡️ Sentinel")
+    period = st.selectbox("🕒 Janela de Análise", list(PERIODS))
+
+view, db_path_for_ai = load_data(PERIODS[period], label=period)
+
+# Vários alvos (ou sites da frota, "<agente>/<alvo>"): um de cada vez nos painéis
+selected_hosts = None
+if len(view['hosts']) > 1:
+    with st.sidebar:
+        choice = st.selectbox("📍 Alvo", ["Todos", *view['hosts']])
+    if choice != "Todos":
+        selected_hosts = [choice]
+        view, _ = load_data(PERIODS[period], choice, period)
+host = selected_hosts[0] if selected_hosts else None
+df = view['df']
+
+# --- SIDEBAR ---
+with st.sidebar:
+    st.markdown("---")
+    
+    # --- SEÇÃO 1: AUDITORIA ---
+    st.subheader("🖨️ Auditoria")
+    st.caption("Gere documentação legal da performance de rede.")
+    
+    if not df.empty:
+        # Período do relatório (padrão: mês corrente, para auditoria da fatura)
+        today = datetime.date.today()
+        report_range = st.date_input("📅 Período do Relatório", value=(today.replace(day=1), today), max_value=today)
+        if st.button("📄 Gerar Dossiê PDF", type="primary", use_container_width=True, disabled=len(report_range) != 2):
+            report_start = datetime.datetime.combine(report_range[0], datetime.time.min)
+            report_end = datetime.datetime.combine(report_range[1], datetime.time.max)
+            with st.spinner("Compilando evidências..."):
+                # PDF em cache por período + versão dos dados: downloads repetidos não refazem nada
+                pdf_file = generate_pdf(db_path_for_ai, report_start, report_end, hosts=selected_hosts)
+            
+            with open(pdf_file, "rb") as f:
+                st.download_button(
+                    label="⬇️ Baixar Relatório Final",
+                    data=f,
+                    file_name=os.path.basename(pdf_file),
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            st.success("Dossiê gerado!")
+    else:
+        st.warning("Aguardando dados para gerar relatórios.")
+
+    # --- SEÇÃO 2: CALCULADORA SLA (NOVO) ---
+    st.markdown("---")
+    st.subheader("💰 Calculadora Financeira")
+    st.caption("Auditoria de contrato e cálculo de multas.")
+
+    # Inputs de Contrato
+    contract_value = st.number_input("Valor Mensal (R$)", value=500.0, step=50.0, format="%.2f")
+    sla_target = st.slider("Meta de SLA (%)", 90.0, 99.9, 99.0, step=0.1)
+
+    render_sla(period, host, contract_value, sla_target)
+
+    st.markdown("---")
+    st.info("**Status do Agente:**\n\nMonitoramento ativo em background.")
+
+
+# ---CORPO PRINCIPAL ---
+
+# Cabeçalho com Logo e Título
+col_header1, col_header2 = st.columns([1, 5])
+with col_header1:
+    st.markdown("# 🛡️")
+with col_header2:
+    st.title("Network Sentinel Enterprise")
+    st.caption("Plataforma de Observabilidade e Auditoria de SLA em Tempo Real")
+
+st.markdown("---")
 
-# Auto-refresh suave
-time.sleep(5)
-st.rerun()
\ No newline at end of file
+render_panels(period, host, view['hosts'])
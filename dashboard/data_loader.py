@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Módulos do agente (agregados 1m/1h/1d)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+import rollups
+import stream_detector
+from database import SentinelDB
+
+# Colunas que os painéis realmente usam (trace_log fica de fora: é carregado sob demanda)
+RAW_COLUMNS = [
+    "id", "timestamp", "target_host", "ping_ms", "jitter_ms", "packet_loss",
+    "dns_response_ms", "gateway_ping_ms", "download_mbps", "upload_mbps", "rtp_jitter_ms", "status"
+]
+BUCKET_FREQ = {"1m": "min", "1h": "h", "1d": "D"}
+STATS_COLUMNS = ["timestamp", "name", "labels", "value"]
+STREAM_WINDOW_MINUTES = 10  # Alertas do detector em fluxo exibidos no painel de IA
+
+def counter_increase(series):
+    """Aumento entre snapshots de um valor cumulativo; reinício do agente zera o contador"""
+    delta = series.diff()
+    return delta.where(delta >= 0, series)
+
+def agent_health(stats):
+    """Resumo da telemetria do agente (snapshots de agent_stats) para o painel de saúde.
+
+    Retorna (resumo, estágios, ciclos): valores mais recentes, tempo médio por
+    estágio no período e a duração média do ciclo em cada intervalo entre snapshots.
+    """
+    if stats.empty:
+        return {}, pd.DataFrame(), pd.DataFrame()
+    stats = stats.assign(stage=stats['labels'].map(lambda raw: json.loads(raw or "{}").get("stage")))
+    wide = stats[stats['stage'].isna()].pivot_table(index='timestamp', columns='name', values='value', aggfunc='last')
+    latest = wide.iloc[-1]
+
+    summary = {
+        "memory_mb": latest.get("process_resident_memory_bytes", float('nan')) / 1024 / 1024,
+        "queue_depth": latest.get("db_queue_depth"),
+        "interval_s": latest.get("scheduler_interval_seconds"),
+        "overruns": latest.get("scheduler_overruns"),
+    }
+    elapsed = wide.index.to_series().diff().dt.total_seconds()
+    if "process_cpu_seconds" in wide and len(wide) > 1:
+        summary["cpu_pct"] = counter_increase(wide["process_cpu_seconds"]).iloc[-1] / elapsed.iloc[-1] * 100
+    if {"probes_sent_total", "probe_timeouts_total"} <= set(wide.columns):
+        sent = counter_increase(wide["probes_sent_total"]).iloc[1:].sum()
+        timeouts = counter_increase(wide["probe_timeouts_total"]).iloc[1:].sum()
+        summary["timeout_pct"] = timeouts / sent * 100 if sent else 0.0
+
+    staged = stats[stats['stage'].notna()].pivot_table(
+        index='timestamp', columns=['stage', 'name'], values='value', aggfunc='last'
+    )
+    stages, cycles = [], pd.DataFrame()
+    for stage in staged.columns.get_level_values(0).unique():
+        total = counter_increase(staged[(stage, "stage_seconds_sum")]).iloc[1:]
+        count = counter_increase(staged[(stage, "stage_seconds_count")]).iloc[1:]
+        if count.sum():
+            stages.append({"stage": stage, "mean_ms": total.sum() / count.sum() * 1000, "count": int(count.sum())})
+        if stage == "cycle":
+            cycles = (total / count.where(count > 0) * 1000).rename("cycle_ms").dropna().reset_index()
+    return summary, pd.DataFrame(stages), cycles
+
+class DeltaLoader:
+    """Mantém a janela carregada em memória e busca só o que chegou desde a última leitura.
+
+    Dados brutos usam o id como cursor (id > último visto). Nos agregados o
+    último balde ainda está sendo preenchido, então ele é relido junto com os
+    baldes novos.
+    """
+
+    def __init__(self, db_path, hours, max_points=1200):
+        self.db_path = db_path
+        self.hours = hours
+        self.resolution = rollups.choose_resolution(
+            datetime.now() - timedelta(hours=hours), datetime.now(), max_points
+        )
+        self.df = pd.DataFrame()
+        self.last_id = 0
+        self.last_bucket = None
+        self.db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.db is None:
+            self.db = SentinelDB(self.db_path, readonly=True)
+        return self.db
+
+    @staticmethod
+    def _frame(rows, columns):
+        new = pd.DataFrame.from_records(list(rows), columns=columns)
+        if not new.empty:
+            new['timestamp'] = pd.to_datetime(new['timestamp'], format='ISO8601')
+        return new
+
+    def _fetch_raw(self, start):
+        db = self._connect()
+        if self.last_id == 0:
+            rows = db.query(start=start, columns=RAW_COLUMNS)
+        else:
+            rows = db.query(after_id=self.last_id, columns=RAW_COLUMNS)
+        new = self._frame(rows, RAW_COLUMNS)
+        if not new.empty:
+            self.last_id = int(new['id'].max())
+        return new, self.df
+
+    def _fetch_rollup(self, start):
+        fmt = rollups.RESOLUTIONS[self.resolution][1]
+        since = self.last_bucket or start.strftime(fmt)
+        new = self._frame(self._connect().query_rollup(self.resolution, start=since), rollups.ROLLUP_COLUMNS)
+        old = self.df
+        if not new.empty:
+            self.last_bucket = new['timestamp'].iat[0].strftime(fmt)
+            # Os baldes relidos substituem as versões parciais que já estavam em memória
+            if not old.empty:
+                old = old[old['timestamp'] < new['timestamp'].min()]
+        return new, old
+
+    def refresh(self):
+        """Atualiza a janela e retorna o DataFrame (mais recente primeiro)"""
+        with self._lock:
+            start = datetime.now() - timedelta(hours=self.hours)
+            if self.resolution == "raw":
+                new, old = self._fetch_raw(start)
+            else:
+                new, old = self._fetch_rollup(start)
+
+            if new.empty and not self.df.empty and self.df['timestamp'].iat[-1] >= start:
+                return self.df  # Nada novo e nada a descartar
+
+            if old.empty or new.empty:
+                # concat com um quadro vazio (colunas object) perderia o dtype datetime
+                df = old if new.empty else new
+            else:
+                df = pd.concat([new, old], ignore_index=True)
+            # Linhas reenviadas pelo spool da frota chegam com id novo e timestamp antigo:
+            # a janela fica sempre do mais recente para o mais antigo (o downsampling supõe x ordenado)
+            if not df.empty and not df['timestamp'].is_monotonic_decreasing:
+                df = df.sort_values('timestamp', ascending=False, kind='stable', ignore_index=True)
+            # Descarta o que saiu da janela
+            if not df.empty:
+                cutoff = pd.Timestamp(start)
+                if self.resolution != "raw":
+                    cutoff = cutoff.floor(BUCKET_FREQ[self.resolution])
+                df = df[df['timestamp'] >= cutoff].reset_index(drop=True)
+            df.attrs['resolution'] = self.resolution
+            self.df = df
+            return df
+
+    def latest_trace(self):
+        """Último traceroute forense (carregado só quando o painel precisa)"""
+        with self._lock:
+            return self._connect().latest_trace()
+
+    def latest_throughput_test(self):
+        """Último teste de banda ativo do agente (None se nunca rodou ou banco antigo)"""
+        with self._lock:
+            try:
+                return self._connect().latest_throughput_test()
+            except sqlite3.OperationalError:
+                return None
+
+    def latency_percentiles(self, hosts=None):
+        """Percentis do RTT na janela pelos sketches dos agregados (None em bancos sem sketch)"""
+        with self._lock:
+            end = datetime.now()
+            try:
+                return self._connect().latency_percentiles(end - timedelta(hours=self.hours), end, hosts)
+            except sqlite3.OperationalError:
+                return None
+
+    def stream_anomalies(self, minutes=STREAM_WINDOW_MINUTES):
+        """Alertas recentes do detector em fluxo do agente; None se o agente não roda o detector"""
+        with self._lock:
+            db = self._connect()
+            try:
+                if db.conn.execute("SELECT 1 FROM stream_state LIMIT 1").fetchone() is None:
+                    return None
+            except sqlite3.OperationalError:
+                return None  # Banco de uma versão anterior do agente
+            return db.recent_anomalies(datetime.now() - timedelta(minutes=minutes), stream_detector.DETECTOR)
+
+    def agent_stats(self):
+        """Snapshots da telemetria do agente na janela (vazio em bancos sem agent_stats)"""
+        with self._lock:
+            try:
+                rows = self._connect().agent_stats(datetime.now() - timedelta(hours=self.hours))
+            except sqlite3.OperationalError:
+                rows = []
+        return self._frame(rows, STATS_COLUMNS)
+
+    def sla(self, first_day, last_day, hosts=None):
+        """Disponibilidade dos dias pedidos pelos acumuladores diários do agente"""
+        with self._lock:
+            return self._connect().sla_summary(first_day, last_day, hosts)
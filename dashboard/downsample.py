@@ -0,0 +1,87 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Pontos por série enviados ao navegador (~largura de um gráfico em pixels)
+CHART_POINTS = 2000
+# Acima disso o traço vira Scattergl (WebGL): SVG com spline trava o navegador
+WEBGL_THRESHOLD = 1500
+
+def _numeric(x):
+    """Eixo x como float (timestamps viram nanossegundos) para o cálculo de áreas"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+def minmax_indices(y, n):
+    """Mínimo e máximo de cada um de n/2 baldes (vetorizado): nenhum pico se perde"""
+    size = len(y)
+    if size <= n:
+        return np.arange(size)
+    buckets = max(n // 2, 1)
+    edges = np.linspace(0, size, buckets + 1).astype(int)
+    starts = edges[:-1]
+    # Posição do mínimo/máximo dentro de cada balde via reduceat + busca do valor
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    is_min = y == mins[bucket_of]
+    is_max = y == maxs[bucket_of]
+    first_min = np.unique(bucket_of[is_min], return_index=True)[1]
+    first_max = np.unique(bucket_of[is_max], return_index=True)[1]
+    picked = np.concatenate([np.flatnonzero(is_min)[first_min], np.flatnonzero(is_max)[first_max]])
+    return np.unique(np.concatenate([[0, size - 1], picked]))
+
+def lttb_indices(x, y, n):
+    """Largest-Triangle-Three-Buckets: n pontos que preservam a forma (e os picos) da série.
+
+    Para não pagar o laço do LTTB em todas as amostras, cada balde é antes
+    reduzido aos seus extremos (MinMaxLTTB): o resultado é praticamente o mesmo.
+    """
+    size = len(y)
+    if size <= n or n < 3:
+        return np.arange(size)
+    candidates = minmax_indices(y, n * 4) if size > n * 4 else np.arange(size)
+    cx, cy = x[candidates], y[candidates]
+
+    edges = np.linspace(1, len(candidates) - 1, n - 1).astype(int)
+    # Média de cada balde = vértice C do triângulo para o balde anterior
+    sums_x = np.add.reduceat(cx[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(cy[1:-1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, cx[-1])
+    avg_y = np.append(sums_y / counts, cy[-1])
+
+    selected = [0]
+    ax, ay = cx[0], cy[0]
+    for b in range(n - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = cx[lo:hi], cy[lo:hi]
+        area = np.abs((ax - avg_x[b + 1]) * (by - ay) - (ax - bx) * (avg_y[b + 1] - ay))
+        best = lo + int(area.argmax())
+        selected.append(best)
+        ax, ay = cx[best], cy[best]
+    selected.append(len(candidates) - 1)
+    return candidates[np.array(selected)]
+
+def downsample(x, y, n=CHART_POINTS, method="lttb"):
+    """Reduz a série (ordenada por x) a ~n pontos; valores ausentes são descartados"""
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    if len(y) <= n:
+        return x, y
+    if method == "minmax":
+        idx = minmax_indices(y, n)
+    else:
+        idx = lttb_indices(_numeric(x), y, n)
+    return x[idx], y[idx]
+
+def line_trace(x, y, name, n=CHART_POINTS, method="lttb", **kwargs):
+    """Traço de linha já reduzido: Scatter (SVG) para séries pequenas, Scattergl acima do limite"""
+    x, y = downsample(x, y, n, method)
+    if len(y) > WEBGL_THRESHOLD:
+        line = dict(kwargs.pop('line', {}))
+        line.pop('shape', None)  # WebGL só desenha segmentos retos
+        return go.Scattergl(x=x, y=y, name=name, mode='lines', line=line, **kwargs)
+    return go.Scatter(x=x, y=y, name=name, mode='lines', **kwargs)
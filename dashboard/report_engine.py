@@ -1,7 +1,19 @@
 from fpdf import FPDF
 from datetime import datetime
-import pandas as pd
+import glob
+import math
 import os
+import re
+import sys
+
+# Módulos do agente (API de consulta do banco)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent')))
+from database import SentinelDB, PROBLEM_STATUSES
+import archive
+
+EVIDENCE_COLUMNS = ["timestamp", "ping_ms", "jitter_ms", "packet_loss", "status"]
+EVIDENCE_ROWS = 15
+REPORT_DIRNAME = "reports"  # Relatórios gerados ficam ao lado do banco (cache por período + versão)
 
 class AuditReport(FPDF):
     def header(self):
@@ -18,61 +30,143 @@ class AuditReport(FPDF):
         self.set_font('Arial', 'I', 8)
         self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
 
-def generate_pdf(df):
-    pdf = AuditReport()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    # 1. Resumo Executivo
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, "1. Resumo Executivo", 0, 1)
-    pdf.set_font("Arial", size=12)
-    
-    # Cálculos Básicos
-    avg_ping = df['ping_ms'].mean()
-    max_jitter = df['jitter_ms'].max()
-    packet_loss_events = len(df[df['packet_loss'] > 0])
-    uptime = 100 - (packet_loss_events / len(df) * 100) if len(df) > 0 else 0
-
-    resumo = (
-        f"Durante o período analisado, a rede apresentou uma disponibilidade estimada de {uptime:.2f}%.\n"
-        f"A latência média foi de {avg_ping:.1f}ms, com picos de instabilidade (Jitter) chegando a {max_jitter:.1f}ms.\n"
-        f"Foram detectados {packet_loss_events} eventos de perda de pacotes."
-    )
-    pdf.multi_cell(0, 10, resumo)
-    pdf.ln(10)
-
-    # 2. Tabela de Evidências (Últimos 10 registros críticos ou recentes)
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, "2. Evidências Técnicas (Amostra)", 0, 1)
-    pdf.set_font("Arial", size=10)
-
-    # Cabeçalho da Tabela
-    pdf.set_fill_color(200, 220, 255)
-    pdf.cell(45, 10, "Hora", 1, 0, 'C', 1)
-    pdf.cell(30, 10, "Ping (ms)", 1, 0, 'C', 1)
-    pdf.cell(30, 10, "Jitter (ms)", 1, 0, 'C', 1)
-    pdf.cell(30, 10, "Perda %", 1, 0, 'C', 1)
-    pdf.cell(40, 10, "Status", 1, 1, 'C', 1)
-
-    # Dados (Pegando os últimos 15 registros para caber na página)
-    recent_data = df.head(15)
-    
-    for index, row in recent_data.iterrows():
-        # Destaque em vermelho se houver problema
-        if row['status'] != 'OK':
-            pdf.set_text_color(255, 0, 0)
-        else:
-            pdf.set_text_color(0, 0, 0)
-            
-        timestamp = pd.to_datetime(row['timestamp']).strftime('%H:%M:%S')
-        pdf.cell(45, 10, timestamp, 1)
-        pdf.cell(30, 10, str(round(row['ping_ms'], 1)), 1)
-        pdf.cell(30, 10, str(round(row['jitter_ms'], 1)), 1)
-        pdf.cell(30, 10, str(row['packet_loss']), 1)
-        pdf.cell(40, 10, row['status'], 1, 1)
-
-    # Salvar
-    filename = "Relatorio_Auditoria_Rede.pdf"
-    pdf.output(filename)
-    return filename
\ No newline at end of file
+def as_datetime(value):
+    # Banco devolve texto ISO; o arquivo Parquet devolve pd.Timestamp (subclasse de datetime)
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def fmt_ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+def report_path(db_path, start, end, hosts, version):
+    hosts_tag = "-".join(sorted([hosts] if isinstance(hosts, str) else hosts)) if hosts else "todos"
+    hosts_tag = re.sub(r"[^A-Za-z0-9_.-]", "_", hosts_tag)  # Alvos da frota têm "/" no nome
+    prefix = f"Sentinel_Auditoria_{start:%Y%m%d%H%M}_{end:%Y%m%d%H%M}_{hosts_tag}"
+    folder = os.path.join(os.path.dirname(os.path.abspath(db_path)), REPORT_DIRNAME)
+    return os.path.join(folder, f"{prefix}_v{version}.pdf"), os.path.join(folder, f"{prefix}_v*.pdf")
+
+def problem_rows(db, start, end, hosts=None, archive_dir=None):
+    """Gerador das linhas problemáticas do período em ordem cronológica (arquivo + banco vivo)"""
+    first_live = db.conn.execute("SELECT MIN(timestamp) FROM metrics").fetchone()[0]
+    first_live = as_datetime(first_live) if first_live else None
+    if archive_dir and archive.ARROW_AVAILABLE and (first_live is None or start < first_live):
+        # Dias que já saíram do banco vivo vêm do Parquet (só linhas com problema)
+        old = archive.read_archive(archive_dir, start, end, EVIDENCE_COLUMNS, hosts, PROBLEM_STATUSES)
+        if first_live is not None:
+            old = old[old['timestamp'] < first_live]
+        yield from old.itertuples(index=False, name=None)
+    yield from db.query(start=start, end=end, hosts=hosts, statuses=PROBLEM_STATUSES,
+                        columns=EVIDENCE_COLUMNS, order="asc")
+
+def sample_evidence(rows, total, limit=EVIDENCE_ROWS):
+    """Amostra uniforme ao longo do período: mantém 1 a cada ceil(total/limit) linhas"""
+    step = max(1, math.ceil((total or 0) / limit))
+    for i, row in enumerate(rows):
+        if i % step == 0:
+            yield row
+            limit -= 1
+            if limit == 0:
+                break
+
+def generate_pdf(db_path, start, end, hosts=None, archive_dir=None):
+    """Gera (ou reaproveita) o relatório do período; retorna o caminho do PDF.
+
+    O resumo e a tabela diária vêm de consultas agregadas nos rollups; só as
+    linhas de evidência amostradas passam pelo Python.
+    """
+    db = SentinelDB(db_path, readonly=True)
+    try:
+        path, pattern = report_path(db_path, start, end, hosts, db.data_version(end))
+        if os.path.exists(path):
+            return path  # Mesmo período e nenhum dado novo: PDF já pronto
+
+        summary = db.summarize(start, end, hosts)
+        daily = db.summarize(start, end, hosts, by_day=True)
+        # Percentis do RTT de cada pacote (sketches dos agregados; a média esconde a cauda)
+        latency = db.latency_percentiles(start, end, hosts)
+        daily_latency = db.latency_percentiles(start, end, hosts, by_day=True)
+        # Disponibilidade pelos intervalos reais entre amostras (mesmo motor da calculadora de SLA)
+        availability = db.sla_summary(start.date(), end.date(), hosts)
+        daily_availability = db.sla_summary(start.date(), end.date(), hosts, by_day=True)
+        archive_dir = archive_dir or archive.default_archive_dir(db_path)
+
+        pdf = AuditReport()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+
+        # 1. Resumo Executivo
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(200, 10, "1. Resumo Executivo", 0, 1)
+        pdf.set_font("Arial", size=12)
+
+        total_samples = summary['samples'] or 0
+        packet_loss_events = summary['loss_events'] or 0
+        resumo = (
+            f"Período: {start:%d/%m/%Y %H:%M} a {end:%d/%m/%Y %H:%M} ({total_samples} amostras).\n"
+            f"Durante o período analisado, a rede apresentou uma disponibilidade estimada de "
+            f"{availability['uptime_pct']:.2f}% ({availability['down_s'] / 60:.1f} min fora do ar, "
+            f"{availability['unmonitored_s'] / 60:.1f} min sem monitoramento).\n"
+            f"A latência média foi de {summary['ping_ms'] or 0:.1f}ms (mediana {fmt_ms(latency['p50'])}ms, "
+            f"p95 {fmt_ms(latency['p95'])}ms, p99 {fmt_ms(latency['p99'])}ms), com picos de instabilidade (Jitter) "
+            f"chegando a {summary['jitter_ms_max'] or 0:.1f}ms.\n"
+            f"Foram detectados {packet_loss_events} eventos de perda de pacotes."
+        )
+        pdf.multi_cell(0, 10, resumo)
+        pdf.ln(10)
+
+        # 2. Resumo por dia
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(200, 10, "2. Resumo Diário", 0, 1)
+        pdf.set_font("Arial", size=10)
+        pdf.set_fill_color(200, 220, 255)
+        for label, width in (("Dia", 30), ("Amostras", 25), ("Uptime %", 25), ("Ping médio", 25),
+                             ("Ping p95", 25), ("Jitter máx", 25), ("Perdas", 20)):
+            pdf.cell(width, 8, label, 1, 0, 'C', 1)
+        pdf.ln()
+        for day in daily:
+            day_uptime = daily_availability.get(day['day'], {}).get('uptime_pct', 100.0)
+            # Destaque em vermelho nos dias com perda
+            if day['loss_events']:
+                pdf.set_text_color(255, 0, 0)
+            else:
+                pdf.set_text_color(0, 0, 0)
+            pdf.cell(30, 8, datetime.fromisoformat(day['day']).strftime('%d/%m/%Y'), 1)
+            pdf.cell(25, 8, str(day['samples']), 1)
+            pdf.cell(25, 8, f"{day_uptime:.2f}", 1)
+            pdf.cell(25, 8, f"{day['ping_ms'] or 0:.1f}", 1)
+            pdf.cell(25, 8, fmt_ms(daily_latency.get(day['day'], {}).get('p95')), 1)
+            pdf.cell(25, 8, f"{day['jitter_ms_max'] or 0:.1f}", 1)
+            pdf.cell(20, 8, str(day['loss_events']), 1, 1)
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(10)
+
+        # 3. Tabela de Evidências (registros críticos amostrados ao longo do período)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(200, 10, "3. Evidências Técnicas (Amostra)", 0, 1)
+        pdf.set_font("Arial", size=10)
+
+        # Cabeçalho da Tabela
+        pdf.set_fill_color(200, 220, 255)
+        pdf.cell(45, 10, "Hora", 1, 0, 'C', 1)
+        pdf.cell(30, 10, "Ping (ms)", 1, 0, 'C', 1)
+        pdf.cell(30, 10, "Jitter (ms)", 1, 0, 'C', 1)
+        pdf.cell(30, 10, "Perda %", 1, 0, 'C', 1)
+        pdf.cell(40, 10, "Status", 1, 1, 'C', 1)
+
+        pdf.set_text_color(255, 0, 0)
+        evidence = problem_rows(db, start, end, hosts, archive_dir)
+        for timestamp, ping, jitter, loss, status in sample_evidence(evidence, summary['problem_samples']):
+            pdf.cell(45, 10, as_datetime(timestamp).strftime('%d/%m %H:%M:%S'), 1)
+            pdf.cell(30, 10, "-" if ping is None else str(round(ping, 1)), 1)
+            pdf.cell(30, 10, "-" if jitter is None else str(round(jitter, 1)), 1)
+            pdf.cell(30, 10, str(loss), 1)
+            pdf.cell(40, 10, status, 1, 1)
+        pdf.set_text_color(0, 0, 0)
+    finally:
+        db.close()
+
+    # Salvar (versões antigas do mesmo período deixam de valer)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for old in glob.glob(pattern):
+        os.remove(old)
+    pdf.output(path)
+    return path
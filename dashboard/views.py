@@ -0,0 +1,250 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_loader import DeltaLoader, agent_health
+from downsample import line_trace
+from database import SentinelDB
+# IA opcional: sem ela o painel mostra só os alertas do agente
+try:
+    from core_ai.anomaly import NetworkBrain
+    AI_AVAILABLE = True
+except ImportError:
+    AI_AVAILABLE = False
+
+# Pontos carregados por alvo; cada gráfico reduz as séries (LTTB) antes de enviar ao navegador
+MAX_POINTS = 12_000
+VIEW_CACHE_SIZE = 32  # Resultados (janela x alvo x tipo) mantidos; os menos usados saem primeiro
+EVENT_ROWS = 10       # Linhas do log de eventos críticos
+
+# Função para estilizar gráficos Plotly
+def style_plotly(fig):
+    fig.update_layout(
+        template="plotly_dark",
+        plot_bgcolor='rgba(0,0,0,0)',    # Fundo transparente
+        paper_bgcolor='rgba(0,0,0,0)',   # Fundo transparente
+        margin=dict(l=20, r=20, t=40, b=20),
+        hovermode="x unified", # Tooltip moderno
+        xaxis=dict(showgrid=False, zeroline=False), # Remove grades feias
+        yaxis=dict(showgrid=True, gridcolor='#2B2F42', zeroline=False), # Grade sutil apenas horizontal
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+def stability_figure(chart_df, title):
+    """Latência e Jitter (com o pico do balde nos agregados)"""
+    fig = go.Figure()
+    # Ping
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['ping_ms'], 'Ping (ms)',
+        line=dict(color='#00CC96', width=2, shape='spline'),
+        fill='tozeroy', fillcolor='rgba(0, 204, 150, 0.1)'
+    ))
+
+    # Nos agregados a média do balde esconde os picos: o máximo entra como envelope
+    if 'ping_ms_max' in chart_df.columns:
+        fig.add_trace(line_trace(
+            chart_df['timestamp'], chart_df['ping_ms_max'], 'Pico de Ping (ms)',
+            line=dict(color='#00CC96', width=1, dash='dot'), opacity=0.5
+        ))
+
+    # Jitter
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['jitter_ms'], 'Jitter (ms)',
+        line=dict(color='#EF553B', width=2, shape='spline'),
+        fill='tozeroy', fillcolor='rgba(239, 85, 59, 0.2)'
+    ))
+
+    # Jitter entre chegadas (RFC 3550): estimador contínuo, menos sensível a um único pacote atrasado
+    if 'rtp_jitter_ms' in chart_df.columns and chart_df['rtp_jitter_ms'].notna().any():
+        fig.add_trace(line_trace(
+            chart_df['timestamp'], chart_df['rtp_jitter_ms'], 'Jitter RFC 3550 (ms)',
+            line=dict(color='#EF553B', width=1, dash='dash')
+        ))
+
+    fig = style_plotly(fig)
+    fig.update_layout(height=350, title_text=title)
+    return fig
+
+def rca_figure(chart_df):
+    """Gateway x Internet: a lentidão está na rede local ou na operadora?"""
+    fig = go.Figure()
+
+    # Linha do Gateway (Rede Local) - Laranja Pontilhado
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['gateway_ping_ms'], 'Rede Local (Gateway)',
+        line=dict(color='#FFA15A', width=2, dash='dot')
+    ))
+
+    # Linha da Internet (Google) - Verde Sólido
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['ping_ms'], 'Internet (Operadora)',
+        line=dict(color='#00CC96', width=2)
+    ))
+
+    fig = style_plotly(fig)
+    fig.update_layout(
+        height=350,
+        title_text="Comparativo: A lentidão está no Wi-Fi/Switch ou na Fibra?",
+        yaxis_title="Latência (ms)"
+    )
+    return fig
+
+def bandwidth_figure(chart_df):
+    """Vazão passiva das interfaces (None se o agente ainda não mediu)"""
+    if not chart_df[['download_mbps', 'upload_mbps']].notna().any().any():
+        return None
+    fig = go.Figure()
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['download_mbps'], 'Download (Mbps)',
+        line=dict(color='#636EFA', width=2), fill='tozeroy', fillcolor='rgba(99, 110, 250, 0.1)'
+    ))
+    fig.add_trace(line_trace(
+        chart_df['timestamp'], chart_df['upload_mbps'], 'Upload (Mbps)',
+        line=dict(color='#AB63FA', width=2)
+    ))
+    fig = style_plotly(fig)
+    fig.update_layout(height=300, title_text="Tráfego medido nas interfaces (passivo)", yaxis_title="Mbps")
+    return fig
+
+def dns_figure(chart_df):
+    fig = go.Figure(line_trace(
+        chart_df['timestamp'], chart_df['dns_response_ms'], 'DNS (ms)',
+        line=dict(color='#636EFA', width=2, shape='spline'), fill='tozeroy'
+    ))
+    fig = style_plotly(fig)
+    fig.update_layout(height=300, title_text="Tempo de Resolução (ms)", showlegend=False)
+    return fig
+
+def cycle_figure(cycles):
+    if cycles.empty:
+        return None
+    fig = px.line(cycles, x='timestamp', y='cycle_ms', color_discrete_sequence=['#AB63FA'])
+    fig = style_plotly(fig)
+    fig.update_layout(height=250, title_text="Duração média do ciclo (ms)", showlegend=False)
+    return fig
+
+def critical_events(df, limit=EVENT_ROWS):
+    """Últimas linhas com perda ou diagnóstico diferente de OK, prontas para a tabela"""
+    critical = df[(df['packet_loss'] > 0) | (df['status'] != 'OK')]
+    events = critical[['timestamp', 'packet_loss', 'jitter_ms', 'status']].head(limit).copy()
+    events['timestamp'] = events['timestamp'].dt.strftime('%H:%M:%S')
+    return events
+
+class SharedViews:
+    """Camada de dados e cálculo compartilhada por todas as sessões do dashboard (uma por banco).
+
+    Streamlit reexecuta o app para cada navegador aberto; aqui a janela carregada,
+    os alertas, percentis, SLA, telemetria e as figuras são calculados uma vez por
+    versão dos dados (o id da última linha de metrics) e servidos prontos a todas
+    as sessões. Quem chega durante um cálculo espera por ele em vez de repeti-lo.
+    Os resultados são somente leitura para quem os recebe.
+    """
+
+    def __init__(self, db_path, max_points=MAX_POINTS, max_entries=VIEW_CACHE_SIZE):
+        self.db_path = db_path
+        self.max_points = max_points
+        self.max_entries = max_entries
+        self.builds = 0  # Cálculos feitos (leituras do cache não contam)
+        self._loaders = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._brain = None
+
+    def loader(self, hours):
+        """Carregador incremental da janela (um por janela, compartilhado)"""
+        with self._lock:
+            if hours not in self._loaders:
+                self._loaders[hours] = DeltaLoader(self.db_path, hours, max_points=self.max_points)
+            return self._loaders[hours]
+
+    def version(self):
+        """Id da última linha de metrics (muda a cada amostra gravada) e o dia (SLA do mês)"""
+        with self._db_lock:
+            if self._db is None:
+                self._db = SentinelDB(self.db_path, readonly=True)
+            return self._db.data_version(), date.today()
+
+    def shared(self, key, version, compute):
+        """compute() uma vez por (chave, versão); chamadas concorrentes recebem o mesmo resultado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {"lock": threading.Lock(), "version": None, "value": None}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        with entry["lock"]:
+            if entry["version"] != version:
+                entry["value"] = compute()
+                entry["version"] = version
+                with self._lock:
+                    self.builds += 1
+            return entry["value"]
+
+    def view(self, hours, host=None, label=""):
+        """Tudo o que o app desenha para a janela/alvo, calculado uma vez por versão dos dados.
+
+        dict com df (mais recente primeiro), hosts da janela e, havendo dados:
+        latest, anomalies/stream_detection, latency, month, last_trace,
+        last_test, health/stages, events e figures.
+        """
+        version = self.version()
+        return self.shared(("view", hours, host, label), version, lambda: self._build(hours, host, label, version))
+
+    def _anomalies(self, loader):
+        """Alertas do detector em fluxo do agente; sem ele, o NetworkBrain (uma execução por versão)"""
+        anomalies = loader.stream_anomalies()
+        if anomalies is not None:
+            return anomalies, True
+        if not AI_AVAILABLE:
+            return None, False
+        if self._brain is None:
+            self._brain = NetworkBrain(self.db_path)
+        return self._brain.detect_anomalies(), False
+
+    def _build(self, hours, host, label, version):
+        loader = self.loader(hours)
+        window = self.shared(("window", hours), version, loader.refresh)
+        df = window if host is None else window[window['target_host'] == host].reset_index(drop=True)
+        df.attrs['resolution'] = window.attrs.get('resolution', 'raw')
+        view = {"df": df, "hosts": sorted(window['target_host'].dropna().unique()) if not window.empty else []}
+        if df.empty:
+            return view
+
+        hosts = [host] if host else None
+        today = version[1]
+        anomalies, stream_detection = self.shared(("anomalies",), version, lambda: self._anomalies(loader))
+        health, stages, cycles = self.shared(("health", hours), version, lambda: agent_health(loader.agent_stats()))
+        # Séries em ordem cronológica (o DataFrame vem do mais recente para o mais antigo)
+        chart_df = df.iloc[::-1]
+        resolution_label = "registros brutos" if df.attrs['resolution'] == 'raw' else f"médias de {df.attrs['resolution']}"
+        view.update(
+            # Última amostra e a anterior do mesmo alvo (em "Todos" as linhas dos alvos se intercalam)
+            latest=df[df['target_host'] == df['target_host'].iat[0]].head(2).to_dict('records'),
+            anomalies=anomalies,
+            stream_detection=stream_detection,
+            latency=loader.latency_percentiles(hosts),
+            month=loader.sla(today.replace(day=1), today, hosts),
+            last_trace=loader.latest_trace(),
+            last_test=loader.latest_throughput_test(),
+            health=health,
+            stages=stages,
+            events=critical_events(df),
+            figures={
+                "stability": stability_figure(chart_df, f"Latência vs Instabilidade ({label}, {resolution_label})"),
+                "rca": rca_figure(chart_df) if 'gateway_ping_ms' in df.columns else None,
+                "bandwidth": bandwidth_figure(chart_df),
+                "dns": dns_figure(chart_df),
+                "cycle": cycle_figure(cycles),
+            },
+        )
+        return view